@@ -4,6 +4,7 @@ Django settings for music_backend project.
 
 from pathlib import Path
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -170,8 +171,12 @@ else:
     MEDIA_ROOT = BASE_DIR / 'media'
 
 # File upload limits
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB
+# Uploaded files larger than this are spooled to a temp file instead of held
+# in memory, and are streamed from disk to FileForge in chunks.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', 2621440))  # 2.5MB
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR') or None
+# Non-file request data (form fields, JSON bodies); file parts don't count.
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('DATA_UPLOAD_MAX_MEMORY_SIZE', 5242880))  # 5MB
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -232,13 +237,35 @@ FRONTEND_URL = 'https://muse-wave.web.app'
 
 # ============================================================================
 # CACHING
-# Uses database as cache backend to avoid needing Redis on PythonAnywhere free tier.
+# Per-process LRU in front of a shared tier (musewave/cache_backends.py).  The
+# shared tier is a cache directory by default so no Redis is needed on
+# PythonAnywhere free tier; set CACHE_REDIS_URL to use Redis instead.
 # ============================================================================
 
+if os.environ.get('CACHE_REDIS_URL'):
+    SHARED_CACHE = {
+        'BACKEND':  'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_REDIS_URL'],
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND':  'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'musewave-cache')),
+        'OPTIONS':  {'MAX_ENTRIES': 50000},
+    }
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'django_cache',  # table name
+        'BACKEND': 'musewave.cache_backends.TieredCache',
+        'OPTIONS': {
+            'SHARED': SHARED_CACHE,
+            'LOCAL_MAX_ENTRIES': int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 5000)),
+            # Longest another process's write can go unseen by this one.
+            'LOCAL_TIMEOUT':    float(os.environ.get('CACHE_LOCAL_TIMEOUT', 5)),
+            'NEGATIVE_TIMEOUT': float(os.environ.get('CACHE_NEGATIVE_TIMEOUT', 2)),
+            # Login-attempt counters must be exact across processes.
+            'LOCAL_BYPASS': ['auth_attempts_'],
+        },
     }
 }
 
@@ -267,6 +294,237 @@ Q_CLUSTER = {
 }
 
 
+# ============================================================================
+# PLAY BUFFER
+# Plays are accumulated per process and written in batches (bulk_create plus
+# one F() increment per track) — see musewave/services/play_buffer.py.
+# ============================================================================
+
+PLAY_BUFFER = {
+    # Flush as soon as this many plays are pending.
+    'batch_size': int(os.environ.get('PLAY_BUFFER_BATCH_SIZE', 500)),
+    # Flush pending plays at most this many seconds after they were recorded.
+    'max_age': float(os.environ.get('PLAY_BUFFER_MAX_AGE', 5)),
+    # Hand batches to the django-q2 cluster instead of writing them in-process.
+    'use_queue': os.environ.get('PLAY_BUFFER_USE_QUEUE', 'True') == 'True',
+}
+
+
+# ============================================================================
+# UPLOADS
+# Media is handed to FileForge in async mode and attached by a django-q2 task
+# once the provider upload completes (musewave/services/uploads.py).
+# ============================================================================
+
+UPLOADS = {
+    # 'async' (default) or 'sync' to block the request until the provider is done.
+    'mode': os.environ.get('UPLOAD_MODE', 'async'),
+    'provider': os.environ.get('UPLOAD_PROVIDER', 'cloudinary'),
+    # Seconds the per-upload task keeps re-polling before leaving it to the scheduled sweep.
+    'poll_timeout': int(os.environ.get('UPLOAD_POLL_TIMEOUT', 120)),
+    # Uploads still processing after this many seconds are marked failed.
+    'max_age': int(os.environ.get('UPLOAD_MAX_AGE', 3600)),
+    # Files of one request sent to FileForge concurrently.
+    'parallel': int(os.environ.get('UPLOAD_PARALLELISM', 4)),
+}
+
+
+# ============================================================================
+# FILE DELETIONS
+# FileForge files are deleted through the PendingFileDeletion outbox, drained
+# by the django-q2 cluster (musewave/services/file_deletions.py).
+# ============================================================================
+
+FILE_DELETIONS = {
+    # Drain on the django-q2 cluster; False drains in-process after commit.
+    'use_queue': os.environ.get('FILE_DELETIONS_USE_QUEUE', 'True') == 'True',
+    'batch_size': 50,
+    # Concurrent DELETE calls per drain (keep <= FILEFORGE_CLIENT pool_size).
+    'workers': int(os.environ.get('FILE_DELETIONS_WORKERS', 8)),
+    # Failed deletions back off from 30s up to 6h and are marked dead after this many attempts.
+    'max_attempts': int(os.environ.get('FILE_DELETIONS_MAX_ATTEMPTS', 10)),
+    'backoff': 30,
+    'backoff_max': 6 * 3600,
+    # Seconds a claimed row is hidden from other drainers.
+    'lease': 300,
+    # Stay below Q_CLUSTER['timeout'].
+    'max_seconds': 240,
+}
+
+
+# ============================================================================
+# TRENDING
+# GET /api/trending ranks tracks by exponentially decayed plays, likes and
+# downloads, updated from the counter write path (musewave/services/trending.py).
+# ============================================================================
+
+TRENDING = {
+    # Hours for an event's contribution to halve.  Changing it or the weights
+    # needs `python manage.py rebuild_trending`.
+    'half_life_hours': float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24)),
+    'weights': {'plays': 1.0, 'likes': 5.0, 'downloads': 3.0},
+    # Rows whose decayed score drops below this are pruned daily.
+    'min_score': 0.01,
+}
+
+
+# ============================================================================
+# CHARTS
+# Daily and weekly top-track snapshots, written once per closed window by a
+# django-q2 schedule from the TrackDailyStats rollup (musewave/services/charts.py).
+# ============================================================================
+
+CHARTS = {
+    # Entries per chart (overall and each genre).
+    'size': int(os.environ.get('CHARTS_SIZE', 100)),
+    # Tracks with fewer plays in the window are left off.
+    'min_plays': int(os.environ.get('CHARTS_MIN_PLAYS', 1)),
+    # Closed windows per period the hourly job catches up after missed runs.
+    'catch_up': int(os.environ.get('CHARTS_CATCH_UP', 14)),
+}
+
+
+# ============================================================================
+# SIMILAR TRACKS
+# Co-listening neighbours for GET /api/tracks/<id>/similar, computed offline
+# from Play and Like rows by django-q2 schedules (musewave/services/similar.py).
+# ============================================================================
+
+SIMILAR_TRACKS = {
+    # Neighbours stored per track.
+    'neighbors': int(os.environ.get('SIMILAR_TRACKS_NEIGHBORS', 20)),
+    # Days of play history in the co-listening matrix.
+    'window_days': int(os.environ.get('SIMILAR_TRACKS_WINDOW_DAYS', 180)),
+    'like_weight': 2.0,
+    # Listeners two tracks must share before they count as similar.
+    'min_overlap': int(os.environ.get('SIMILAR_TRACKS_MIN_OVERLAP', 2)),
+    'max_user_tracks': 500,
+    # Upper bound on the dense score block per batch (8 bytes per cell).
+    'batch_cells': 4_000_000,
+    'dirty_margin': 900,
+}
+
+
+# ============================================================================
+# FEED
+# GET /api/feed merges tracks fanned out to per-follower FeedItem rows with
+# tracks of high-follower artists read at request time (musewave/services/feed.py).
+# ============================================================================
+
+FEED = {
+    # Artists with at least this many followers are fanned in on read.
+    'fanout_threshold': int(os.environ.get('FEED_FANOUT_THRESHOLD', 10000)),
+    # Feed rows inserted per bulk_create during fan-out.
+    'batch_size': 1000,
+    # Latest tracks copied into a feed when a user follows an artist.
+    'backfill': 20,
+    'retention_days': int(os.environ.get('FEED_RETENTION_DAYS', 180)),
+    # Fan out on the django-q2 cluster; False fans out in-process after commit.
+    'use_queue': os.environ.get('FEED_USE_QUEUE', 'True') == 'True',
+}
+
+
+# ============================================================================
+# AUDIO ANALYSIS
+# Uploaded audio is decoded on the django-q2 cluster to fill in duration,
+# format, size, loudness and waveform (musewave/services/audio_analysis.py).
+# ============================================================================
+
+AUDIO_ANALYSIS = {
+    'enabled': os.environ.get('AUDIO_ANALYSIS_ENABLED', 'True') == 'True',
+    # Set to False to analyse inline after the upload request commits.
+    'use_queue': os.environ.get('AUDIO_ANALYSIS_USE_QUEUE', 'True') == 'True',
+    # Tried in order; WAV is decoded with the stdlib, everything else via ffmpeg.
+    'decoders': [
+        'musewave.services.audio_analysis.WavDecoder',
+        'musewave.services.audio_analysis.FfmpegDecoder',
+    ],
+    'ffmpeg_path': os.environ.get('FFMPEG_PATH', 'ffmpeg'),
+    'max_bytes': int(os.environ.get('AUDIO_ANALYSIS_MAX_BYTES', 200 * 1024 * 1024)),
+    # Provider hosts uploaded audio may be fetched from, besides FileForge's own.
+    'allowed_hosts': os.environ.get('AUDIO_ANALYSIS_ALLOWED_HOSTS', 'res.cloudinary.com').split(','),
+}
+
+
+# ============================================================================
+# TRACK COUNTERS
+# Likes/downloads/shares are written to this many shard rows per track and
+# folded into the Track columns by a scheduled task (musewave/services/counters.py).
+# ============================================================================
+
+TRACK_COUNTER_SHARDS = int(os.environ.get('TRACK_COUNTER_SHARDS', 8))
+
+
+# ============================================================================
+# RESPONSE CACHE
+# Public read endpoints cache their payloads and are invalidated by model
+# signals (musewave/response_cache.py).
+# ============================================================================
+
+RESPONSE_CACHE = {
+    'enabled': os.environ.get('RESPONSE_CACHE_ENABLED', 'True') == 'True',
+    # Upper bound on how stale engagement counters can be in cached payloads.
+    'timeout': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60)),
+}
+
+
+# ============================================================================
+# FAST SERIALIZERS
+# Hot list endpoints serialize .values() rows through precompiled field
+# mappers instead of DRF ModelSerializers (musewave/fast_serializers.py).
+# Output is identical; set FAST_SERIALIZERS_ENABLED=False to fall back.
+# ============================================================================
+
+_FAST_SERIALIZERS_ENABLED = os.environ.get('FAST_SERIALIZERS_ENABLED', 'True') == 'True'
+
+FAST_SERIALIZERS = {
+    'tracks_list':        _FAST_SERIALIZERS_ENABLED,
+    'get_artists':        _FAST_SERIALIZERS_ENABLED,
+    'get_album':          _FAST_SERIALIZERS_ENABLED,
+    'get_track_plays':    _FAST_SERIALIZERS_ENABLED,
+    'get_user_plays':     _FAST_SERIALIZERS_ENABLED,
+    'search':             _FAST_SERIALIZERS_ENABLED,
+    'feed':               _FAST_SERIALIZERS_ENABLED,
+    'get_trending':       _FAST_SERIALIZERS_ENABLED,
+    'get_chart':          _FAST_SERIALIZERS_ENABLED,
+    'get_similar_tracks': _FAST_SERIALIZERS_ENABLED,
+    'get_track_radio':    _FAST_SERIALIZERS_ENABLED,
+}
+
+
+# ============================================================================
+# SEARCH SUGGESTIONS
+# Typeahead is served from a per-process prefix index (musewave/services/suggest.py).
+# ============================================================================
+
+SUGGEST_INDEX = {
+    # Rebuild after this many seconds so play-count weights stay current.
+    'max_age': float(os.environ.get('SUGGEST_INDEX_MAX_AGE', 300)),
+    # How often each process checks whether another one changed the index.
+    'check_interval': float(os.environ.get('SUGGEST_INDEX_CHECK_INTERVAL', 5)),
+}
+
+
+# ============================================================================
+# RADIO
+# GET /api/tracks/<id>/radio is served from a per-process feature matrix of
+# published tracks (musewave/services/radio.py).
+# ============================================================================
+
+RADIO = {
+    # Relative weight of each feature block in the similarity.
+    'weights': {'genre': 1.0, 'mood': 0.6, 'tags': 0.8, 'bpm': 0.5, 'key': 0.4},
+    'max_tags': 256,
+    'max_per_artist': int(os.environ.get('RADIO_MAX_PER_ARTIST', 2)),
+    # Candidate pool per queued track.
+    'candidates': 4,
+    # 0 keeps every pick close to the seed; 1 follows the previous track.
+    'drift': float(os.environ.get('RADIO_DRIFT', 0.5)),
+    'max_age': 3600.0,
+    'check_interval': float(os.environ.get('RADIO_CHECK_INTERVAL', 5)),
+}
+
+
 # ============================================================================
 # LOGGING
 # ============================================================================
@@ -301,6 +559,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        # One line per upload with its duration and the worker's peak RSS.
+        'musewave.services.fileforge': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -314,6 +578,22 @@ FILEFORGE_BASE_URL = os.getenv("FILEFORGE_BASE_URL", "https://fileforge1.pythona
 # Replace with a real API key from the FileForge developer console.
 FILEFORGE_API_KEY  = os.getenv("FILEFORGE_API_KEY", "ffk_AoMRLwITo1-2SZVDf9Sgful-AOIqc5mLljPO_10y")
 
+# Pooled, retrying client (musewave/services/fileforge.py).
+FILEFORGE_CLIENT = {
+    # Keep-alive connections per process.
+    'pool_size': int(os.getenv('FILEFORGE_POOL_SIZE', 10)),
+    'connect_timeout': float(os.getenv('FILEFORGE_CONNECT_TIMEOUT', 3.05)),
+    'read_timeout': float(os.getenv('FILEFORGE_READ_TIMEOUT', 60)),
+    # Extra attempts for idempotent calls (status polls, deletes, health).
+    'retries': int(os.getenv('FILEFORGE_RETRIES', 3)),
+    'backoff': 0.5,
+    'backoff_max': 8,
+    # Fail fast for breaker_reset seconds after this many consecutive failures.
+    'breaker_threshold': int(os.getenv('FILEFORGE_BREAKER_THRESHOLD', 5)),
+    'breaker_reset': float(os.getenv('FILEFORGE_BREAKER_RESET', 30)),
+    'metrics_interval': 30,
+}
+
 # Security settings for production (PythonAnywhere)
 if not DEBUG:
     SECURE_SSL_REDIRECT = False  # PythonAnywhere handles SSL
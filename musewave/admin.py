@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import User, Track, Like, Download, Play, Follow, Playlist, PlaylistTrack, Comment, Album
+from .models import (
+    User, Track, Like, Download, Play, Follow, Playlist, PlaylistTrack, Comment, Album, Tag,
+    PendingUpload, PendingFileDeletion,
+)
 
 
 @admin.register(User)
@@ -26,6 +29,13 @@ class TrackAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'plays', 'likes', 'downloads', 'shares', 'created_at', 'updated_at']
 
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'created_at']
+    search_fields = ['name', 'slug']
+    readonly_fields = ['id', 'created_at']
+
+
 @admin.register(Like)
 class LikeAdmin(admin.ModelAdmin):
     list_display = ['user', 'track', 'created_at']
@@ -74,3 +84,26 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ['user', 'track', 'content', 'timestamp', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username', 'track__title', 'content']
+
+
+@admin.register(PendingUpload)
+class PendingUploadAdmin(admin.ModelAdmin):
+    list_display = ['target', 'object_id', 'strategy', 'status', 'fileforge_id', 'created_at', 'completed_at']
+    list_filter = ['status', 'strategy', 'target']
+    search_fields = ['object_id', 'fileforge_id']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'completed_at']
+
+
+@admin.register(PendingFileDeletion)
+class PendingFileDeletionAdmin(admin.ModelAdmin):
+    list_display = ['fileforge_id', 'reason', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'reason']
+    search_fields = ['fileforge_id', 'last_error']
+    readonly_fields = ['id', 'claimed_by', 'created_at']
+    actions = ['retry']
+
+    @admin.action(description='Retry selected dead deletions')
+    def retry(self, request, queryset):
+        from .services import file_deletions
+        count = file_deletions.retry_dead(queryset)
+        self.message_user(request, f'{count} deletion(s) queued again.')
@@ -0,0 +1,372 @@
+"""
+Tiered cache backend: a per-process LRU in front of a shared cache.
+
+The default cache used to be ``DatabaseCache``, so every ``cache.get`` (rate
+limits, the signup password stash, response-cache tags) was a SQL query
+against the database that serves traffic.  ``TieredCache`` answers repeat
+reads from process memory and sends the rest to a shared backend: a
+``FileBasedCache`` directory by default, or any other Django cache backend
+such as ``RedisCache``.
+
+Behaviour
+---------
+* **Local tier** — an LRU of pickled values, bounded by ``LOCAL_MAX_ENTRIES``.
+  Entries live at most ``LOCAL_TIMEOUT`` seconds, which is also the longest a
+  change made by another process can go unseen.  Writes from this process
+  update the local tier immediately.
+* **Negative caching** — a shared-tier miss is remembered locally for
+  ``NEGATIVE_TIMEOUT`` seconds, so repeated lookups of absent keys (e.g. no
+  failed logins yet) stay in memory.
+* **Bypass** — keys starting with one of ``LOCAL_BYPASS`` always go to the
+  shared tier (counters whose exact cross-process value matters).
+* **Stampede protection** — ``get_or_set()`` with a callable lets a single
+  caller compute a missing value while others wait for it.  One thread per
+  process computes, and the shared tier holds a lock (``add()``) so only one
+  process computes.  Waiters give up after ``LOCK_TIMEOUT`` seconds and
+  compute themselves.
+* **Statistics** — hits per tier, negative hits and misses are counted per
+  key prefix and flushed to the shared tier every ``STATS_INTERVAL`` seconds.
+  ``manage.py cache_stats`` aggregates them across processes.
+
+Configuration
+-------------
+::
+
+    CACHES = {'default': {
+        'BACKEND':  'musewave.cache_backends.TieredCache',
+        'OPTIONS': {
+            'SHARED': {'BACKEND': '...FileBasedCache', 'LOCATION': '/tmp/cache'},
+            'LOCAL_MAX_ENTRIES': 5000,
+            'LOCAL_TIMEOUT':     5,
+            'NEGATIVE_TIMEOUT':  2,
+            'LOCAL_BYPASS':      ['auth_attempts_'],
+        },
+    }}
+"""
+
+import atexit
+import os
+import pickle
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+STATS_REGISTRY = 'tiered-cache:stats:processes'
+STATS_FIELDS   = ('local_hits', 'shared_hits', 'negative_hits', 'misses')
+STATS_TIMEOUT  = 86400
+
+_PREFIX_RE = re.compile(r'[A-Za-z]+(?:[:_][A-Za-z]+(?=[:_]|$))*')
+
+# Local tiers and statistics are per process, but Django creates one cache
+# object per thread, so they live at module level keyed by cache name.
+_stores = {}
+_stats  = {}
+_setup  = threading.Lock()
+
+
+def key_prefix(key):
+    """Group a key for statistics: its leading run of alphabetic segments."""
+    match = _PREFIX_RE.match(str(key))
+    return match.group(0) if match else '<other>'
+
+
+def _create_backend(config):
+    config = dict(config)
+    backend_cls = import_string(config.pop('BACKEND'))
+    return backend_cls(config.pop('LOCATION', ''), config)
+
+
+class _LocalStore:
+    """Thread-safe LRU of ``key -> (expires_at, pickled value or None)``."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock        = threading.Lock()
+        self.data        = OrderedDict()
+        self.key_locks   = [threading.Lock() for _ in range(64)]
+
+    def key_lock(self, key):
+        return self.key_locks[hash(key) % len(self.key_locks)]
+
+    def get(self, key):
+        """Return ``(found, value)``; *value* is ``_MISSING`` for a negative entry."""
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return False, None
+            expires_at, blob = item
+            if expires_at <= time.monotonic():
+                del self.data[key]
+                return False, None
+            self.data.move_to_end(key)
+        return True, (_MISSING if blob is None else pickle.loads(blob))
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            self.delete(key)
+            return
+        blob = None if value is _MISSING else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, blob)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class _Stats:
+    """Per-prefix counters, periodically written to the shared tier."""
+
+    def __init__(self, shared, interval):
+        self.shared    = shared
+        self.interval  = interval
+        self.lock      = threading.Lock()
+        self.counts    = defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0))
+        self.key       = f'tiered-cache:stats:{socket.gethostname()}:{os.getpid()}'
+        self.flushed   = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(self, key, field):
+        with self.lock:
+            self.counts[key_prefix(key)][field] += 1
+            due = time.monotonic() - self.flushed >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            snapshot     = {prefix: dict(counts) for prefix, counts in self.counts.items()}
+            self.flushed = time.monotonic()
+        if not snapshot:
+            return
+        try:
+            self.shared.set(self.key, snapshot, STATS_TIMEOUT)
+            processes = set(self.shared.get(STATS_REGISTRY) or ())
+            if self.key not in processes:
+                self.shared.set(STATS_REGISTRY, sorted(processes | {self.key}), STATS_TIMEOUT)
+            else:
+                self.shared.touch(STATS_REGISTRY, STATS_TIMEOUT)
+        except Exception:
+            # Statistics must never break the request that triggered the flush.
+            pass
+
+
+class TieredCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = dict(params.get('OPTIONS', {}))
+
+        shared = options.get('SHARED') or {
+            'BACKEND':  'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }
+        self._shared           = _create_backend(shared)
+        self._local_timeout    = float(options.get('LOCAL_TIMEOUT', 5))
+        self._negative_timeout = float(options.get('NEGATIVE_TIMEOUT', 2))
+        self._lock_timeout     = float(options.get('LOCK_TIMEOUT', 10))
+        self._bypass           = tuple(options.get('LOCAL_BYPASS', ()))
+
+        name = options.get('NAME') or repr(sorted(shared.items()))
+        with _setup:
+            if name not in _stores:
+                _stores[name] = _LocalStore(int(options.get('LOCAL_MAX_ENTRIES', 5000)))
+                _stats[name]  = _Stats(self._shared, float(options.get('STATS_INTERVAL', 30)))
+        self._local = _stores[name]
+        self._stats = _stats[name]
+
+    # ── helpers ──────────────────────────────────────────────────────────────
+
+    def _local_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _uses_local(self, key):
+        return not (self._bypass and str(key).startswith(self._bypass))
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self._local_timeout
+        return min(self._local_timeout, timeout - time.time())
+
+    def _remember(self, key, version, value, timeout=DEFAULT_TIMEOUT):
+        if self._uses_local(key):
+            self._local.set(self._local_key(key, version), value, self._local_ttl(timeout))
+
+    def _forget(self, key, version):
+        self._local.delete(self._local_key(key, version))
+
+    # ── reads ────────────────────────────────────────────────────────────────
+
+    def get(self, key, default=None, version=None):
+        if self._uses_local(key):
+            found, value = self._local.get(self._local_key(key, version))
+            if found:
+                self._stats.record(key, 'negative_hits' if value is _MISSING else 'local_hits')
+                return default if value is _MISSING else value
+
+        value = self._shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._stats.record(key, 'misses')
+            if self._uses_local(key):
+                self._local.set(self._local_key(key, version), _MISSING, self._negative_timeout)
+            return default
+
+        self._stats.record(key, 'shared_hits')
+        self._remember(key, version, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remote = {}, []
+        for key in keys:
+            if self._uses_local(key):
+                hit, value = self._local.get(self._local_key(key, version))
+                if hit:
+                    self._stats.record(key, 'negative_hits' if value is _MISSING else 'local_hits')
+                    if value is not _MISSING:
+                        found[key] = value
+                    continue
+            remote.append(key)
+
+        if remote:
+            fetched = self._shared.get_many(remote, version=version)
+            for key in remote:
+                if key in fetched:
+                    self._stats.record(key, 'shared_hits')
+                    self._remember(key, version, fetched[key])
+                    found[key] = fetched[key]
+                else:
+                    self._stats.record(key, 'misses')
+                    if self._uses_local(key):
+                        self._local.set(self._local_key(key, version), _MISSING, self._negative_timeout)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    # ── writes ───────────────────────────────────────────────────────────────
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version=version)
+        self._remember(key, version, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, version, value, timeout)
+        else:
+            self._forget(key, version)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key in failed:
+                self._forget(key, version)
+            else:
+                self._remember(key, version, value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(key, version)
+        return self._shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self._shared.incr(key, delta, version=version)
+        self._forget(key, version)
+        return value
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        return self._shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        self._shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self._shared.clear()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
+
+    # ── stampede protection ──────────────────────────────────────────────────
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version=version)
+            return self.get(key, default, version=version)
+
+        # One computing thread per process...
+        with self._local.key_lock(self._local_key(key, version)):
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+
+            # ...and one computing process per shared tier.
+            lock_key = f'{key}:compute-lock'
+            if not self._shared.add(lock_key, 1, self._lock_timeout, version=version):
+                value = self._wait_for(key, version)
+                if value is not _MISSING:
+                    return value
+            try:
+                value = default()
+                self.set(key, value, timeout, version=version)
+            finally:
+                self._shared.delete(lock_key, version=version)
+            return value
+
+    def _wait_for(self, key, version):
+        deadline = time.monotonic() + self._lock_timeout
+        delay    = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            value = self._shared.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._remember(key, version, value)
+                return value
+            delay = min(delay * 2, 0.2)
+        return _MISSING
+
+    # ── statistics ───────────────────────────────────────────────────────────
+
+    def stats_report(self):
+        """``{prefix: {field: n}}`` summed over every process that reported."""
+        self._stats.flush()
+        processes = self._shared.get(STATS_REGISTRY) or []
+        snapshots = self._shared.get_many(processes)
+        if len(snapshots) < len(processes):
+            # Forget processes whose snapshot expired.
+            self._shared.set(STATS_REGISTRY, sorted(snapshots), STATS_TIMEOUT)
+
+        totals = defaultdict(lambda: dict.fromkeys(STATS_FIELDS, 0))
+        for snapshot in snapshots.values():
+            for prefix, counts in snapshot.items():
+                for field in STATS_FIELDS:
+                    totals[prefix][field] += counts.get(field, 0)
+        return dict(totals)
+
+    def reset_stats(self):
+        processes = self._shared.get(STATS_REGISTRY) or []
+        self._shared.delete_many(list(processes) + [STATS_REGISTRY])
+        with self._stats.lock:
+            self._stats.counts.clear()
@@ -0,0 +1,178 @@
+"""
+Fast read-only serialization for hot list endpoints.
+
+``ModelSerializer`` spends most of a list response building field objects,
+walking ``get_attribute`` for every field of every row and wrapping results
+in ``OrderedDict``s.  For the read-only payloads of ``TrackSerializer``,
+``PublicUserSerializer`` and ``PlaySerializer`` that work is the same for
+every row, so ``FastReadSerializer`` does it once:
+
+* the DRF serializer's fields are introspected a single time and compiled
+  into ``(output name, column, converter)`` mappers;
+* rows are fetched with ``.values()`` for exactly the columns needed, so no
+  model instances are built;
+* converters are the identity where DRF's ``to_representation`` would return
+  the database value unchanged, ``str`` for UUIDs, and the DRF field's own
+  ``to_representation`` everywhere else (choices, dates, ...);
+* ISO 8601 datetimes are formatted directly.  DRF looks the active timezone
+  up for every value, which alone costs more than the rest of a row; here it
+  is read once per ``serialize()`` call and the converters are compiled for
+  it (and cached per timezone).
+
+Output is key-for-key and byte-for-byte the same JSON as the DRF serializer
+(``manage.py benchmark_serializers`` checks this while timing both paths).
+
+Each endpoint opts in through ``settings.FAST_SERIALIZERS`` (view name ->
+bool), so a single endpoint can be switched back to DRF if a payload ever
+diverges.
+
+Public API
+----------
+FastReadSerializer(serializer_class)
+    ``columns``, ``values(queryset, *extra)``, ``serialize(rows)``, ``serialize_one(row)``.
+
+get(serializer_class) -> FastReadSerializer
+    Compiled serializer for a DRF serializer class (cached).
+
+for_endpoint(name, serializer_class) -> FastReadSerializer | None
+    The compiled serializer if *name* is enabled in ``FAST_SERIALIZERS``.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# DRF fields whose to_representation() returns database values unchanged.
+_IDENTITY_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.FloatField, serializers.JSONField,
+)
+
+SOCIAL_COLUMNS = ('twitter', 'instagram', 'spotify', 'soundcloud')
+
+# SerializerMethodFields by name: (columns they read, builder over a row).
+METHOD_FIELDS = {
+    'social_links': (
+        SOCIAL_COLUMNS,
+        lambda row: {name: row[name] for name in SOCIAL_COLUMNS},
+    ),
+}
+
+
+def _is_iso_datetime(field):
+    if not isinstance(field, serializers.DateTimeField) or hasattr(field, 'timezone'):
+        return False
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return output_format is not None and output_format.lower() == ISO_8601
+
+
+def _iso_datetime(tz, fallback):
+    """DateTimeField.to_representation for aware values, with *tz* resolved up front."""
+    def convert(value):
+        if value.tzinfo is None:
+            return fallback(value)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _converter(field):
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+        return str
+    if isinstance(field, _IDENTITY_FIELDS) and not getattr(field, 'binary', False):
+        return None     # copied as is
+    return field.to_representation
+
+
+class FastReadSerializer:
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._mappers   = []
+        self._datetimes = []    # indexes into _mappers of ISO datetime fields
+        self._by_tz     = {}
+        columns         = []
+
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in METHOD_FIELDS:
+                    raise ImproperlyConfigured(
+                        f"{serializer_class.__name__}.{name} has no fast-path builder in METHOD_FIELDS"
+                    )
+                method_columns, builder = METHOD_FIELDS[name]
+                columns.extend(method_columns)
+                self._mappers.append((name, None, builder))
+                continue
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} reads a related object; use a *_id source"
+                )
+            if _is_iso_datetime(field):
+                self._datetimes.append(len(self._mappers))
+            columns.append(field.source)
+            self._mappers.append((name, field.source, _converter(field)))
+
+        pk_name = serializer_class.Meta.model._meta.pk.name
+        self.columns = list(dict.fromkeys([pk_name, *columns]))
+
+    def values(self, queryset, *extra):
+        """*queryset* as dict rows with the needed columns plus any *extra* ones."""
+        return queryset.values(*dict.fromkeys([*self.columns, *extra]))
+
+    def _current_mappers(self):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        if tz is None or not self._datetimes:
+            return self._mappers
+        mappers = self._by_tz.get(tz)
+        if mappers is None:
+            mappers = list(self._mappers)
+            for index in self._datetimes:
+                name, column, fallback = mappers[index]
+                mappers[index] = (name, column, _iso_datetime(tz, fallback))
+            self._by_tz[tz] = mappers
+        return mappers
+
+    @staticmethod
+    def _serialize_row(row, mappers):
+        data = {}
+        for name, column, convert in mappers:
+            if convert is None:
+                data[name] = row[column]
+            elif column is None:
+                data[name] = convert(row)
+            else:
+                value = row[column]
+                data[name] = None if value is None else convert(value)
+        return data
+
+    def serialize_one(self, row):
+        return self._serialize_row(row, self._current_mappers())
+
+    def serialize(self, rows):
+        mappers   = self._current_mappers()
+        serialize = self._serialize_row
+        return [serialize(row, mappers) for row in rows]
+
+
+_compiled = {}
+_lock     = threading.Lock()
+
+
+def get(serializer_class):
+    fast = _compiled.get(serializer_class)
+    if fast is None:
+        with _lock:
+            fast = _compiled.setdefault(serializer_class, FastReadSerializer(serializer_class))
+    return fast
+
+
+def for_endpoint(name, serializer_class):
+    if getattr(settings, 'FAST_SERIALIZERS', {}).get(name, False):
+        return get(serializer_class)
+    return None
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from musewave.models import Track
+from musewave.services import audio_analysis
+
+
+class Command(BaseCommand):
+    help = 'Analyse track audio inline: duration, format, size, loudness and waveform'
+
+    def add_arguments(self, parser):
+        parser.add_argument('track_ids', nargs='*', help='Tracks to analyse (default: all not yet analysed)')
+        parser.add_argument('--all', action='store_true', help='Re-analyse every track with audio')
+
+    def handle(self, *args, **options):
+        tracks = Track.objects.exclude(audio_url__isnull=True).exclude(audio_url='').exclude(audio_fileforge_id=None)
+        if options['track_ids']:
+            tracks = tracks.filter(id__in=options['track_ids'])
+        elif not options['all']:
+            tracks = tracks.filter(analyzed_at__isnull=True)
+
+        analysed = failed = 0
+        for track_id in tracks.values_list('id', flat=True).iterator():
+            try:
+                result = audio_analysis.analyze_track(track_id)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'{track_id}: {exc}')
+                continue
+            if result is not None:
+                analysed += 1
+                self.stdout.write(
+                    f"{track_id}: {result['duration']:.1f}s {result['format']} "
+                    f"{result['loudness']} dBFS"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Analysed {analysed} tracks ({failed} failed).'))
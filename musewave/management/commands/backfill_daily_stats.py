@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from musewave.services.stats import backfill_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TrackDailyStats rollup from Play history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--track', action='append', dest='track_ids', metavar='TRACK_ID',
+            help='Only rebuild this track (may be given more than once)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Backfilling daily track stats...')
+        written = backfill_daily_stats(options['track_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily stats rows.'))
@@ -0,0 +1,131 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from musewave import fast_serializers
+from musewave.models import User, Track, Play
+from musewave.serializers import TrackSerializer, PublicUserSerializer, PlaySerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Time DRF serializers against the fast read path on synthetic rows and '
+        'check both render byte-identical JSON.  Nothing is left in the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per payload (default: 500)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows < 1 or repeat < 1:
+            raise CommandError('--rows and --repeat must be positive')
+
+        try:
+            with transaction.atomic():
+                users, tracks, plays = self._populate(rows)
+                cases = [
+                    ('TrackSerializer', TrackSerializer, tracks),
+                    ('PublicUserSerializer', PublicUserSerializer, users),
+                    ('PlaySerializer', PlaySerializer, plays),
+                ]
+                header = (
+                    f"{'serializer':<22} {'stage':<10} {'rows':>6} "
+                    f"{'drf µs/row':>11} {'fast µs/row':>12} {'speedup':>8}"
+                )
+                self.stdout.write(header)
+                self.stdout.write('-' * len(header))
+                for name, serializer_class, queryset in cases:
+                    self._compare(name, serializer_class, queryset, repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _populate(self, rows):
+        now   = timezone.now()
+        users = [
+            User(
+                username=f'bench_{uuid.uuid4().hex[:12]}', email=f'{uuid.uuid4().hex}@bench.invalid',
+                password='!', display_name=f'Bench Artist {i}', bio='Synthetic benchmark user',
+                twitter='@bench' if i % 2 else None, location='Accra',
+            )
+            for i in range(rows)
+        ]
+        User.objects.bulk_create(users)
+
+        tracks = [
+            Track(
+                user=users[i % len(users)], title=f'Bench Track {i}', artist='Bench Artist',
+                artist_slug='bench-artist', genre=random.choice(['House', 'Afrobeats', 'Jazz']),
+                mood='Happy' if i % 3 else None, tags=['bench', f'tag{i % 7}'],
+                audio_url='https://files.example.com/audio.mp3', audio_duration=180.5 + i,
+                bpm=90 + i % 60 if i % 4 else None, published=True, published_at=now,
+            )
+            for i in range(rows)
+        ]
+        Track.objects.bulk_create(tracks)
+
+        plays = [
+            Play(
+                user=users[i % len(users)] if i % 5 else None, track=tracks[i % len(tracks)],
+                duration=30.25, completed=bool(i % 2), ip_address='203.0.113.7',
+                user_agent='bench/1.0', created_at=now,
+            )
+            for i in range(rows)
+        ]
+        Play.objects.bulk_create(plays)
+
+        return (
+            User.objects.filter(id__in=[u.id for u in users]).order_by('created_at', 'id'),
+            Track.objects.filter(id__in=[t.id for t in tracks]).order_by('created_at', 'id'),
+            Play.objects.filter(id__in=[p.id for p in plays]).order_by('created_at', 'id'),
+        )
+
+    def _compare(self, name, serializer_class, queryset, repeat):
+        """
+        Time two stages: ``serialize`` (rows already fetched, serialize and
+        render) and ``total`` (fetch, serialize and render, as a view does).
+        """
+        renderer = JSONRenderer()
+        fast     = fast_serializers.get(serializer_class)
+        objects  = list(queryset)
+        rows     = list(fast.values(queryset))
+
+        if renderer.render(serializer_class(objects, many=True).data) != renderer.render(fast.serialize(rows)):
+            raise CommandError(f'{name}: fast path output differs from DRF')
+
+        stages = [
+            ('serialize',
+             lambda: renderer.render(serializer_class(objects, many=True).data),
+             lambda: renderer.render(fast.serialize(rows))),
+            ('total',
+             lambda: renderer.render(serializer_class(list(queryset), many=True).data),
+             lambda: renderer.render(fast.serialize(list(fast.values(queryset))))),
+        ]
+        count = len(objects)
+        for stage, drf, fast_path in stages:
+            drf_time  = self._best(drf, repeat)
+            fast_time = self._best(fast_path, repeat)
+            self.stdout.write(
+                f"{name:<22} {stage:<10} {count:>6} {drf_time / count * 1e6:>11.1f} "
+                f"{fast_time / count * 1e6:>12.1f} {drf_time / fast_time:>7.1f}x"
+            )
+
+    @staticmethod
+    def _best(func, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        return best
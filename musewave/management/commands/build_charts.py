@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from musewave.services import charts
+
+
+class Command(BaseCommand):
+    help = 'Publish daily and weekly chart snapshots for closed windows that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=1,
+            help='Also backfill the charts of this many past days (default: the CHARTS catch_up windows)',
+        )
+
+    def handle(self, *args, **options):
+        today   = timezone.now().date()
+        written = 0
+        # Oldest first, so each chart can compare against the one before it.
+        for offset in range(options['days'], 0, -1):
+            day = today - timedelta(days=offset)
+            written += charts.build('daily', day)
+            if day.weekday() == 6:
+                written += charts.build('weekly', day)
+        written += charts.build_due(today)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} chart entries.'))
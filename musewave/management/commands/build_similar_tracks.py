@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from musewave.services.similar import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Compute co-listening neighbours for GET /api/tracks/<id>/similar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute every track instead of only those whose audience changed',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Computing similar tracks...')
+        written = rebuild(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote neighbours for {written} tracks.'))
@@ -0,0 +1,41 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from musewave.cache_backends import TieredCache
+
+
+class Command(BaseCommand):
+    help = 'Report tiered cache hit ratios per key prefix, summed over all processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default', help='Cache alias (default: default)')
+        parser.add_argument('--reset', action='store_true', help='Clear the collected statistics')
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not isinstance(cache, TieredCache):
+            raise CommandError(f"Cache '{options['alias']}' is not a TieredCache")
+
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Cache statistics cleared.'))
+            return
+
+        report = cache.stats_report()
+        if not report:
+            self.stdout.write('No cache statistics recorded yet.')
+            return
+
+        header = f"{'prefix':<32} {'requests':>10} {'local':>9} {'shared':>9} {'negative':>9} {'miss':>9} {'hit %':>7}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        rows = sorted(report.items(), key=lambda item: -sum(item[1].values()))
+        for prefix, counts in rows:
+            total = sum(counts.values())
+            hits  = total - counts['misses']
+            ratio = 100.0 * hits / total if total else 0.0
+            self.stdout.write(
+                f"{prefix[:32]:<32} {total:>10} {counts['local_hits']:>9} {counts['shared_hits']:>9} "
+                f"{counts['negative_hits']:>9} {counts['misses']:>9} {ratio:>6.1f}%"
+            )
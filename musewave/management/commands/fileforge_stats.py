@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from musewave.services import fileforge
+
+
+def _bound(ms):
+    if ms is None:
+        return '-'
+    return f'>{fileforge.LATENCY_BUCKETS[-1]}' if ms == float('inf') else f'<={ms}'
+
+
+class Command(BaseCommand):
+    help = 'Report FileForge call counts, latencies and circuit breaker states, summed over all processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ping', action='store_true', help='Call the health endpoint first')
+        parser.add_argument('--reset', action='store_true', help='Clear the collected metrics')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            fileforge.reset_metrics()
+            self.stdout.write(self.style.SUCCESS('FileForge metrics cleared.'))
+            return
+
+        if options['ping']:
+            try:
+                self.stdout.write(f'health: {fileforge.health()}')
+            except fileforge.FileForgeError as exc:
+                self.stderr.write(f'health: {exc}')
+
+        report = fileforge.metrics_report()
+        if not report['operations']:
+            self.stdout.write('No FileForge calls recorded yet.')
+            return
+
+        header = f"{'operation':<16} {'calls':>8} {'errors':>7} {'retries':>8} {'rejected':>9} {'mean ms':>9} {'p50':>7} {'p95':>7} {'p99':>7}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for operation, row in sorted(report['operations'].items()):
+            mean = f"{row['mean_ms']:.1f}" if row['mean_ms'] is not None else '-'
+            self.stdout.write(
+                f"{operation:<16} {row['calls']:>8} {row['errors']:>7} {row['retries']:>8} {row['rejected']:>9} "
+                f"{mean:>9} {_bound(row['p50_ms']):>7} {_bound(row['p95_ms']):>7} {_bound(row['p99_ms']):>7}"
+            )
+
+        self.stdout.write('')
+        for process, state in sorted(report['breakers'].items()):
+            self.stdout.write(f'breaker {process}: {state}')
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from musewave.models import Track
+from musewave.services import waveforms
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy waveforms from the legacy tracks.waveform_data column into TrackWaveform rows. '
+        'Run it before applying the migration that drops the column.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        table = Track._meta.db_table
+        with connection.cursor() as cursor:
+            columns = {col.name for col in connection.introspection.get_table_description(cursor, table)}
+        if 'waveform_data' not in columns:
+            self.stdout.write(f'{table}.waveform_data does not exist; nothing to import.')
+            return
+
+        imported = skipped = 0
+        last_id  = None
+        quote    = connection.ops.quote_name
+        while True:
+            sql    = f"SELECT {quote('id')}, {quote('waveform_data')} FROM {quote(table)} WHERE {quote('waveform_data')} IS NOT NULL"
+            params = []
+            if last_id is not None:
+                sql += f" AND {quote('id')} > %s"
+                params.append(last_id)
+            sql += f" ORDER BY {quote('id')} LIMIT {int(options['batch_size'])}"
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                batch = cursor.fetchall()
+            if not batch:
+                break
+
+            for track_id, raw in batch:
+                peaks = waveforms.parse_peaks(raw)
+                if peaks:
+                    waveforms.set_waveform(Track(pk=Track._meta.pk.to_python(track_id)), peaks)
+                    imported += 1
+                else:
+                    skipped += 1
+            last_id = batch[-1][0]
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} waveforms ({skipped} unparseable skipped).'))
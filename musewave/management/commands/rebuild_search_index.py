@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from musewave.services.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for tracks and users'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write('Rebuilding search index...')
+        counts = get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {counts['tracks']} tracks and {counts['users']} users."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from musewave.services.trending import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the time-decayed trending scores from recent plays, likes and downloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14, help='Days of history to replay (default 14)')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding trending scores...')
+        written = rebuild(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Scored {written} tracks.'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django_q.models import Schedule
+
+
+# (name, func, schedule_type, minutes)
+SCHEDULES = [
+    ('Fold counter shards',       'musewave.tasks.fold_counter_shards',       Schedule.MINUTES, 1),
+    ('Reconcile track counters',  'musewave.tasks.reconcile_track_counters',  Schedule.DAILY,   None),
+    ('Refresh monthly listeners', 'musewave.tasks.refresh_monthly_listeners', Schedule.HOURLY,  None),
+    ('Sweep pending uploads',     'musewave.tasks.sweep_pending_uploads',     Schedule.MINUTES, 1),
+    ('Drain FileForge deletions', 'musewave.tasks.drain_file_deletions',      Schedule.MINUTES, 1),
+    ('Build charts',              'musewave.tasks.build_charts',              Schedule.HOURLY,  None),
+    ('Refresh similar tracks',    'musewave.tasks.refresh_similar_tracks',    Schedule.HOURLY,  None),
+    ('Rebuild similar tracks',    'musewave.tasks.rebuild_similar_tracks',    Schedule.WEEKLY,  None),
+    ('Prune trending scores',     'musewave.tasks.prune_trending',            Schedule.DAILY,   None),
+    ('Prune feed',                'musewave.tasks.prune_feed',                Schedule.DAILY,   None),
+]
+
+
+class Command(BaseCommand):
+    help = 'Create or update the django-q2 schedules for periodic MuseWave jobs'
+
+    def handle(self, *args, **kwargs):
+        for name, func, schedule_type, minutes in SCHEDULES:
+            _, created = Schedule.objects.update_or_create(
+                name=name,
+                defaults={
+                    'func':          func,
+                    'schedule_type': schedule_type,
+                    'minutes':       minutes,
+                    'repeats':       -1,
+                },
+            )
+            self.stdout.write(f"{'Created' if created else 'Updated'} schedule: {name}")
+
+        self.stdout.write(self.style.SUCCESS('Schedules are up to date.'))
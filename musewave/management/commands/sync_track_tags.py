@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from musewave.services.tags import sync_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Tag/TrackTag index from Track.tags'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Syncing track tags...')
+        synced = sync_all()
+        self.stdout.write(self.style.SUCCESS(f'Synced tags for {synced} tracks.'))
@@ -59,6 +59,9 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     class Meta:
         db_table = "users"
+        indexes = [
+            models.Index(fields=['-created_at']),
+        ]
 
 
 class Album(models.Model):
@@ -104,11 +107,14 @@ class Track(models.Model):
     audio_duration     = models.FloatField()
     audio_format       = models.CharField(max_length=20, blank=True, null=True)
 
+    # Filled in by server-side analysis (services/audio_analysis.py).
+    loudness    = models.FloatField(blank=True, null=True)
+    analyzed_at = models.DateTimeField(blank=True, null=True)
+
     cover_url          = models.URLField(blank=True, null=True)
     cover_fileforge_id = models.IntegerField(blank=True, null=True)
 
     cover_gradient = models.CharField(max_length=255, blank=True, null=True)
-    waveform_data  = models.TextField(blank=True, null=True)
 
     bpm = models.IntegerField(blank=True, null=True, validators=[MinValueValidator(1)])
     key = models.CharField(max_length=10, blank=True, null=True)
@@ -137,6 +143,86 @@ class Track(models.Model):
         return f"{self.artist} - {self.title}"
 
 
+class Tag(models.Model):
+    """
+    Normalised tag.  ``Track.tags`` stays the source of truth for the API;
+    ``TrackTag`` rows mirror it so tag filters are indexed lookups instead of
+    JSON scans (see services/tags.py).
+    """
+    id         = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name       = models.CharField(max_length=50)
+    slug       = models.SlugField(max_length=50, unique=True, allow_unicode=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'tags'
+        ordering = ['slug']
+
+    def __str__(self):
+        return self.name
+
+
+class TrackTag(models.Model):
+    id    = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    track = models.ForeignKey(Track, on_delete=models.CASCADE, related_name='track_tags')
+    tag   = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='track_tags')
+
+    class Meta:
+        db_table = 'track_tags'
+        unique_together = ['track', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'track']),
+        ]
+
+    def __str__(self):
+        return f"{self.track_id} #{self.tag_id}"
+
+
+class TrackWaveform(models.Model):
+    """
+    Waveform peaks of a track at one resolution, packed as unsigned 8- or
+    16-bit integers.  Kept out of the ``tracks`` row so list queries don't
+    carry them; served by ``GET /api/tracks/<id>/waveform`` (see
+    services/waveforms.py).
+    """
+    id         = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    track      = models.ForeignKey(Track, on_delete=models.CASCADE, related_name='waveforms')
+    resolution = models.PositiveIntegerField()
+    bits       = models.PositiveSmallIntegerField(default=8)
+    peaks      = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'track_waveforms'
+        unique_together = ['track', 'resolution']
+
+    def __str__(self):
+        return f"{self.track_id} @{self.resolution}"
+
+
+class TrackCounterShard(models.Model):
+    """
+    Pending delta for one of a track's denormalised counters.
+
+    Writers add to a randomly chosen shard instead of updating the ``Track``
+    row, so concurrent likes/downloads on a popular track don't serialise on
+    a single row.  Shards are periodically folded into the ``Track`` columns
+    (see services/counters.py).
+    """
+    id    = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    track = models.ForeignKey(Track, on_delete=models.CASCADE, related_name='counter_shards')
+    field = models.CharField(max_length=20)
+    shard = models.PositiveSmallIntegerField()
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'track_counter_shards'
+        unique_together = ['track', 'field', 'shard']
+
+    def __str__(self):
+        return f"{self.track_id} {self.field}[{self.shard}] = {self.value}"
+
+
 class Like(models.Model):
     id         = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user       = models.ForeignKey(User, on_delete=models.CASCADE, related_name='likes')
@@ -147,6 +233,9 @@ class Like(models.Model):
         db_table = 'likes'
         unique_together = ['user', 'track']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} likes {self.track.title}"
@@ -163,6 +252,9 @@ class Download(models.Model):
     class Meta:
         db_table = 'downloads'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['track', '-created_at']),
+        ]
 
     def __str__(self):
         return f"Download of {self.track.title}"
@@ -176,16 +268,168 @@ class Play(models.Model):
     completed  = models.BooleanField(default=False)
     ip_address = models.GenericIPAddressField(blank=True, null=True)
     user_agent = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Plays are written in batches (see services/play_buffer.py), so the
+    # timestamp is taken when the event is recorded, not when it is inserted.
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = 'plays'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['track', '-created_at']),
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['track', 'user']),
+        ]
 
     def __str__(self):
         return f"Play of {self.track.title}"
 
 
+class TrackDailyStats(models.Model):
+    """
+    Per-track, per-day rollup of ``Play`` rows, maintained as plays are
+    flushed (see services/stats.py).  ``listener_sketch`` is a HyperLogLog
+    sketch of the day's listeners; sketches merge across days and tracks.
+    """
+    id               = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    track            = models.ForeignKey(Track, on_delete=models.CASCADE, related_name='daily_stats')
+    date             = models.DateField()
+    plays            = models.IntegerField(default=0)
+    unique_listeners = models.IntegerField(default=0)
+    total_duration   = models.FloatField(default=0)
+    completions      = models.IntegerField(default=0)
+    listener_sketch  = models.BinaryField(blank=True, null=True)
+    updated_at       = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'track_daily_stats'
+        unique_together = ['track', 'date']
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.track_id} on {self.date}: {self.plays} plays"
+
+
+class TrackReach(models.Model):
+    """All-time HyperLogLog listener sketch for a track and its current estimate."""
+    track            = models.OneToOneField(Track, on_delete=models.CASCADE, primary_key=True, related_name='reach')
+    listener_sketch  = models.BinaryField()
+    unique_listeners = models.IntegerField(default=0)
+    updated_at       = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'track_reach'
+
+    def __str__(self):
+        return f"{self.track_id}: ~{self.unique_listeners} listeners"
+
+
+class TrackTrending(models.Model):
+    """
+    Time-decayed engagement score behind ``GET /api/trending`` (see
+    services/trending.py).  ``score`` is stored in the log domain against a
+    fixed epoch so rows never need re-decaying and the ranking is an index
+    scan; ``genre``/``mood``/``published`` are copied from the track
+    (lower-cased) so the filtered rankings are index scans too.
+    """
+    track      = models.OneToOneField(Track, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score      = models.FloatField()
+    genre      = models.CharField(max_length=50)
+    mood       = models.CharField(max_length=50, blank=True, default='')
+    published  = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'track_trending'
+        indexes = [
+            models.Index(fields=['published', '-score']),
+            models.Index(fields=['published', 'genre', '-score']),
+            models.Index(fields=['published', 'mood', '-score']),
+        ]
+
+    def __str__(self):
+        return f"{self.track_id}: {self.score:.3f}"
+
+
+class TrackSimilarity(models.Model):
+    """
+    Precomputed co-listening neighbours of a track (see services/similar.py):
+    ``neighbors`` is ``[[track_id, cosine], …]``, most similar first.
+    """
+    track       = models.OneToOneField(Track, on_delete=models.CASCADE, primary_key=True, related_name='similarity')
+    neighbors   = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'track_similarity'
+
+    def __str__(self):
+        return f"{len(self.neighbors)} neighbours of {self.track_id}"
+
+
+class ChartEntry(models.Model):
+    """
+    One position in a published chart snapshot (see services/charts.py).
+    A chart is every row sharing ``(period, genre, period_start)``; ``genre``
+    is lower-cased, ``''`` for the overall chart.  ``rank_delta`` is the
+    places climbed since the previous chart (negative when falling) and, like
+    ``previous_rank``, ``None`` for new entries.  Rows are written once when
+    the window closes and never updated.
+    """
+    PERIOD_DAILY  = 'daily'
+    PERIOD_WEEKLY = 'weekly'
+    PERIOD_CHOICES = [
+        (PERIOD_DAILY,  'Daily'),
+        (PERIOD_WEEKLY, 'Weekly'),
+    ]
+
+    id            = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    period        = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start  = models.DateField()
+    genre         = models.CharField(max_length=50, blank=True, default='')
+    rank          = models.PositiveIntegerField()
+    track         = models.ForeignKey(Track, on_delete=models.CASCADE, related_name='chart_entries')
+    plays         = models.IntegerField()
+    previous_rank = models.PositiveIntegerField(blank=True, null=True)
+    rank_delta    = models.IntegerField(blank=True, null=True)
+    created_at    = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'chart_entries'
+        unique_together = [('period', 'genre', 'period_start', 'rank'), ('period', 'genre', 'period_start', 'track')]
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"#{self.rank} {self.period} {self.genre or 'overall'} {self.period_start}"
+
+
+class ArtistStats(models.Model):
+    """
+    Materialised per-artist totals served by ``GET /api/users/<id>/stats``.
+
+    Kept current incrementally from the play, counter and follow write paths
+    (see services/stats.py); ``monthly_listeners`` is refreshed by a scheduled
+    job and stamped with ``listeners_updated_at``.
+    """
+    user              = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='artist_stats')
+    total_tracks      = models.IntegerField(default=0)
+    total_plays       = models.IntegerField(default=0)
+    total_likes       = models.IntegerField(default=0)
+    total_downloads   = models.IntegerField(default=0)
+    total_followers   = models.IntegerField(default=0)
+    total_following   = models.IntegerField(default=0)
+    monthly_listeners = models.IntegerField(default=0)
+
+    listeners_updated_at = models.DateTimeField(blank=True, null=True)
+    updated_at           = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'artist_stats'
+
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+
+
 class Follow(models.Model):
     id         = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     follower   = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
@@ -201,6 +445,31 @@ class Follow(models.Model):
         return f"{self.follower.username} follows {self.following.username}"
 
 
+class FeedItem(models.Model):
+    """
+    A published track pushed into a follower's home feed (see services/feed.py).
+    ``published_at`` is copied from the track so a page is one range scan on
+    ``(user, -published_at, -track)``.
+    """
+    id           = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user         = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_items')
+    track        = models.ForeignKey(Track, on_delete=models.CASCADE, related_name='feed_items')
+    artist       = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    published_at = models.DateTimeField()
+    created_at   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'feed_items'
+        unique_together = ['user', 'track']
+        indexes = [
+            models.Index(fields=['user', '-published_at', '-track']),
+            models.Index(fields=['user', 'artist']),
+        ]
+
+    def __str__(self):
+        return f"{self.track_id} in {self.user_id}'s feed"
+
+
 class Playlist(models.Model):
     id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user        = models.ForeignKey(User, on_delete=models.CASCADE, related_name='playlists')
@@ -250,3 +519,77 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.track.title}"
+
+
+class PendingUpload(models.Model):
+    """
+    A FileForge upload that has been handed off but not yet attached to its
+    object (see services/uploads.py).  ``target`` names the model and field,
+    e.g. ``track_audio`` → ``Track.audio_url`` / ``Track.audio_fileforge_id``.
+    """
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED  = 'completed'
+    STATUS_FAILED     = 'failed'
+    STATUS_SUPERSEDED = 'superseded'
+    STATUS_CHOICES = [
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_COMPLETED,  'Completed'),
+        (STATUS_FAILED,     'Failed'),
+        (STATUS_SUPERSEDED, 'Superseded'),
+    ]
+
+    id             = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user           = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads')
+    target         = models.CharField(max_length=20)
+    object_id      = models.UUIDField()
+    strategy       = models.CharField(max_length=10)
+    fileforge_id   = models.IntegerField()
+    status         = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_PROCESSING)
+    error_message  = models.TextField(blank=True, default='')
+    created_at     = models.DateTimeField(auto_now_add=True)
+    updated_at     = models.DateTimeField(auto_now=True)
+    completed_at   = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'pending_uploads'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['target', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.target} {self.object_id} ({self.status})"
+
+
+class PendingFileDeletion(models.Model):
+    """
+    Outbox of FileForge files to delete (see services/file_deletions.py).
+    Rows are written in the same transaction as the change that orphaned the
+    file and removed once FileForge confirms the deletion; rows that keep
+    failing are kept as ``dead`` for inspection.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DEAD    = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DEAD,    'Dead'),
+    ]
+
+    id              = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fileforge_id    = models.IntegerField()
+    reason          = models.CharField(max_length=30)
+    status          = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts        = models.PositiveIntegerField(default=0)
+    last_error      = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by      = models.UUIDField(blank=True, null=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pending_file_deletions'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"FileForge file {self.fileforge_id} ({self.reason}, {self.status})"
@@ -0,0 +1,126 @@
+"""
+Pagination helpers for list endpoints.
+
+Two modes are supported:
+
+* **Offset** (legacy) — ``?limit=&offset=``.  The response is a bare list.
+  Cost grows with the offset, so this is only kept for compatibility.
+* **Cursor** — pass ``?cursor=`` (empty for the first page) and follow the
+  returned ``next_cursor``.  The response is
+  ``{"results": [...], "next_cursor": "..." | null}``.  Each page is a
+  range scan on an index such as ``(track, -created_at)``, so deep pages cost
+  the same as the first one.
+
+Cursors are opaque URL-safe strings encoding the sort key of the last row
+returned plus its primary key as a tie-breaker.  Rows may be model instances
+or ``.values()`` dicts.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT     = 200
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded or does not match the ordering."""
+
+
+def get_limit(request, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def get_offset(request):
+    try:
+        return max(0, int(request.GET.get('offset', 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def wants_cursor(request):
+    return 'cursor' in request.GET
+
+
+def _ordering(queryset, order_field):
+    """Full keyset ordering: the sort field followed by the pk in the same direction."""
+    descending = order_field.startswith('-')
+    pk_name    = queryset.model._meta.pk.name
+    return [order_field, f'-{pk_name}' if descending else pk_name]
+
+
+def encode_cursor(obj, ordering):
+    values = []
+    for name in ordering:
+        field = name.lstrip('-')
+        value = obj[field] if isinstance(obj, dict) else getattr(obj, field)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+    payload = json.dumps([ordering, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        padded  = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_ordering, raw_values = payload
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor('Malformed cursor')
+
+    if cursor_ordering != ordering or len(raw_values) != len(ordering):
+        raise InvalidCursor('Cursor does not match the requested ordering')
+
+    values = []
+    for name, raw in zip(ordering, raw_values):
+        try:
+            values.append(model._meta.get_field(name.lstrip('-')).to_python(raw))
+        except ValidationError:
+            raise InvalidCursor('Malformed cursor')
+    return values
+
+
+def _after(ordering, values):
+    """Q selecting rows strictly after *values* in *ordering*."""
+    condition = Q()
+    equal     = {}
+    for name, value in zip(ordering, values):
+        field  = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    return condition
+
+
+def paginate_cursor(queryset, request, order_field='-created_at', limit=None):
+    """
+    Return ``(rows, next_cursor)`` for the page after ``request.GET['cursor']``.
+    Raises ``InvalidCursor`` for a bad cursor.
+    """
+    ordering = _ordering(queryset, order_field)
+    limit    = limit or get_limit(request)
+    cursor   = request.GET.get('cursor')
+
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1], ordering) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def paginate_offset(queryset, request, order_field=None, limit=None):
+    """Return the ``?limit=&offset=`` slice of *queryset*."""
+    if order_field:
+        queryset = queryset.order_by(*_ordering(queryset, order_field))
+    limit  = limit or get_limit(request)
+    offset = get_offset(request)
+    return queryset[offset:offset + limit]
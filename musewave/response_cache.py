@@ -0,0 +1,186 @@
+"""
+Response cache for public read endpoints.
+
+``@cached_response`` goes *under* ``@api_view`` / ``@permission_classes`` so
+authentication and permission checks still run on every request; only the ORM
+queries and serialization are skipped on a hit.  Only ``GET``/``HEAD``
+requests that produce a ``200`` are cached.
+
+Keys
+----
+A cache key is the view name, the path and the query parameters normalised
+by sorting them and dropping empty values, so ``?b=2&a=1&c=`` and ``?a=1&b=2``
+share an entry.
+
+Invalidation
+------------
+Each entry is stored with the tags it depends on (``track:<id>``, ``user:<id>``,
+``album:<id>`` and the collection tags ``tracks`` / ``users``) and the token
+each tag had when the entry was written.  ``invalidate(*tags)`` gives the tags
+new tokens, which makes every entry that depends on them a miss.  The signal
+handlers in ``musewave/signals.py`` call it after a Track/User/Album save or
+delete commits.  A tag whose token was evicted also counts as changed, so
+eviction can only cause a miss, never a stale hit.
+
+Engagement counters (plays, likes, downloads) are written with ``F()``
+updates and never fire a signal.  The cache timeout bounds how stale they get.
+Counter shards are folded about once a minute anyway.
+
+Conditional requests
+--------------------
+Every cached response carries an ``ETag`` (a hash of the payload) and a
+``Last-Modified`` (when the entry was filled).  ``If-None-Match`` and
+``If-Modified-Since`` are answered with ``304 Not Modified``.
+
+Configuration (``settings.RESPONSE_CACHE``)
+-------------------------------------------
+enabled : bool
+timeout : int
+    Seconds an entry lives.
+
+Public API
+----------
+cached_response(*tags, data_tags=None, timeout=None)
+    View decorator.  *tags* are templates formatted with the view's URL
+    kwargs (``'track:{track_id}'``).  *data_tags* is an optional callable
+    returning extra tags from the response data.
+
+invalidate(*tags) -> None
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rc'
+
+_DEFAULTS = {
+    'enabled': True,
+    'timeout': 60,
+}
+
+
+def _config(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, _DEFAULTS[name])
+
+
+def _tag_key(tag):
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def _entry_key(view_name, request):
+    params = sorted(
+        (name, [value for value in values if value != ''])
+        for name, values in request.GET.lists()
+    )
+    params = [(name, values) for name, values in params if values]
+    raw    = json.dumps([request.path, params], separators=(',', ':'))
+    return f'{KEY_PREFIX}:{view_name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def _tag_tokens(tags):
+    """Current token of each tag, creating tokens for tags that have none."""
+    keys   = {_tag_key(tag): tag for tag in tags}
+    found  = cache.get_many(list(keys))
+    tokens = {keys[key]: token for key, token in found.items()}
+    for key, tag in keys.items():
+        if tag not in tokens:
+            cache.add(key, uuid.uuid4().hex, None)
+            tokens[tag] = cache.get(key)
+    return tokens
+
+
+def _is_current(entry):
+    keys  = [_tag_key(tag) for tag in entry['tags']]
+    found = cache.get_many(keys)
+    return all(
+        found.get(_tag_key(tag)) == token
+        for tag, token in entry['tags'].items()
+    )
+
+
+def _etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(payload.encode()).hexdigest())
+
+
+def _respond(request, entry):
+    response = Response(entry['data'])
+    response['ETag']          = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'], response=response,
+    )
+
+
+def cached_response(*tags, data_tags=None, timeout=None):
+    def decorator(view):
+        view_name = view.__name__
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not _config('enabled'):
+                return view(request, *args, **kwargs)
+
+            key    = _entry_key(view_name, request)
+            tokens = None
+            try:
+                entry = cache.get(key)
+                if entry is not None and _is_current(entry):
+                    return _respond(request, entry)
+                # Read the tokens before running the view: a change that
+                # commits while it runs then leaves the new entry stale.
+                tokens = _tag_tokens({tag.format(**kwargs) for tag in tags})
+            except Exception as exc:
+                logger.warning("Response cache read failed for %s: %s", view_name, exc)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or not isinstance(response, Response):
+                return response
+
+            entry = {
+                'data':          response.data,
+                'etag':          _etag(response.data),
+                'last_modified': int(time.time()),
+            }
+            if tokens is not None:
+                try:
+                    if data_tags is not None:
+                        tokens.update(_tag_tokens(set(data_tags(response.data)) - set(tokens)))
+                    entry['tags'] = tokens
+                    cache.set(key, entry, timeout or _config('timeout'))
+                except Exception as exc:
+                    logger.warning("Response cache write failed for %s: %s", view_name, exc)
+            return _respond(request, entry)
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate(*tags):
+    """Give *tags* fresh tokens once the current transaction commits."""
+    tags = [tag for tag in tags if tag]
+    if not tags:
+        return
+
+    def bump():
+        try:
+            cache.set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+        except Exception as exc:
+            logger.warning("Could not invalidate cached responses for %s: %s", tags, exc)
+
+    transaction.on_commit(bump)
@@ -8,45 +8,47 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 
-from .models import User, Track, Like, Download, Play, Follow, Playlist, PlaylistTrack, Comment, Album
+from .models import (
+    User, Track, Like, Download, Play, Follow, Playlist, PlaylistTrack, Comment, Album, PendingUpload,
+)
+from .response_cache import invalidate
+from .services import feed
+from .services import tags as tag_index
+from .services import uploads
+from .services import waveforms
 
 logger = logging.getLogger(__name__)
 
 
-# ─── FileForge upload helper ───────────────────────────────────────────────────
+# ─── FileForge upload helpers ──────────────────────────────────────────────────
 
-def _upload(file_obj, filename):
+def _upload(instance, target, file_obj):
     """
-    Upload *file_obj* to FileForge (sync mode).
-    Returns (url, fileforge_id) on success, or raises serializers.ValidationError.
+    Hand *file_obj* to FileForge for *instance*'s *target* field (see
+    services/uploads.py).  The URL is filled in once FileForge finishes, and
+    any file it replaces is deleted then.  Returns the ``PendingUpload``, or
+    raises serializers.ValidationError if FileForge refuses the file.
     """
-    from musewave.services.fileforge import upload_file, FileForgeError
+    from musewave.services.fileforge import FileForgeError
 
     try:
-        record = upload_file(file_obj, filename, provider="cloudinary")
+        return uploads.start(instance, target, file_obj)
     except FileForgeError as exc:
         raise serializers.ValidationError(f"File upload failed: {exc}")
 
-    url = record.get("url") or ""
-    fid = record.get("id")
-
-    if not url:
-        raise serializers.ValidationError(
-            f"FileForge upload succeeded but returned no URL (status={record.get('status')!r})"
-        )
-
-    return url, fid
 
+def _upload_many(instance, files, optional=()):
+    """
+    ``_upload`` for several ``{target: file_obj}`` (``None`` files skipped),
+    sent to FileForge in parallel.  If a required file fails, none of them
+    is attached and the ones already uploaded are deleted again.
+    """
+    from musewave.services.fileforge import FileForgeError
 
-def _delete_from_fileforge(fileforge_id):
-    """Silently attempt to delete a file from FileForge."""
-    if not fileforge_id:
-        return
-    from musewave.services.fileforge import delete_file
     try:
-        delete_file(fileforge_id)
-    except Exception as exc:
-        logger.warning("Could not delete FileForge file %s: %s", fileforge_id, exc)
+        return uploads.start_many(instance, files, optional=optional)
+    except FileForgeError as exc:
+        raise serializers.ValidationError(f"File upload failed: {exc}")
 
 
 # ─── User serializers ─────────────────────────────────────────────────────────
@@ -114,21 +116,7 @@ class UpdateUserSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
 
-        if avatar_file:
-            old_fid = instance.avatar_fileforge_id
-            url, fid = _upload(avatar_file, f"user_{instance.id}_avatar")
-            _delete_from_fileforge(old_fid)
-            instance.avatar_url = url
-            instance.avatar_fileforge_id = fid
-            instance.save(update_fields=['avatar_url', 'avatar_fileforge_id'])
-
-        if header_file:
-            old_fid = instance.header_fileforge_id
-            url, fid = _upload(header_file, f"user_{instance.id}_header")
-            _delete_from_fileforge(old_fid)
-            instance.header_url = url
-            instance.header_fileforge_id = fid
-            instance.save(update_fields=['header_url', 'header_fileforge_id'])
+        _upload_many(instance, {'user_avatar': avatar_file, 'user_header': header_file})
 
         return instance
 
@@ -176,10 +164,7 @@ class CreateUserSerializer(serializers.ModelSerializer):
 
         if avatar_file:
             try:
-                url, fid = _upload(avatar_file, f"user_{user.id}_avatar")
-                user.avatar_url = url
-                user.avatar_fileforge_id = fid
-                user.save(update_fields=['avatar_url', 'avatar_fileforge_id'])
+                _upload(user, 'user_avatar', avatar_file)
             except Exception as exc:
                 logger.warning("Avatar upload failed during signup for %s: %s", user.email, exc)
 
@@ -220,8 +205,26 @@ The MuseWave Team
 
 # ─── Album serializers ────────────────────────────────────────────────────────
 
+def set_album(tracks, album):
+    """
+    Move the *tracks* queryset to *album* (``None`` to detach them).  A bulk
+    ``update()`` sends no ``post_save``, so the cached responses the track
+    signal would have invalidated are invalidated here: the tracks, the
+    track lists, and every album they leave or join.
+    """
+    moved = list(tracks.exclude(album=album).values_list('id', 'album_id'))
+    if not moved:
+        return
+    Track.objects.filter(id__in=[track_id for track_id, _ in moved]).update(album=album)
+    invalidate(
+        'tracks', f'album:{album.pk}' if album else None,
+        *[f'track:{track_id}' for track_id, _ in moved],
+        *{f'album:{album_id}' for _, album_id in moved if album_id},
+    )
+
+
 class AlbumSerializer(serializers.ModelSerializer):
-    user_id     = serializers.UUIDField(source='user.id', read_only=True)
+    user_id     = serializers.UUIDField(read_only=True)
     track_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -234,7 +237,9 @@ class AlbumSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def get_track_count(self, obj):
-        return obj.tracks.count()
+        # List views annotate ``num_tracks`` so the count doesn't cost a query per album.
+        count = getattr(obj, 'num_tracks', None)
+        return obj.tracks.count() if count is None else count
 
 
 class CreateAlbumSerializer(serializers.ModelSerializer):
@@ -269,16 +274,13 @@ class CreateAlbumSerializer(serializers.ModelSerializer):
 
         if cover_file:
             try:
-                url, fid = _upload(cover_file, f"album_{album.id}_cover")
-                album.cover_url = url
-                album.cover_fileforge_id = fid
-                album.save(update_fields=['cover_url', 'cover_fileforge_id'])
+                _upload(album, 'album_cover', cover_file)
             except Exception as exc:
                 album.delete()
                 raise serializers.ValidationError(f"Cover upload failed: {exc}")
 
         if track_ids:
-            Track.objects.filter(id__in=track_ids).update(album=album)
+            set_album(Track.objects.filter(id__in=track_ids), album)
 
         return album
 
@@ -305,12 +307,7 @@ class UpdateAlbumSerializer(serializers.ModelSerializer):
         instance.save()
 
         if cover_file:
-            old_fid = instance.cover_fileforge_id
-            url, fid = _upload(cover_file, f"album_{instance.id}_cover")
-            _delete_from_fileforge(old_fid)
-            instance.cover_url = url
-            instance.cover_fileforge_id = fid
-            instance.save(update_fields=['cover_url', 'cover_fileforge_id'])
+            _upload(instance, 'album_cover', cover_file)
 
         if track_ids_raw is not None:
             if isinstance(track_ids_raw, str):
@@ -320,8 +317,8 @@ class UpdateAlbumSerializer(serializers.ModelSerializer):
                     track_ids = []
             else:
                 track_ids = track_ids_raw
-            Track.objects.filter(album=instance).update(album=None)
-            Track.objects.filter(id__in=track_ids).update(album=instance)
+            set_album(Track.objects.filter(album=instance).exclude(id__in=track_ids), None)
+            set_album(Track.objects.filter(id__in=track_ids), instance)
 
         return instance
 
@@ -329,29 +326,40 @@ class UpdateAlbumSerializer(serializers.ModelSerializer):
 # ─── Track serializers ────────────────────────────────────────────────────────
 
 class TrackSerializer(serializers.ModelSerializer):
-    user_id  = serializers.UUIDField(source='user.id', read_only=True)
-    album_id = serializers.UUIDField(source='album.id', read_only=True, allow_null=True)
+    user_id  = serializers.UUIDField(read_only=True)
+    album_id = serializers.UUIDField(read_only=True, allow_null=True)
 
     class Meta:
         model  = Track
         fields = [
             'id', 'user_id', 'album_id', 'title', 'artist', 'artist_slug', 'description',
             'genre', 'mood', 'tags', 'audio_url', 'audio_file_size',
-            'audio_duration', 'audio_format', 'cover_url', 'cover_gradient',
-            'waveform_data', 'bpm', 'key', 'plays', 'likes', 'downloads',
+            'audio_duration', 'audio_format', 'loudness', 'analyzed_at', 'cover_url', 'cover_gradient',
+            'bpm', 'key', 'plays', 'likes', 'downloads',
             'shares', 'published', 'published_at', 'created_at', 'updated_at',
         ]
         read_only_fields = [
-            'id', 'plays', 'likes', 'downloads', 'shares',
+            'id', 'loudness', 'analyzed_at', 'plays', 'likes', 'downloads', 'shares',
             'published_at', 'created_at', 'updated_at',
         ]
 
 
+def _validate_waveform_data(value):
+    if value is None:
+        return None
+    peaks = waveforms.parse_peaks(value)
+    if peaks is None:
+        raise serializers.ValidationError("waveform_data must be a list of numbers.")
+    return peaks
+
+
 class CreateTrackSerializer(serializers.ModelSerializer):
-    user_id    = serializers.UUIDField(write_only=True)
-    audio_file = serializers.FileField(write_only=True, required=False, allow_null=True)
-    cover_file = serializers.ImageField(write_only=True, required=False, allow_null=True)
-    tags       = serializers.JSONField(required=False)
+    user_id       = serializers.UUIDField(write_only=True)
+    audio_file    = serializers.FileField(write_only=True, required=False, allow_null=True)
+    cover_file    = serializers.ImageField(write_only=True, required=False, allow_null=True)
+    tags          = serializers.JSONField(required=False)
+    # Stored in TrackWaveform rows, served by GET /api/tracks/<id>/waveform.
+    waveform_data = serializers.JSONField(write_only=True, required=False, allow_null=True)
 
     class Meta:
         model  = Track
@@ -365,6 +373,8 @@ class CreateTrackSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'audio_url': {'required': False},
             'cover_url': {'required': False},
+            # Measured server-side when audio is attached (services/audio_analysis.py).
+            'audio_duration': {'required': False},
         }
 
     def validate_audio_duration(self, value):
@@ -372,12 +382,23 @@ class CreateTrackSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("audio_duration must be a positive number.")
         return value
 
+    def validate(self, attrs):
+        if 'audio_duration' not in attrs and not attrs.get('audio_file') and not attrs.get('audio_url'):
+            raise serializers.ValidationError(
+                {'audio_duration': "Required unless audio_file or audio_url is provided."}
+            )
+        return attrs
+
+    def validate_waveform_data(self, value):
+        return _validate_waveform_data(value)
+
     def create(self, validated_data):
         from django.utils import timezone
 
         user_id    = validated_data.pop('user_id')
         audio_file = validated_data.pop('audio_file', None)
         cover_file = validated_data.pop('cover_file', None)
+        peaks      = validated_data.pop('waveform_data', None)
         user       = User.objects.get(id=user_id)
 
         if isinstance(validated_data.get('tags'), str):
@@ -385,37 +406,35 @@ class CreateTrackSerializer(serializers.ModelSerializer):
                 validated_data['tags'] = json.loads(validated_data['tags'])
             except json.JSONDecodeError:
                 validated_data['tags'] = []
+        validated_data['tags'] = tag_index.parse_tags(validated_data.get('tags', []))
 
         if validated_data.get('published', False):
             validated_data['published_at'] = timezone.now()
 
-        track = Track.objects.create(user=user, **validated_data)
+        # Provisional until the audio has been analysed.
+        validated_data.setdefault('audio_duration', 0)
 
-        if audio_file:
-            try:
-                url, fid = _upload(audio_file, f"track_{track.id}_audio")
-                track.audio_url = url
-                track.audio_fileforge_id = fid
-                track.save(update_fields=['audio_url', 'audio_fileforge_id'])
-            except Exception as exc:
-                track.delete()
-                raise serializers.ValidationError(f"Audio upload failed: {exc}")
+        track = Track.objects.create(user=user, **validated_data)
+        tag_index.set_track_tags(track, track.tags)
+        if peaks:
+            waveforms.set_waveform(track, peaks)
 
-        if cover_file:
-            try:
-                url, fid = _upload(cover_file, f"track_{track.id}_cover")
-                track.cover_url = url
-                track.cover_fileforge_id = fid
-                track.save(update_fields=['cover_url', 'cover_fileforge_id'])
-            except Exception as exc:
-                logger.warning("Cover upload failed for track %s: %s", track.id, exc)
+        # A failed cover is tolerated; a failed audio upload discards the track.
+        try:
+            _upload_many(track, {'track_audio': audio_file, 'track_cover': cover_file}, optional=('track_cover',))
+        except Exception as exc:
+            track.delete()
+            raise serializers.ValidationError(f"Audio upload failed: {exc}")
+        if track.published:
+            feed.track_published(track)
 
         return track
 
 
 class UpdateTrackSerializer(serializers.ModelSerializer):
-    audio_file = serializers.FileField(write_only=True, required=False, allow_null=True)
-    cover_file = serializers.ImageField(write_only=True, required=False, allow_null=True)
+    audio_file    = serializers.FileField(write_only=True, required=False, allow_null=True)
+    cover_file    = serializers.ImageField(write_only=True, required=False, allow_null=True)
+    waveform_data = serializers.JSONField(write_only=True, required=False, allow_null=True)
 
     class Meta:
         model  = Track
@@ -431,11 +450,17 @@ class UpdateTrackSerializer(serializers.ModelSerializer):
             'cover_url': {'required': False},
         }
 
+    def validate_waveform_data(self, value):
+        return _validate_waveform_data(value)
+
     def update(self, instance, validated_data):
         from django.utils import timezone
 
         audio_file = validated_data.pop('audio_file', None)
         cover_file = validated_data.pop('cover_file', None)
+        has_peaks  = 'waveform_data' in validated_data
+        peaks      = validated_data.pop('waveform_data', None)
+        was_public = instance.published
 
         if 'published' in validated_data and validated_data['published'] and not instance.published:
             instance.published_at = timezone.now()
@@ -445,26 +470,24 @@ class UpdateTrackSerializer(serializers.ModelSerializer):
                 validated_data['tags'] = json.loads(validated_data['tags'])
             except json.JSONDecodeError:
                 pass
+        if 'tags' in validated_data:
+            validated_data['tags'] = tag_index.parse_tags(validated_data['tags'])
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
-        if audio_file:
-            old_fid = instance.audio_fileforge_id
-            url, fid = _upload(audio_file, f"track_{instance.id}_audio")
-            _delete_from_fileforge(old_fid)
-            instance.audio_url = url
-            instance.audio_fileforge_id = fid
-            instance.save(update_fields=['audio_url', 'audio_fileforge_id'])
+        if 'tags' in validated_data:
+            tag_index.set_track_tags(instance, instance.tags)
 
-        if cover_file:
-            old_fid = instance.cover_fileforge_id
-            url, fid = _upload(cover_file, f"track_{instance.id}_cover")
-            _delete_from_fileforge(old_fid)
-            instance.cover_url = url
-            instance.cover_fileforge_id = fid
-            instance.save(update_fields=['cover_url', 'cover_fileforge_id'])
+        if has_peaks:
+            waveforms.set_waveform(instance, peaks or [])
+
+        _upload_many(instance, {'track_audio': audio_file, 'track_cover': cover_file})
+        if instance.published and not was_public:
+            feed.track_published(instance)
+        elif was_public and not instance.published:
+            feed.track_unpublished(instance)
 
         return instance
 
@@ -472,8 +495,8 @@ class UpdateTrackSerializer(serializers.ModelSerializer):
 # ─── Remaining serializers ────────────────────────────────────────────────────
 
 class LikeSerializer(serializers.ModelSerializer):
-    user_id  = serializers.UUIDField(source='user.id', read_only=True)
-    track_id = serializers.UUIDField(source='track.id', read_only=True)
+    user_id  = serializers.UUIDField(read_only=True)
+    track_id = serializers.UUIDField(read_only=True)
 
     class Meta:
         model  = Like
@@ -482,8 +505,8 @@ class LikeSerializer(serializers.ModelSerializer):
 
 
 class DownloadSerializer(serializers.ModelSerializer):
-    user_id  = serializers.UUIDField(source='user.id', read_only=True, allow_null=True)
-    track_id = serializers.UUIDField(source='track.id', read_only=True)
+    user_id  = serializers.UUIDField(read_only=True, allow_null=True)
+    track_id = serializers.UUIDField(read_only=True)
 
     class Meta:
         model  = Download
@@ -492,8 +515,8 @@ class DownloadSerializer(serializers.ModelSerializer):
 
 
 class PlaySerializer(serializers.ModelSerializer):
-    user_id  = serializers.UUIDField(source='user.id', read_only=True, allow_null=True)
-    track_id = serializers.UUIDField(source='track.id', read_only=True)
+    user_id  = serializers.UUIDField(read_only=True, allow_null=True)
+    track_id = serializers.UUIDField(read_only=True)
 
     class Meta:
         model  = Play
@@ -502,8 +525,8 @@ class PlaySerializer(serializers.ModelSerializer):
 
 
 class FollowSerializer(serializers.ModelSerializer):
-    follower_id  = serializers.UUIDField(source='follower.id', read_only=True)
-    following_id = serializers.UUIDField(source='following.id', read_only=True)
+    follower_id  = serializers.UUIDField(read_only=True)
+    following_id = serializers.UUIDField(read_only=True)
 
     class Meta:
         model  = Follow
@@ -511,6 +534,35 @@ class FollowSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class PendingUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model  = PendingUpload
+        fields = [
+            'id', 'target', 'object_id', 'strategy', 'status', 'error_message',
+            'created_at', 'completed_at',
+        ]
+        read_only_fields = fields
+
+
+class DirectUploadSerializer(serializers.Serializer):
+    target       = serializers.ChoiceField(choices=list(uploads.TARGETS))
+    object_id    = serializers.UUIDField()
+    name         = serializers.CharField(max_length=255)
+    size         = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100)
+
+    def validate(self, attrs):
+        expected = 'audio/' if attrs['target'] == 'track_audio' else 'image/'
+        if not attrs['content_type'].startswith(expected):
+            raise serializers.ValidationError({'content_type': f"Expected a {expected}* content type."})
+        return attrs
+
+
+class CompleteUploadSerializer(serializers.Serializer):
+    provider_file_id  = serializers.CharField(max_length=255)
+    provider_response = serializers.JSONField(required=False, default=dict)
+
+
 class PlaylistTrackSerializer(serializers.ModelSerializer):
     track    = TrackSerializer(read_only=True)
     track_id = serializers.UUIDField(write_only=True, required=False)
@@ -522,7 +574,7 @@ class PlaylistTrackSerializer(serializers.ModelSerializer):
 
 
 class PlaylistSerializer(serializers.ModelSerializer):
-    user_id      = serializers.UUIDField(source='user.id', read_only=True)
+    user_id      = serializers.UUIDField(read_only=True)
     tracks_count = serializers.SerializerMethodField()
     track_ids    = serializers.SerializerMethodField()
 
@@ -534,15 +586,17 @@ class PlaylistSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'tracks_count', 'track_ids']
 
+    # Both read ``playlist_tracks.all()`` so a ``prefetch_related('playlist_tracks')``
+    # in the view serves them without a query per playlist.
     def get_tracks_count(self, obj):
-        return obj.playlist_tracks.count()
+        return len(obj.playlist_tracks.all())
 
     def get_track_ids(self, obj):
-        return [str(item.track.id) for item in obj.playlist_tracks.all()]
+        return [str(item.track_id) for item in obj.playlist_tracks.all()]
 
 
 class PlaylistDetailSerializer(serializers.ModelSerializer):
-    user_id = serializers.UUIDField(source='user.id', read_only=True)
+    user_id = serializers.UUIDField(read_only=True)
     tracks  = PlaylistTrackSerializer(source='playlist_tracks', many=True, read_only=True)
 
     class Meta:
@@ -555,8 +609,8 @@ class PlaylistDetailSerializer(serializers.ModelSerializer):
 
 
 class CommentSerializer(serializers.ModelSerializer):
-    user_id  = serializers.UUIDField(source='user.id', read_only=True)
-    track_id = serializers.UUIDField(source='track.id', read_only=True)
+    user_id  = serializers.UUIDField(read_only=True)
+    track_id = serializers.UUIDField(read_only=True)
 
     class Meta:
         model  = Comment
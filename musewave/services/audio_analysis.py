@@ -0,0 +1,407 @@
+"""
+Server-side audio analysis.
+
+Duration, format, file size and waveform used to be whatever the client
+sent with the track.  After an audio upload the track is now queued for
+analysis on django-q (``musewave.tasks.analyze_track_audio``), which:
+
+1. streams ``Track.audio_url`` into a temporary file (the byte count is the
+   file size);
+2. decodes it with the first decoder in ``AUDIO_ANALYSIS['decoders']`` that
+   accepts the file: ``WavDecoder`` reads PCM WAV with the stdlib ``wave``
+   module, ``FfmpegDecoder`` pipes anything else through ``ffmpeg`` as mono
+   32-bit float;
+3. reduces the decoded blocks as they arrive, never holding the whole
+   signal: each block is reshaped into 10 ms hops and NumPy takes the peak
+   and the energy of every hop in one vectorised pass;
+4. writes duration, format, size and loudness back to the track and stores
+   the peaks through ``services/waveforms`` at every zoom level (16-bit).
+
+Loudness is gated mean power in dBFS over 400 ms blocks, with the absolute
+(-70) and relative (-10 dB) gates of ITU-R BS.1770 but without its
+K-weighting filter.  It is meant for comparing tracks, not for mastering.
+
+Client-supplied values are kept until the analysis lands, so a track is
+playable immediately.  If the audio changes while a track is being
+analysed, the stale result is dropped.
+
+Only audio MuseWave uploaded itself is fetched: analysis is scheduled when
+``services/uploads`` attaches an audio upload, and ``analyze_track``
+refuses tracks without an ``audio_fileforge_id`` or whose URL is not on
+FileForge's host or one of ``allowed_hosts``.  Redirects are not followed.
+A client-supplied ``audio_url`` is never downloaded, so it cannot point the
+worker at internal services.
+
+Decoders
+--------
+A decoder has ``name``, ``accepts(header: bytes) -> bool`` (the first 64
+bytes of the file) and ``open(path, block_frames) -> (sample_rate,
+blocks)``, where *blocks* iterates over mono ``float32`` arrays in
+``[-1, 1]``.  It raises ``DecodeError`` for files it cannot read, and the
+next decoder is tried.
+
+Configuration (``settings.AUDIO_ANALYSIS``)
+-------------------------------------------
+enabled : bool
+use_queue : bool
+    Run on django-q.  When false, analysis runs inline after the request's
+    transaction commits (development without a cluster).
+decoders : list[str]
+    Dotted paths of decoder classes, tried in order.
+ffmpeg_path : str
+sample_rate : int
+    Rate ``ffmpeg`` resamples to.  WAV files are read at their own rate.
+block_frames : int
+    Frames decoded per block.
+max_bytes : int
+    Larger downloads are abandoned.
+download_timeout : int
+allowed_hosts : list[str]
+    Storage provider hosts audio may be downloaded from, besides FileForge's
+    own.  Subdomains match.
+
+Public API
+----------
+schedule(track) -> None
+    Queue analysis of *track*'s audio once the current transaction commits.
+
+analyze_track(track_id) -> dict | None
+    Download, analyse and store.  Returns the analysis, or ``None`` if the
+    track has no uploaded audio, its URL is not allowed, or it changed
+    meanwhile.
+
+analyze_file(path) -> dict
+    ``{'format', 'sample_rate', 'duration', 'peaks', 'loudness'}`` for a
+    local file.  Raises ``DecodeError``.
+"""
+
+import logging
+import math
+import os
+import subprocess
+import tempfile
+import wave
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from musewave.services import fileforge, waveforms
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    'enabled':          True,
+    'use_queue':        True,
+    'decoders': [
+        'musewave.services.audio_analysis.WavDecoder',
+        'musewave.services.audio_analysis.FfmpegDecoder',
+    ],
+    'ffmpeg_path':      'ffmpeg',
+    'sample_rate':      22050,
+    'block_frames':     65536,
+    'max_bytes':        200 * 1024 * 1024,
+    'download_timeout': 60,
+    'allowed_hosts':    ['res.cloudinary.com'],
+}
+
+HOPS_PER_SECOND     = 100   # peak/energy resolution: 10 ms
+LOUDNESS_BLOCK_HOPS = 40    # 400 ms gating blocks
+ABSOLUTE_GATE       = -70.0
+RELATIVE_GATE       = -10.0
+
+HEADER_BYTES = 64
+
+
+def _config(name):
+    return getattr(settings, 'AUDIO_ANALYSIS', {}).get(name, _DEFAULTS[name])
+
+
+class DecodeError(Exception):
+    """Raised when a decoder cannot read a file."""
+
+
+# ─── Decoders ─────────────────────────────────────────────────────────────────
+
+class WavDecoder:
+    """Integer PCM WAV through the stdlib ``wave`` module, downmixed to mono."""
+
+    name = 'wav'
+
+    _DTYPES = {1: np.uint8, 2: np.dtype('<i2'), 4: np.dtype('<i4')}
+
+    def accepts(self, header):
+        return header[:4] == b'RIFF' and header[8:12] == b'WAVE'
+
+    def open(self, path, block_frames):
+        try:
+            reader = wave.open(path, 'rb')
+        except (wave.Error, EOFError) as exc:
+            raise DecodeError(f"Unreadable WAV: {exc}") from exc
+
+        channels, width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+        if width not in (1, 2, 3, 4) or not channels or not rate:
+            reader.close()
+            raise DecodeError(f"Unsupported WAV layout ({channels} ch, {width * 8}-bit, {rate} Hz)")
+        return rate, self._blocks(reader, channels, width, block_frames)
+
+    def _blocks(self, reader, channels, width, block_frames):
+        scale = float(1 << (width * 8 - 1))
+        with reader:
+            while True:
+                raw = reader.readframes(block_frames)
+                if not raw:
+                    return
+                raw = raw[:len(raw) - len(raw) % (width * channels)]
+                if width == 3:
+                    # Little-endian 24-bit: widen to int32 and shift the sign in.
+                    triplets = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+                    samples  = (triplets[:, 0] << 8 | triplets[:, 1] << 16 | triplets[:, 2] << 24) >> 8
+                else:
+                    samples = np.frombuffer(raw, self._DTYPES[width])
+                    if width == 1:
+                        samples = samples.astype(np.int16) - 128
+                samples = samples.astype(np.float32) / scale
+                yield samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+class FfmpegDecoder:
+    """Any format ``ffmpeg`` can read, resampled to mono ``float32``."""
+
+    name = 'ffmpeg'
+
+    def accepts(self, header):
+        return True
+
+    def open(self, path, block_frames):
+        rate    = int(_config('sample_rate'))
+        command = [
+            _config('ffmpeg_path'), '-v', 'error', '-nostdin', '-i', path,
+            '-vn', '-ac', '1', '-ar', str(rate), '-f', 'f32le', 'pipe:1',
+        ]
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as exc:
+            raise DecodeError(f"Cannot run ffmpeg: {exc}") from exc
+        return rate, self._blocks(process, block_frames)
+
+    def _blocks(self, process, block_frames):
+        block_bytes = block_frames * 4
+        try:
+            while True:
+                raw = process.stdout.read(block_bytes)
+                if not raw:
+                    break
+                raw = raw[:len(raw) - len(raw) % 4]
+                yield np.frombuffer(raw, '<f4')
+            process.stdout.close()
+            errors = process.stderr.read().decode(errors='replace').strip()
+            if process.wait() != 0:
+                raise DecodeError(f"ffmpeg failed: {errors[:300]}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+@lru_cache(maxsize=None)
+def _decoders(paths):
+    return [import_string(path)() for path in paths]
+
+
+# ─── Analysis ─────────────────────────────────────────────────────────────────
+
+class _HopReducer:
+    """Per-hop peak and energy of a stream of blocks, carried across block edges."""
+
+    def __init__(self, sample_rate):
+        self.hop    = max(1, sample_rate // HOPS_PER_SECOND)
+        self.frames = 0
+        self._carry  = np.empty(0, np.float32)
+        self._peaks  = []
+        self._energy = []
+
+    def feed(self, block):
+        self.frames += len(block)
+        data = np.concatenate((self._carry, block)) if len(self._carry) else block
+        full = len(data) - len(data) % self.hop
+        if full:
+            self._reduce(data[:full].reshape(-1, self.hop))
+        self._carry = data[full:].copy()
+
+    def _reduce(self, hops):
+        self._peaks.append(np.abs(hops).max(axis=1))
+        self._energy.append(np.square(hops, dtype=np.float64).sum(axis=1))
+
+    def finish(self):
+        """``(peaks, energy, frames_per_hop)`` arrays; the last hop may be short."""
+        counts = None
+        if len(self._carry):
+            self._reduce(self._carry.reshape(1, -1))
+            counts = len(self._carry)
+            self._carry = np.empty(0, np.float32)
+        if not self._peaks:
+            return np.empty(0, np.float32), np.empty(0), np.empty(0)
+        peaks  = np.concatenate(self._peaks)
+        energy = np.concatenate(self._energy)
+        sizes  = np.full(len(peaks), self.hop, dtype=np.float64)
+        if counts is not None:
+            sizes[-1] = counts
+        return peaks, energy, sizes
+
+
+def _gated_loudness(energy, sizes):
+    """Gated mean power in dBFS over 400 ms blocks (BS.1770 gating, no K-weighting)."""
+    if not len(energy):
+        return None
+    edges       = np.arange(0, len(energy), LOUDNESS_BLOCK_HOPS)
+    block_power = np.add.reduceat(energy, edges) / np.add.reduceat(sizes, edges)
+    with np.errstate(divide='ignore'):
+        block_level = 10 * np.log10(block_power)
+
+    gated = block_power[block_level > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    relative = 10 * math.log10(gated.mean()) + RELATIVE_GATE
+    gated    = gated[10 * np.log10(gated) > relative]
+    return round(10 * math.log10(gated.mean()), 2)
+
+
+def analyze_file(path):
+    with open(path, 'rb') as handle:
+        header = handle.read(HEADER_BYTES)
+
+    errors = []
+    for decoder in _decoders(tuple(_config('decoders'))):
+        if not decoder.accepts(header):
+            continue
+        try:
+            sample_rate, blocks = decoder.open(path, int(_config('block_frames')))
+            reducer = _HopReducer(sample_rate)
+            for block in blocks:
+                reducer.feed(block)
+        except DecodeError as exc:
+            errors.append(f"{decoder.name}: {exc}")
+            continue
+
+        if not reducer.frames:
+            errors.append(f"{decoder.name}: no audio frames")
+            continue
+        peaks, energy, sizes = reducer.finish()
+        loudest = float(peaks.max())
+        return {
+            'format':      decoder.name if decoder.name != 'ffmpeg' else sniff_format(header),
+            'sample_rate': sample_rate,
+            'duration':    reducer.frames / sample_rate,
+            'peaks':       (peaks / loudest).tolist() if loudest > 0 else peaks.tolist(),
+            'loudness':    _gated_loudness(energy, sizes),
+        }
+    raise DecodeError('; '.join(errors) or 'No decoder accepts this file')
+
+
+def sniff_format(header):
+    """Container name from the file's magic bytes (``None`` if unknown)."""
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[4:8] == b'ftyp':
+        return 'm4a'
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    return None
+
+
+def _allowed_source(url):
+    """Whether *url* is on FileForge's host or an allowed provider host."""
+    parts = urlsplit(url)
+    host  = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        return False
+    allowed = {name.lower().strip('.') for name in _config('allowed_hosts')}
+    allowed.add((urlsplit(fileforge._base_url()).hostname or '').lower())
+    return any(host == name or host.endswith('.' + name) for name in allowed if name)
+
+
+def _download(url, handle):
+    """Stream *url* into *handle*; returns the number of bytes written."""
+    limit   = int(_config('max_bytes'))
+    written = 0
+    with requests.get(url, stream=True, timeout=_config('download_timeout'), allow_redirects=False) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            written += len(chunk)
+            if written > limit:
+                raise DecodeError(f"Audio is larger than {limit} bytes")
+            handle.write(chunk)
+    handle.flush()
+    return written
+
+
+def analyze_track(track_id):
+    from musewave.models import Track
+
+    track = Track.objects.filter(pk=track_id).only('id', 'audio_url', 'audio_fileforge_id').first()
+    if track is None or not track.audio_url:
+        return None
+    source = track.audio_url
+    if track.audio_fileforge_id is None or not _allowed_source(source):
+        logger.warning("Not analysing track %s: its audio was not uploaded through FileForge (%s)", track_id, source)
+        return None
+
+    fd, path = tempfile.mkstemp(prefix='musewave-audio-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            size = _download(source, handle)
+        result = analyze_file(path)
+    finally:
+        os.unlink(path)
+
+    with transaction.atomic():
+        track = Track.objects.select_for_update().filter(pk=track_id).first()
+        if track is None or track.audio_url != source:
+            logger.info("Audio of track %s changed during analysis; result dropped", track_id)
+            return None
+
+        track.audio_duration  = result['duration']
+        track.audio_file_size = size
+        track.audio_format    = result['format'] or track.audio_format
+        track.loudness        = result['loudness']
+        track.analyzed_at     = timezone.now()
+        track.save(update_fields=['audio_duration', 'audio_file_size', 'audio_format', 'loudness', 'analyzed_at'])
+        waveforms.set_waveform(track, result['peaks'], bits=16)
+
+    logger.info(
+        "Analysed track %s: %.1fs %s, %s dBFS", track_id, result['duration'], result['format'], result['loudness'],
+    )
+    return {**result, 'file_size': size}
+
+
+def schedule(track):
+    if not _config('enabled') or not track.audio_url or track.audio_fileforge_id is None:
+        return
+    track_id = str(track.pk)
+
+    def run():
+        if _config('use_queue'):
+            from django_q.tasks import async_task
+            try:
+                async_task('musewave.tasks.analyze_track_audio', track_id)
+            except Exception as exc:
+                logger.warning("Could not queue audio analysis for track %s: %s", track_id, exc)
+            return
+        try:
+            analyze_track(track_id)
+        except Exception:
+            logger.exception("Audio analysis failed for track %s", track_id)
+
+    transaction.on_commit(run)
@@ -0,0 +1,166 @@
+"""
+Daily and weekly chart snapshots.
+
+When a window closes (a UTC day, or an ISO week Monday–Sunday), the top
+``size`` published tracks by plays are written as immutable ``ChartEntry``
+rows, once overall and once per genre, each with the track's rank in the
+previous chart of the same kind and the places it moved.  Chart pages are
+then plain reads on the ``(period, genre, period_start, rank)`` key.
+
+Plays come from the ``TrackDailyStats`` rollup, not the ``plays`` table.
+The window's rows are streamed in track order and each track's total is
+offered to a bounded min-heap per chart (``heapq.heappushpop``), so memory
+is ``O(size × genres)`` and the catalog is never sorted.  Ties on plays go
+to the track with more completed plays, then to the lower track id.
+
+Public API
+----------
+window(period, day) -> (start, end)
+    The first and last date of the *period* window containing *day*.
+
+build(period, start) -> int
+    Write the charts of the window starting on *start*, unless they already
+    exist.  Returns the number of rows written.
+
+build_due(today=None) -> int
+    Build every closed window after the newest published chart of each
+    period, oldest first, so a missed run is caught up and each chart still
+    compares against the one before it.  At most ``catch_up`` windows back
+    are considered; ``manage.py build_charts --days`` reaches further.
+    Runs on a django-q2 schedule (``musewave.tasks.build_charts``).
+
+latest_start(period, genre='') -> date | None
+    Start of the newest published chart.
+"""
+
+import heapq
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'daily': 1, 'weekly': 7}
+
+_DEFAULTS = {
+    'size':      100,
+    'min_plays': 1,
+    'catch_up':  14,
+}
+
+
+def _config(name):
+    return getattr(settings, 'CHARTS', {}).get(name, _DEFAULTS[name])
+
+
+def window(period, day):
+    if period == 'weekly':
+        day -= timedelta(days=day.weekday())
+    return day, day + timedelta(days=PERIODS[period] - 1)
+
+
+def _offer(heap, size, item):
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heappushpop(heap, item)
+
+
+def _top_tracks(start, end):
+    """``{genre: [(plays, track_id), …]}`` best first, ``''`` being the overall chart."""
+    from musewave.models import TrackDailyStats
+
+    size = _config('size')
+    rows = (
+        TrackDailyStats.objects.filter(date__range=(start, end), track__published=True)
+        .order_by('track_id')
+        .values_list('track_id', 'track__genre', 'plays', 'completions')
+    )
+
+    heaps = {'': []}
+
+    def offer(track_id, genre, plays, completions):
+        if plays < _config('min_plays'):
+            return
+        # The heap root is the weakest entry: fewest plays, fewest completions, highest id.
+        item = (plays, completions, -track_id.int, track_id)
+        _offer(heaps[''], size, item)
+        _offer(heaps.setdefault(genre, []), size, item)
+
+    current, genre, plays, completions = None, None, 0, 0
+    for track_id, track_genre, day_plays, day_completions in rows.iterator(chunk_size=5000):
+        if track_id != current:
+            if current is not None:
+                offer(current, genre, plays, completions)
+            current, genre, plays, completions = track_id, (track_genre or '').lower(), 0, 0
+        plays       += day_plays
+        completions += day_completions
+    if current is not None:
+        offer(current, genre, plays, completions)
+
+    return {
+        genre: [(plays, track_id) for plays, _, _, track_id in sorted(heap, reverse=True)]
+        for genre, heap in heaps.items()
+    }
+
+
+def build(period, start):
+    from musewave.models import ChartEntry
+
+    start, end = window(period, start)
+    charts = ChartEntry.objects.filter(period=period, period_start=start)
+    if charts.exists():
+        return 0
+
+    previous = {}
+    for genre, track_id, rank in ChartEntry.objects.filter(
+        period=period, period_start=start - timedelta(days=PERIODS[period]),
+    ).values_list('genre', 'track_id', 'rank'):
+        previous[(genre, track_id)] = rank
+
+    entries = []
+    for genre, ranking in _top_tracks(start, end).items():
+        for rank, (plays, track_id) in enumerate(ranking, start=1):
+            previous_rank = previous.get((genre, track_id))
+            entries.append(ChartEntry(
+                period=period, period_start=start, genre=genre, rank=rank, track_id=track_id, plays=plays,
+                previous_rank=previous_rank,
+                rank_delta=None if previous_rank is None else previous_rank - rank,
+            ))
+
+    try:
+        with transaction.atomic():
+            ChartEntry.objects.bulk_create(entries, batch_size=1000)
+    except IntegrityError:
+        # A concurrent run published the window first.
+        return 0
+    logger.info("Built %s charts for %s: %d entries", period, start, len(entries))
+    return len(entries)
+
+
+def build_due(today=None):
+    today   = today or timezone.now().date()
+    written = 0
+    for period, days in PERIODS.items():
+        step   = timedelta(days=days)
+        newest = window(period, today)[0] - step
+        start  = newest - step * (_config('catch_up') - 1)
+        last   = latest_start(period)
+        if last is not None:
+            start = max(start, last + step)
+        while start <= newest:
+            written += build(period, start)
+            start   += step
+    return written
+
+
+def latest_start(period, genre=''):
+    from musewave.models import ChartEntry
+
+    return (
+        ChartEntry.objects.filter(period=period, genre=genre)
+        .order_by('-period_start').values_list('period_start', flat=True).first()
+    )
@@ -0,0 +1,153 @@
+"""
+Contention-free counters for the denormalised ``Track`` engagement columns.
+
+``Track.plays/likes/downloads/shares`` used to be maintained with a
+read-modify-write (``track.likes += 1; track.save()``), which loses updates
+under concurrency and rewrites the whole row.  All counter writes now go
+through this module.
+
+Public API
+----------
+increment(track_id, field, n=1) -> None
+    Add *n* (may be negative) to a randomly chosen ``TrackCounterShard`` row.
+    Concurrent writers on the same track land on different rows.
+
+apply(field, deltas) -> None
+    Apply ``{track_id: n}`` directly to the ``Track`` column with one ``F()``
+    update per track, roll the deltas up to the artists' ``ArtistStats`` and
+    add them to the tracks' trending scores.
+    For callers that already aggregate events in batches (e.g. the play buffer).
+
+get_count(track_id, field) -> int
+    Current value including deltas that have not been folded yet.
+
+fold() -> int
+    Move pending shard deltas into the ``Track`` columns.  Runs on a django-q2
+    schedule (``musewave.tasks.fold_counter_shards``).
+
+reconcile(track_ids=None) -> int
+    Rebuild ``likes`` and ``downloads`` from the ``Like`` / ``Download`` rows
+    and drop their pending shards.  ``plays`` and ``shares`` are left alone:
+    there is no authoritative row set for shares, and plays are rebuilt from
+    the buffered write path.
+"""
+
+import logging
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('plays', 'likes', 'downloads', 'shares')
+
+
+def _shard_count():
+    return max(1, getattr(settings, 'TRACK_COUNTER_SHARDS', 8))
+
+
+def _check_field(field):
+    if field not in COUNTER_FIELDS:
+        raise ValueError(f"Unknown counter field {field!r}")
+
+
+def increment(track_id, field, n=1):
+    from musewave.models import TrackCounterShard
+
+    _check_field(field)
+    if not n:
+        return
+
+    shard   = random.randrange(_shard_count())
+    lookup  = {'track_id': track_id, 'field': field, 'shard': shard}
+    updated = TrackCounterShard.objects.filter(**lookup).update(value=F('value') + n)
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            TrackCounterShard.objects.create(value=n, **lookup)
+    except IntegrityError:
+        # Another writer created the shard first.
+        TrackCounterShard.objects.filter(**lookup).update(value=F('value') + n)
+
+
+def apply(field, deltas):
+    from musewave.models import Track
+    from musewave.services import stats, trending
+
+    _check_field(field)
+    for track_id, n in deltas.items():
+        if n:
+            Track.objects.filter(id=track_id).update(**{field: F(field) + n})
+    stats.apply_track_deltas(field, deltas)
+    trending.record(field, deltas)
+
+
+def get_count(track_id, field):
+    from musewave.models import Track, TrackCounterShard
+
+    _check_field(field)
+    base    = Track.objects.filter(id=track_id).values_list(field, flat=True).first() or 0
+    pending = TrackCounterShard.objects.filter(
+        track_id=track_id, field=field,
+    ).aggregate(total=Sum('value'))['total'] or 0
+    return base + pending
+
+
+def fold(batch_size=1000):
+    """Fold non-zero shards into their ``Track`` columns.  Returns the number folded."""
+    from musewave.models import TrackCounterShard
+
+    shards = list(
+        TrackCounterShard.objects.exclude(value=0)
+        .values_list('id', 'track_id', 'field', 'value')[:batch_size]
+    )
+    if not shards:
+        return 0
+
+    per_field = defaultdict(lambda: defaultdict(int))
+    with transaction.atomic():
+        for shard_id, track_id, field, value in shards:
+            # Subtract what was read rather than zeroing, so increments that
+            # land between the read and this update are kept for next time.
+            TrackCounterShard.objects.filter(id=shard_id).update(value=F('value') - value)
+            per_field[field][track_id] += value
+        for field, deltas in per_field.items():
+            apply(field, deltas)
+
+    return len(shards)
+
+
+def reconcile(track_ids=None):
+    """Rebuild ``likes``/``downloads`` from source rows.  Returns the number of tracks touched."""
+    from musewave.models import Track, Like, Download, TrackCounterShard
+
+    like_counts = (
+        Like.objects.filter(track=OuterRef('pk'))
+        .order_by().values('track').annotate(c=Count('id')).values('c')
+    )
+    download_counts = (
+        Download.objects.filter(track=OuterRef('pk'))
+        .order_by().values('track').annotate(c=Count('id')).values('c')
+    )
+
+    tracks = Track.objects.all()
+    shards = TrackCounterShard.objects.filter(field__in=['likes', 'downloads'])
+    if track_ids is not None:
+        tracks = tracks.filter(id__in=track_ids)
+        shards = shards.filter(track_id__in=track_ids)
+
+    with transaction.atomic():
+        shards.delete()
+        touched = tracks.update(
+            likes=Coalesce(Subquery(like_counts), Value(0)),
+            downloads=Coalesce(Subquery(download_counts), Value(0)),
+        )
+
+    logger.info("Reconciled counters for %s tracks", touched)
+    return touched
@@ -0,0 +1,201 @@
+"""
+Home feed: recently published tracks by the artists a user follows.
+
+Most artists are *fanned out on write*: publishing a track queues a
+django-q2 task that inserts one ``FeedItem`` per follower in batches of
+``batch_size``, so reading a feed is a single range scan on
+``(user, -published_at, -track)``.  Artists whose ``ArtistStats`` snapshot
+counts at least ``fanout_threshold`` followers are *fanned in on read*
+instead: their tracks are never copied, and each feed page merges the
+newest published tracks of the followed high-fan-out artists into the
+stored rows.  Both sources are keyset-ordered by ``(published_at, track)``
+so they merge without sorting and one cursor covers both.
+
+Following an artist backfills their ``backfill`` latest tracks; unfollowing
+removes them.  Unpublished or deleted tracks drop out on read and through
+the ``FeedItem.track`` cascade.  Rows older than ``retention_days`` are
+pruned by a daily schedule.
+
+Public API
+----------
+track_published(track) -> None
+    Queue the fan-out of a newly published track after the current commit.
+
+track_unpublished(track) -> int
+    Remove a track from every feed.
+
+fan_out(track_id) -> int
+    Insert the track into its artist's followers' feeds.  Idempotent.
+
+follow_created(follower_id, artist_id) -> int
+follow_deleted(follower_id, artist_id) -> int
+    Backfill / remove an artist's tracks in one follower's feed.
+
+page(user, cursor=None, limit=50) -> (track_ids, next_cursor)
+    One page of a user's feed, newest first.  Raises ``InvalidCursor``.
+
+prune() -> int
+    Delete feed rows past the retention window.
+"""
+
+import heapq
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from musewave.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    'fanout_threshold': 10000,
+    'batch_size':       1000,
+    'backfill':         20,
+    'retention_days':   180,
+    'use_queue':        True,
+}
+
+ORDERING = ['-published_at', '-track_id']
+
+
+def _config(name):
+    return getattr(settings, 'FEED', {}).get(name, _DEFAULTS[name])
+
+
+def _fan_in_q(prefix=''):
+    return Q(**{f'{prefix}artist_stats__total_followers__gte': _config('fanout_threshold')})
+
+
+def is_fan_in(artist_id):
+    """True for artists whose tracks are merged in on read rather than copied."""
+    from musewave.models import User
+
+    return User.objects.filter(_fan_in_q(), pk=artist_id).exists()
+
+
+def _published_tracks(queryset):
+    """Published tracks with the timestamp feeds sort them by."""
+    return queryset.filter(published=True).annotate(feed_at=Coalesce('published_at', 'created_at'))
+
+
+# ─── Write side ───────────────────────────────────────────────────────────────
+
+def track_published(track):
+    if is_fan_in(track.user_id):
+        return
+    track_id = track.pk
+
+    def kick():
+        if _config('use_queue'):
+            from django_q.tasks import async_task
+            try:
+                async_task('musewave.tasks.fan_out_track', str(track_id))
+                return
+            except Exception as exc:
+                logger.warning("Could not queue feed fan-out for track %s, running inline: %s", track_id, exc)
+        fan_out(track_id)
+
+    transaction.on_commit(kick)
+
+
+def track_unpublished(track):
+    from musewave.models import FeedItem
+
+    deleted, _ = FeedItem.objects.filter(track_id=track.pk).delete()
+    return deleted
+
+
+def fan_out(track_id):
+    from musewave.models import FeedItem, Follow, Track
+
+    track = _published_tracks(Track.objects.filter(pk=track_id)).only('id', 'user_id').first()
+    if track is None:
+        return 0
+
+    followers = (
+        Follow.objects.filter(following_id=track.user_id)
+        .order_by().values_list('follower_id', flat=True)
+        .iterator(chunk_size=_config('batch_size'))
+    )
+    batch, total = [], 0
+    for follower_id in followers:
+        batch.append(FeedItem(user_id=follower_id, track_id=track.pk, artist_id=track.user_id,
+                              published_at=track.feed_at))
+        if len(batch) >= _config('batch_size'):
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    if batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+
+    logger.info("Fanned out track %s to %d feeds", track.pk, total)
+    return total
+
+
+def follow_created(follower_id, artist_id):
+    from musewave.models import FeedItem, Track
+
+    if is_fan_in(artist_id):
+        return 0
+    tracks = (
+        _published_tracks(Track.objects.filter(user_id=artist_id))
+        .order_by('-feed_at', '-id').values_list('id', 'feed_at')[:_config('backfill')]
+    )
+    FeedItem.objects.bulk_create([
+        FeedItem(user_id=follower_id, track_id=track_id, artist_id=artist_id, published_at=feed_at)
+        for track_id, feed_at in tracks
+    ], ignore_conflicts=True)
+    return len(tracks)
+
+
+def follow_deleted(follower_id, artist_id):
+    from musewave.models import FeedItem
+
+    deleted, _ = FeedItem.objects.filter(user_id=follower_id, artist_id=artist_id).delete()
+    return deleted
+
+
+def prune():
+    from musewave.models import FeedItem
+
+    cutoff = timezone.now() - timedelta(days=_config('retention_days'))
+    deleted, _ = FeedItem.objects.filter(published_at__lt=cutoff).delete()
+    return deleted
+
+
+# ─── Read side ────────────────────────────────────────────────────────────────
+
+def page(user, cursor=None, limit=50):
+    from musewave.models import FeedItem, Track, User
+
+    stored = FeedItem.objects.filter(user=user, track__published=True)
+    merged = _published_tracks(Track.objects.filter(
+        user__in=User.objects.filter(_fan_in_q(), followers__follower=user),
+    ))
+    if cursor:
+        published_at, track_id = decode_cursor(cursor, FeedItem, ORDERING)
+        stored = stored.filter(Q(published_at__lt=published_at) | Q(published_at=published_at, track_id__lt=track_id))
+        merged = merged.filter(Q(feed_at__lt=published_at) | Q(feed_at=published_at, id__lt=track_id))
+
+    stored = stored.order_by(*ORDERING).values_list('published_at', 'track_id')[:limit + 1]
+    merged = merged.order_by('-feed_at', '-id').values_list('feed_at', 'id')[:limit + 1]
+
+    # A track can be in both sources if its artist crossed the threshold
+    # after it was fanned out; equal keys are adjacent after the merge.
+    rows, seen = [], set()
+    for published_at, track_id in heapq.merge(stored, merged, reverse=True):
+        if track_id in seen:
+            continue
+        seen.add(track_id)
+        rows.append({'published_at': published_at, 'track_id': track_id})
+        if len(rows) > limit:
+            break
+
+    next_cursor = encode_cursor(rows[limit - 1], ORDERING) if len(rows) > limit else None
+    return [row['track_id'] for row in rows[:limit]], next_cursor
@@ -0,0 +1,171 @@
+"""
+Deferred FileForge deletions.
+
+Deleting a track used to make two blocking DELETE calls to FileForge inside
+the request, and a file whose delete failed was simply leaked.  Deletions
+are now written to the ``PendingFileDeletion`` outbox in the same
+transaction as the change that orphaned the file (a model delete, a
+replaced upload), and drained by the django-q2 cluster.
+
+Draining
+--------
+``drain()`` claims due rows in batches of ``batch_size`` by stamping them
+with a claim token and pushing ``next_attempt_at`` out by ``lease`` seconds,
+so several drainers never delete the same row and rows claimed by a worker
+that died become due again.  Each batch is deleted on a pool of ``workers``
+threads sharing the FileForge client's connection pool.  Deleted (or
+already missing) files drop out of the outbox; failures are retried with
+jittered exponential backoff (``backoff`` … ``backoff_max`` seconds) and
+marked ``dead`` after ``max_attempts``.  While FileForge's circuit breaker
+is open, rows wait for it without spending an attempt.
+
+A drain is queued after every commit that enqueues deletions, and a
+schedule drains every minute to pick up retries.
+
+Public API
+----------
+enqueue(fileforge_ids, reason) -> int
+    Queue FileForge files for deletion (falsy ids are skipped).  Call it
+    inside the transaction that orphans them.
+
+drain(max_seconds=None) -> dict
+    Delete due files until none are left or *max_seconds* pass.
+    Returns ``{'deleted': n, 'retried': n, 'dead': n}``.
+
+retry_dead(queryset=None) -> int
+    Put dead rows back in the queue with a fresh attempt budget.
+"""
+
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from musewave.services import fileforge
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    'use_queue':    True,
+    'batch_size':   50,
+    'workers':      8,
+    'max_attempts': 10,
+    'backoff':      30,
+    'backoff_max':  6 * 3600,
+    'lease':        300,
+    'max_seconds':  240,
+}
+
+
+def _config(name):
+    return getattr(settings, 'FILE_DELETIONS', {}).get(name, _DEFAULTS[name])
+
+
+def enqueue(fileforge_ids, reason):
+    from musewave.models import PendingFileDeletion
+
+    ids = [fid for fid in dict.fromkeys(fileforge_ids) if fid]
+    if not ids:
+        return 0
+    PendingFileDeletion.objects.bulk_create([
+        PendingFileDeletion(fileforge_id=fid, reason=reason) for fid in ids
+    ])
+    transaction.on_commit(_kick)
+    return len(ids)
+
+
+def _kick():
+    if _config('use_queue'):
+        from django_q.tasks import async_task
+        try:
+            async_task('musewave.tasks.drain_file_deletions')
+        except Exception as exc:
+            # The scheduled drain still picks the rows up.
+            logger.warning("Could not queue FileForge deletions: %s", exc)
+        return
+    try:
+        drain()
+    except Exception:
+        logger.exception("Draining FileForge deletions failed")
+
+
+def _claim(limit):
+    from musewave.models import PendingFileDeletion
+
+    now   = timezone.now()
+    token = uuid.uuid4()
+    due   = PendingFileDeletion.objects.filter(status=PendingFileDeletion.STATUS_PENDING, next_attempt_at__lte=now)
+    ids   = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+    # The status/next_attempt_at filter makes the claim atomic per row.
+    due.filter(pk__in=ids).update(claimed_by=token, next_attempt_at=now + timedelta(seconds=_config('lease')))
+    return list(PendingFileDeletion.objects.filter(claimed_by=token))
+
+
+def _delete(row):
+    try:
+        fileforge.get_client().delete_file(row.fileforge_id)
+    except fileforge.FileForgeError as exc:
+        return row, exc
+    return row, None
+
+
+def _reschedule(row, exc):
+    from musewave.models import PendingFileDeletion
+
+    attempts = row.attempts
+    if isinstance(exc, fileforge.FileForgeUnavailable):
+        delay = fileforge.get_client().breaker.reset
+    else:
+        attempts += 1
+        delay = min(_config('backoff_max'), _config('backoff') * 2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+
+    dead = attempts >= _config('max_attempts')
+    PendingFileDeletion.objects.filter(pk=row.pk).update(
+        status=PendingFileDeletion.STATUS_DEAD if dead else PendingFileDeletion.STATUS_PENDING,
+        attempts=attempts,
+        last_error=str(exc)[:2000],
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        claimed_by=None,
+    )
+    if dead:
+        logger.error("Giving up deleting FileForge file %s after %d attempts: %s", row.fileforge_id, attempts, exc)
+    return dead
+
+
+def drain(max_seconds=None):
+    from musewave.models import PendingFileDeletion
+
+    deadline = time.monotonic() + (max_seconds if max_seconds is not None else _config('max_seconds'))
+    totals   = {'deleted': 0, 'retried': 0, 'dead': 0}
+    with ThreadPoolExecutor(max_workers=_config('workers')) as pool:
+        while time.monotonic() < deadline:
+            batch = _claim(_config('batch_size'))
+            if not batch:
+                break
+            results = list(pool.map(_delete, batch))
+
+            deleted = [row.pk for row, exc in results if exc is None]
+            PendingFileDeletion.objects.filter(pk__in=deleted).delete()
+            totals['deleted'] += len(deleted)
+            for row, exc in results:
+                if exc is not None:
+                    totals['dead' if _reschedule(row, exc) else 'retried'] += 1
+    return totals
+
+
+def retry_dead(queryset=None):
+    from musewave.models import PendingFileDeletion
+
+    if queryset is None:
+        queryset = PendingFileDeletion.objects.all()
+    return queryset.filter(status=PendingFileDeletion.STATUS_DEAD).update(
+        status=PendingFileDeletion.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now(), claimed_by=None,
+    )
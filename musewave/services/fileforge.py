@@ -4,12 +4,47 @@ FileForge client for MuseWave.
 Base URL  : configured via settings.FILEFORGE_BASE_URL
 Auth      : Bearer token from settings.FILEFORGE_API_KEY
 
+Every call goes through one ``FileForgeClient`` per process:
+
+* **Connection pool** — a shared ``requests.Session`` keeps connections to
+  FileForge alive (``pool_size`` per host), so calls after the first skip
+  the TCP and TLS handshakes.
+* **Timeouts** — separate ``connect_timeout`` and ``read_timeout``.
+* **Retries** — idempotent calls (health, get_file, delete_file) are
+  retried on connection errors and 429/502/503/504 with full-jitter
+  exponential backoff, honouring ``Retry-After``.  Uploads and direct-upload
+  calls are never retried.
+* **Circuit breaker** — after ``breaker_threshold`` consecutive failures
+  (connection errors or 5xx) calls fail fast with ``FileForgeUnavailable``
+  for ``breaker_reset`` seconds; then a single trial call decides whether
+  it closes again.
+* **Metrics** — per-operation calls, errors, retries, fast failures and a
+  latency histogram, flushed to the default cache every
+  ``metrics_interval`` seconds.  ``manage.py fileforge_stats`` sums them
+  across processes.
+
+Options live in ``settings.FILEFORGE_CLIENT`` (see ``_DEFAULTS``).
+
 Public API
 ----------
-upload_file(file_obj, filename, provider=None) -> dict
-    Upload a file to FileForge in sync mode.
+upload_file(file_obj, filename, provider=None, mode="sync") -> dict
+    Upload a file to FileForge.  In sync mode this returns once the provider
+    upload is done; in async mode FileForge answers 202 with a "pending"
+    record that is polled with get_file().
     Returns the full FileForge file record, e.g.:
         {"id": 42, "url": "https://...", "status": "completed", ...}
+    The multipart body is streamed from *file_obj* in chunks with a known
+    Content-Length, so the file is never held in memory as a whole.
+
+get_file(fileforge_id) -> dict
+    Current file record (status: pending → uploading → completed | failed).
+
+create_direct_upload(name, size, content_type, provider=None) -> dict
+    Pre-signed ticket for a client-side upload straight to the provider:
+        {"file_id", "upload_url", "method", "fields", "headers", "expires_in", ...}
+
+complete_direct_upload(file_id, provider_file_id, provider_response) -> dict
+    Finalise a direct upload; returns the completed file record.
 
 delete_file(fileforge_id) -> None
     Delete a file from FileForge (and from the underlying provider).
@@ -17,37 +52,437 @@ delete_file(fileforge_id) -> None
 
 health() -> dict
     Ping /api/health/ — useful for connectivity checks.
+
+get_client() -> FileForgeClient
+    The process-wide client the functions above use.
+
+metrics_report() -> dict
+    ``{"operations": {operation: {calls, errors, retries, rejected, mean_ms,
+    p50_ms, p95_ms, p99_ms}}, "breakers": {"host:pid": state}}`` summed over
+    every process that reported.  Percentiles are histogram bucket bounds.
+
+reset_metrics() -> None
 """
 
+import atexit
+import bisect
 import logging
+import math
+import mimetypes
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
 
 import requests
 from django.conf import settings
+from django.core.signals import setting_changed
+from requests.adapters import HTTPAdapter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 logger = logging.getLogger(__name__)
 
-_TIMEOUT = 60  # seconds
+_DEFAULTS = {
+    'pool_size':         10,
+    'connect_timeout':   3.05,
+    'read_timeout':      60,
+    'retries':           3,
+    'backoff':           0.5,
+    'backoff_max':       8,
+    'breaker_threshold': 5,
+    'breaker_reset':     30,
+    'metrics_interval':  30,
+}
+
+_CHUNK_SIZE = 256 * 1024
+
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+METRICS_REGISTRY = 'fileforge:metrics:processes'
+METRICS_TIMEOUT  = 86400
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open-ended.
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class FileForgeError(Exception):
+    """Raised when a FileForge API call fails."""
+
+
+class FileForgeUnavailable(FileForgeError):
+    """Raised without calling FileForge while the circuit breaker is open."""
 
 
 def _base_url():
     return getattr(settings, "FILEFORGE_BASE_URL", "https://fileforge1.pythonanywhere.com")
 
 
-def _headers():
-    api_key = getattr(settings, "FILEFORGE_API_KEY", "")
-    return {"Authorization": f"Bearer {api_key}"}
+def _config(name):
+    return getattr(settings, 'FILEFORGE_CLIENT', {}).get(name, _DEFAULTS[name])
+
+
+def _peak_rss_mb():
+    """High-water mark of this process's resident memory, in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _file_size(file_obj):
+    size = getattr(file_obj, "size", None)
+    if size is not None:
+        return size
+    position = file_obj.tell()
+    file_obj.seek(0, 2)
+    size = file_obj.tell() - position
+    file_obj.seek(position)
+    return size
+
+
+class _MultipartStream:
+    """
+    A multipart/form-data body that reads the file part from *file_obj* in
+    ``_CHUNK_SIZE`` pieces.  ``len()`` gives the exact body size, so requests
+    sends a Content-Length instead of chunked transfer encoding.
+    """
+
+    def __init__(self, fields, field_name, filename, file_obj):
+        self.boundary = uuid.uuid4().hex
+        self.file_obj = file_obj
+
+        quoted  = filename.replace('"', "%22")
+        mime    = getattr(file_obj, "content_type", None) or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        parts   = [
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        ]
+        parts.append(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field_name}"; filename="{quoted}"\r\n'
+            f"Content-Type: {mime}\r\n\r\n"
+        )
+        self.head = "".join(parts).encode("utf-8")
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self.size = _file_size(file_obj)
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        sent = 0
+        while True:
+            chunk = self.file_obj.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            sent += len(chunk)
+            yield chunk
+        if sent != self.size:
+            raise FileForgeError(f"File changed while uploading: expected {self.size} bytes, read {sent}")
+        yield self.tail
+
+
+# ─── Circuit breaker ──────────────────────────────────────────────────────────
+
+class _CircuitBreaker:
+    """
+    closed → (threshold consecutive failures) → open → (reset seconds) →
+    half-open: one trial call; success closes, failure opens again.
+    """
+
+    def __init__(self, threshold, reset):
+        self.threshold = threshold
+        self.reset     = reset
+        self.lock      = threading.Lock()
+        self.failures  = 0
+        self.opened_at = None
+        self.trial     = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset else 'open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset or self.trial:
+                return False
+            self.trial = True
+            return True
+
+    def release(self):
+        """End a call that never got an answer either way, freeing the half-open trial."""
+        with self.lock:
+            self.trial = False
+
+    def record(self, ok):
+        with self.lock:
+            self.trial = False
+            if ok:
+                if self.opened_at is not None:
+                    logger.info("FileForge circuit closed")
+                self.failures, self.opened_at = 0, None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning("FileForge circuit opened after %d consecutive failures", self.failures)
+                self.opened_at = time.monotonic()
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+
+def _empty_metrics():
+    return {'calls': 0, 'errors': 0, 'retries': 0, 'rejected': 0, 'total_ms': 0.0,
+            'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+
+
+class _Metrics:
+    """Per-operation counters and latency histograms, periodically written to the cache."""
+
+    def __init__(self, interval, breaker):
+        self.interval = interval
+        self.breaker  = breaker
+        self.lock     = threading.Lock()
+        self.counts   = defaultdict(_empty_metrics)
+        self.key      = f'fileforge:metrics:{socket.gethostname()}:{os.getpid()}'
+        self.flushed  = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(self, operation, elapsed_ms=None, error=False, retry=False, rejected=False):
+        with self.lock:
+            counts = self.counts[operation]
+            if elapsed_ms is not None:
+                counts['calls']    += 1
+                counts['total_ms'] += elapsed_ms
+                counts['buckets'][bisect.bisect_left(LATENCY_BUCKETS, elapsed_ms)] += 1
+            counts['errors']   += error
+            counts['retries']  += retry
+            counts['rejected'] += rejected
+            due = time.monotonic() - self.flushed >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        from django.core.cache import cache
+
+        with self.lock:
+            snapshot     = {op: {**c, 'buckets': list(c['buckets'])} for op, c in self.counts.items()}
+            self.flushed = time.monotonic()
+        if not snapshot:
+            return
+        try:
+            cache.set(self.key, {'operations': snapshot, 'breaker': self.breaker.state}, METRICS_TIMEOUT)
+            processes = set(cache.get(METRICS_REGISTRY) or ())
+            if self.key not in processes:
+                cache.set(METRICS_REGISTRY, sorted(processes | {self.key}), METRICS_TIMEOUT)
+        except Exception:
+            # Metrics must never break the call that triggered the flush.
+            pass
+
+
+def _percentile(buckets, total, q):
+    """Upper bound of the bucket holding the *q* quantile (``inf`` past the last bound)."""
+    if not total:
+        return None
+    rank, seen = q * total, 0
+    for bound, count in zip(LATENCY_BUCKETS + (math.inf,), buckets):
+        seen += count
+        if seen >= rank:
+            return bound
+    return math.inf
+
 
+# ─── Client ───────────────────────────────────────────────────────────────────
+
+class FileForgeClient:
+
+    def __init__(self, base_url=None, api_key=None, **options):
+        config = {name: options.get(name, _config(name)) for name in _DEFAULTS}
+
+        self.base_url    = (base_url or _base_url()).rstrip('/')
+        self.timeout     = (config['connect_timeout'], config['read_timeout'])
+        self.retries     = config['retries']
+        self.backoff     = config['backoff']
+        self.backoff_max = config['backoff_max']
+        self.breaker     = _CircuitBreaker(config['breaker_threshold'], config['breaker_reset'])
+        self.metrics     = _Metrics(config['metrics_interval'], self.breaker)
+
+        if api_key is None:
+            api_key = getattr(settings, "FILEFORGE_API_KEY", "")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config['pool_size'], max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.metrics.flush()
+        self.session.close()
+
+    def _delay(self, attempt, resp):
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def request(self, operation, method, path, idempotent=False, **kwargs):
+        """
+        Send one call through the breaker, retrying idempotent ones.  Returns
+        the final response whatever its status; raises ``FileForgeError`` on
+        connection failure and ``FileForgeUnavailable`` while the breaker is open.
+        """
+        url      = f"{self.base_url}{path}"
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self.metrics.record(operation, rejected=True)
+                raise FileForgeUnavailable(f"FileForge is unavailable (circuit open); {operation} not attempted")
+
+            resp, error = None, None
+            started     = time.monotonic()
+            try:
+                resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as exc:
+                error = exc
+            except BaseException:
+                # Not FileForge's doing (e.g. the file changed mid-upload), but a
+                # half-open trial must not stay taken or the breaker never closes.
+                self.breaker.release()
+                raise
+            elapsed = (time.monotonic() - started) * 1000
+
+            failed = resp is None or resp.status_code >= 500
+            self.breaker.record(ok=not failed)
+            retry = attempt + 1 < attempts and (resp is None or resp.status_code in _RETRY_STATUSES)
+            self.metrics.record(operation, elapsed, error=failed, retry=retry)
+            if not retry:
+                break
+            time.sleep(self._delay(attempt, resp))
+
+        if resp is None:
+            raise FileForgeError(f"Connection error calling FileForge {operation}: {error}") from error
+        return resp
+
+    def _json(self, operation, method, path, idempotent=False, **kwargs):
+        resp = self.request(operation, method, path, idempotent=idempotent, **kwargs)
+        if resp.status_code not in (200, 201, 202):
+            raise FileForgeError(f"FileForge {method} {path} failed ({resp.status_code}): {resp.text[:300]}")
+        return resp.json()
+
+    def health(self):
+        return self._json('health', "GET", "/api/health/", idempotent=True)
+
+    def upload_file(self, file_obj, filename, provider=None, mode="sync"):
+        data = {"name": filename, "mode": mode}
+        if provider:
+            data["provider"] = provider
+
+        try:
+            file_obj.seek(0)
+        except (AttributeError, Exception):
+            pass
+
+        body = _MultipartStream(data, "file", filename, file_obj)
+        started, rss_before = time.monotonic(), _peak_rss_mb()
+        resp = self.request('upload', "POST", "/api/files/", data=body,
+                            headers={"Content-Type": body.content_type})
+
+        rss_after = _peak_rss_mb()
+        if rss_after is not None:
+            logger.info(
+                "Uploaded %s (%d bytes) to FileForge in %.2fs; peak RSS %.1f MB (+%.1f MB during upload)",
+                filename, body.size, time.monotonic() - started, rss_after, rss_after - rss_before,
+            )
+
+        if resp.status_code not in (200, 201, 202):
+            raise FileForgeError(
+                f"FileForge upload failed ({resp.status_code}): {resp.text[:300]}"
+            )
+
+        record = resp.json()
+        if isinstance(record, dict) and record.get("file"):
+            record = record["file"]
+
+        return record
+
+    def get_file(self, fileforge_id):
+        return self._json('get_file', "GET", f"/api/files/{fileforge_id}/", idempotent=True)
+
+    def create_direct_upload(self, name, size, content_type, provider=None):
+        payload = {"name": name, "size": size, "content_type": content_type}
+        if provider:
+            payload["provider"] = provider
+        return self._json('direct_upload', "POST", "/api/files/direct-upload/", json=payload)
+
+    def complete_direct_upload(self, file_id, provider_file_id, provider_response):
+        return self._json('complete_upload', "POST", "/api/files/direct-upload/complete/", json={
+            "file_id":           file_id,
+            "provider_file_id":  provider_file_id,
+            "provider_response": provider_response,
+        })
+
+    def delete_file(self, fileforge_id):
+        """Delete a file; a 404 counts as deleted.  Raises FileForgeError otherwise."""
+        resp = self.request('delete', "DELETE", f"/api/files/{fileforge_id}/", idempotent=True)
+        if resp.status_code == 404:
+            logger.debug("FileForge file %s not found (already deleted).", fileforge_id)
+            return
+        if resp.status_code not in (200, 204):
+            raise FileForgeError(f"FileForge delete returned {resp.status_code} for id={fileforge_id}: {resp.text[:200]}")
+
+
+_client      = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FileForgeClient()
+    return _client
+
+
+def _reset_client(setting, **kwargs):
+    global _client
+    if setting in ('FILEFORGE_BASE_URL', 'FILEFORGE_API_KEY', 'FILEFORGE_CLIENT'):
+        with _client_lock:
+            if _client is not None:
+                _client.close()
+            _client = None
+
+
+setting_changed.connect(_reset_client)
+
+
+# ─── Module-level API ─────────────────────────────────────────────────────────
 
 def health():
     """GET /api/health/ — no auth required."""
-    resp = requests.get(f"{_base_url()}/api/health/", timeout=_TIMEOUT)
-    resp.raise_for_status()
-    return resp.json()
+    return get_client().health()
 
 
-def upload_file(file_obj, filename, provider=None):
+def upload_file(file_obj, filename, provider=None, mode="sync"):
     """
-    Upload *file_obj* to FileForge using sync mode.
+    Upload *file_obj* to FileForge.
 
     Parameters
     ----------
@@ -58,6 +493,9 @@ def upload_file(file_obj, filename, provider=None):
     provider : str | None
         Provider name (e.g. "cloudinary"). Defaults to the server-side
         default when omitted.
+    mode : str
+        "sync" waits for the provider upload; "async" returns a pending
+        record as soon as FileForge has the bytes.
 
     Returns
     -------
@@ -69,62 +507,79 @@ def upload_file(file_obj, filename, provider=None):
     FileForgeError
         Wraps any HTTP or connectivity error.
     """
-    url = f"{_base_url()}/api/files/"
-    data = {"name": filename, "mode": "sync"}
-    if provider:
-        data["provider"] = provider
+    return get_client().upload_file(file_obj, filename, provider=provider, mode=mode)
 
-    try:
-        file_obj.seek(0)
-    except (AttributeError, Exception):
-        pass
 
+def delete_file(fileforge_id):
+    """
+    DELETE /api/files/{id}/ — removes the record and the underlying provider file.
+
+    Silently ignores 404 (already gone); other failures are logged.  Views
+    and services queue deletions through services/file_deletions.py instead,
+    which retries them.
+    """
     try:
-        resp = requests.post(
-            url,
-            headers=_headers(),
-            data=data,
-            files={"file": (filename, file_obj)},
-            timeout=_TIMEOUT,
-        )
-    except requests.RequestException as exc:
-        raise FileForgeError(f"Connection error uploading to FileForge: {exc}") from exc
+        get_client().delete_file(fileforge_id)
+    except FileForgeError as exc:
+        logger.warning("FileForge delete failed for id=%s: %s", fileforge_id, exc)
 
-    if resp.status_code not in (200, 201, 202):
-        raise FileForgeError(
-            f"FileForge upload failed ({resp.status_code}): {resp.text[:300]}"
-        )
 
-    record = resp.json()
-    if isinstance(record, dict) and record.get("file"):
-        record = record["file"]
+def get_file(fileforge_id):
+    """GET /api/files/{id}/ — the file record with its upload status."""
+    return get_client().get_file(fileforge_id)
 
-    return record
 
+def create_direct_upload(name, size, content_type, provider=None):
+    """POST /api/files/direct-upload/ — a pre-signed ticket for uploading straight to the provider."""
+    return get_client().create_direct_upload(name, size, content_type, provider=provider)
 
-def delete_file(fileforge_id):
-    """
-    DELETE /api/files/{id}/ — removes the record and the underlying provider file.
 
-    Silently ignores 404 (already gone). Raises FileForgeError on other errors.
-    """
-    url = f"{_base_url()}/api/files/{fileforge_id}/"
-    try:
-        resp = requests.delete(url, headers=_headers(), timeout=_TIMEOUT)
-    except requests.RequestException as exc:
-        logger.warning("FileForge delete request failed for id=%s: %s", fileforge_id, exc)
-        return
-
-    if resp.status_code == 404:
-        logger.debug("FileForge file %s not found (already deleted).", fileforge_id)
-        return
-
-    if resp.status_code not in (200, 204):
-        logger.warning(
-            "FileForge delete returned %s for id=%s: %s",
-            resp.status_code, fileforge_id, resp.text[:200],
-        )
+def complete_direct_upload(file_id, provider_file_id, provider_response):
+    """POST /api/files/direct-upload/complete/ — finalise a direct upload."""
+    return get_client().complete_direct_upload(file_id, provider_file_id, provider_response)
 
 
-class FileForgeError(Exception):
-    """Raised when a FileForge API call fails."""
+def metrics_report():
+    from django.core.cache import cache
+
+    get_client().metrics.flush()
+    processes = cache.get(METRICS_REGISTRY) or []
+    snapshots = cache.get_many(processes)
+    if len(snapshots) < len(processes):
+        # Forget processes whose snapshot expired.
+        cache.set(METRICS_REGISTRY, sorted(snapshots), METRICS_TIMEOUT)
+
+    totals   = defaultdict(_empty_metrics)
+    breakers = {}
+    for key, snapshot in snapshots.items():
+        breakers[key.split(':', 2)[2]] = snapshot['breaker']
+        for operation, counts in snapshot['operations'].items():
+            total = totals[operation]
+            for field in ('calls', 'errors', 'retries', 'rejected', 'total_ms'):
+                total[field] += counts[field]
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], counts['buckets'])]
+
+    report = {}
+    for operation, counts in totals.items():
+        calls = counts['calls']
+        report[operation] = {
+            'calls':    calls,
+            'errors':   counts['errors'],
+            'retries':  counts['retries'],
+            'rejected': counts['rejected'],
+            'mean_ms':  round(counts['total_ms'] / calls, 1) if calls else None,
+            'p50_ms':   _percentile(counts['buckets'], calls, 0.50),
+            'p95_ms':   _percentile(counts['buckets'], calls, 0.95),
+            'p99_ms':   _percentile(counts['buckets'], calls, 0.99),
+        }
+    return {'operations': report, 'breakers': breakers}
+
+
+def reset_metrics():
+    from django.core.cache import cache
+
+    processes = cache.get(METRICS_REGISTRY) or []
+    cache.delete_many(list(processes) + [METRICS_REGISTRY])
+    client = get_client()
+    with client.metrics.lock:
+        client.metrics.counts.clear()
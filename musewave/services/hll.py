@@ -0,0 +1,113 @@
+"""
+HyperLogLog cardinality sketch used for unique-listener counts.
+
+A sketch is ``2 ** PRECISION`` one-byte registers (4 KB at the default
+precision of 12, ~1.6 % standard error).  Sketches with the same precision
+are merged by taking the register-wise maximum, so per-day, per-track
+sketches can be combined into any window or any set of tracks without going
+back to the ``plays`` table.
+
+Public API
+----------
+HyperLogLog(data=None)
+    ``add(key)``, ``update(keys)``, ``merge(other)``, ``count()``,
+    ``to_bytes()``.  *data* restores a sketch from ``to_bytes()`` output.
+
+merge_all(blobs) -> HyperLogLog
+    Merge many serialized sketches (``None`` entries are skipped).
+
+listener_key(user_id, ip_address=None, user_agent=None) -> str
+    Identity fed to the sketch: the user id for signed-in listeners and a
+    hash of IP + user agent for anonymous ones.
+"""
+
+import hashlib
+import math
+from collections import Counter
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+
+_HASH_BITS = 64
+_REST_BITS = _HASH_BITS - PRECISION
+_REST_MASK = (1 << _REST_BITS) - 1
+_ALPHA     = 0.7213 / (1 + 1.079 / REGISTERS)
+
+# Lane constants for merging all registers at once as one big integer.
+# Register values never exceed _REST_BITS + 1 (< 0x80), so the top bit of
+# each byte is free to act as a borrow guard.
+_HIGH_BITS = int.from_bytes(b'\x80' * REGISTERS, 'big')
+_LOW_BITS  = int.from_bytes(b'\x01' * REGISTERS, 'big')
+_ALL_BITS  = (1 << (8 * REGISTERS)) - 1
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+def _lane_max(a, b):
+    """Byte-wise max of two register vectors packed into integers."""
+    a_ge_b = (((a | _HIGH_BITS) - b) & _HIGH_BITS) >> 7
+    mask   = a_ge_b * 0xFF
+    return (a & mask) | (b & (_ALL_BITS ^ mask))
+
+
+class HyperLogLog:
+
+    def __init__(self, data=None):
+        if data is None:
+            self._registers = bytearray(REGISTERS)
+        else:
+            if len(data) != REGISTERS:
+                raise ValueError(f"Expected a {REGISTERS}-byte sketch, got {len(data)} bytes")
+            self._registers = bytearray(data)
+
+    def add(self, key):
+        h     = _hash(key)
+        index = h >> _REST_BITS
+        rank  = _REST_BITS - (h & _REST_MASK).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+        return self
+
+    def merge(self, other):
+        merged = _lane_max(
+            int.from_bytes(self._registers, 'big'),
+            int.from_bytes(other._registers, 'big'),
+        )
+        self._registers = bytearray(merged.to_bytes(REGISTERS, 'big'))
+        return self
+
+    def count(self):
+        histogram = Counter(self._registers)
+        total     = sum(n * 2.0 ** -rank for rank, n in histogram.items())
+        estimate  = _ALPHA * REGISTERS * REGISTERS / total
+        zeros     = histogram.get(0, 0)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self._registers)
+
+    def __len__(self):
+        return self.count()
+
+
+def merge_all(blobs):
+    packed = 0
+    for blob in blobs:
+        if blob:
+            packed = _lane_max(packed, int.from_bytes(bytes(blob), 'big'))
+    return HyperLogLog(packed.to_bytes(REGISTERS, 'big'))
+
+
+def listener_key(user_id, ip_address=None, user_agent=None):
+    if user_id:
+        return f'u:{user_id}'
+    digest = hashlib.sha256(f'{ip_address or ""}|{user_agent or ""}'.encode()).hexdigest()
+    return f'a:{digest[:32]}'
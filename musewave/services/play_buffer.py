@@ -0,0 +1,191 @@
+"""
+Write-behind buffer for play events.
+
+Recording a play used to insert a ``Play`` row and then call ``track.save()``,
+rewriting every column of a hot ``Track`` row and racing concurrent writers.
+Plays are now accumulated in-process and written in batches:
+
+* ``Play`` rows are inserted with a single ``bulk_create``.
+* ``Track.plays`` is bumped with one ``F()`` update per track in the batch.
+* The ``TrackDailyStats`` rollup is updated for every (track, day) touched.
+
+Configuration (``settings.PLAY_BUFFER``)
+----------------------------------------
+batch_size : int
+    Flush as soon as this many plays are pending.
+max_age : float
+    Flush pending plays at most this many seconds after the first one arrived.
+    A daemon thread enforces this even when traffic stops.
+use_queue : bool
+    When True, full batches are handed to the django-q2 cluster
+    (``musewave.tasks.flush_play_batch``) so the database writes happen in the
+    worker and never on a web process.  When False they are written inline on
+    the flusher thread.
+
+Pending plays are also flushed at interpreter shutdown.
+
+Public API
+----------
+record_play(**fields) -> None
+    Queue one play.  ``fields`` are ``Play`` column values (``id``,
+    ``track_id``, ``user_id``, ``duration``, ``completed``, ``ip_address``,
+    ``user_agent``, ``created_at``).
+
+flush() -> int
+    Flush everything pending in this process.  Returns the number of plays.
+
+write_batch(rows) -> int
+    Persist a list of play dicts.  Used by the flusher and the django-q2 task.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from musewave.services import counters, stats
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    'batch_size': 500,
+    'max_age':    5.0,
+    'use_queue':  True,
+}
+
+
+def _config(name):
+    return getattr(settings, 'PLAY_BUFFER', {}).get(name, _DEFAULTS[name])
+
+
+class PlayBuffer:
+    """Thread-safe, per-process accumulator of pending play events."""
+
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self._pending    = []
+        self._first_at   = None
+        self._flusher    = None
+        self._registered = False
+
+    def record(self, **fields):
+        batch = None
+        with self._lock:
+            self._ensure_started()
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append(fields)
+            if len(self._pending) >= _config('batch_size'):
+                batch = self._detach()
+        if batch:
+            self._dispatch(batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._detach()
+        if batch:
+            self._dispatch(batch)
+        return len(batch)
+
+    def _detach(self):
+        batch, self._pending, self._first_at = self._pending, [], None
+        return batch
+
+    def _is_stale(self):
+        with self._lock:
+            return (
+                self._first_at is not None
+                and time.monotonic() - self._first_at >= _config('max_age')
+            )
+
+    def _ensure_started(self):
+        if not self._registered:
+            atexit.register(self._flush_at_exit)
+            self._registered = True
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(
+                target=self._run, name='play-buffer-flusher', daemon=True,
+            )
+            self._flusher.start()
+
+    def _run(self):
+        interval = max(0.1, _config('max_age') / 2)
+        while True:
+            time.sleep(interval)
+            if self._is_stale():
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Play buffer flush failed")
+
+    def _flush_at_exit(self):
+        try:
+            count = self.flush()
+            if count:
+                logger.info("Flushed %s buffered plays at shutdown", count)
+        except Exception:
+            logger.exception("Play buffer flush at shutdown failed")
+
+    def _dispatch(self, batch):
+        if _config('use_queue'):
+            from django_q.tasks import async_task
+            try:
+                async_task('musewave.tasks.flush_play_batch', batch)
+                return
+            except Exception as exc:
+                logger.warning("Could not queue play batch, writing inline: %s", exc)
+        try:
+            write_batch(batch)
+        except Exception:
+            # Put the batch back so the next flush retries it.
+            with self._lock:
+                self._pending[:0] = batch
+                if self._first_at is None:
+                    self._first_at = time.monotonic()
+            raise
+
+
+def write_batch(rows):
+    """Insert *rows* as ``Play`` records and apply grouped ``plays`` increments."""
+    from musewave.models import Play, Track, User
+
+    if not rows:
+        return 0
+
+    # Tracks or listeners may have been deleted while the plays were buffered.
+    track_ids = set(Track.objects.filter(
+        id__in={row['track_id'] for row in rows},
+    ).values_list('id', flat=True))
+    user_ids = set(User.objects.filter(
+        id__in={row['user_id'] for row in rows if row.get('user_id')},
+    ).values_list('id', flat=True))
+
+    plays = []
+    for row in rows:
+        if row['track_id'] not in track_ids:
+            continue
+        if row.get('user_id') and row['user_id'] not in user_ids:
+            row = {**row, 'user_id': None}
+        plays.append(Play(**row))
+
+    per_track = Counter(play.track_id for play in plays)
+    with transaction.atomic():
+        stats.record_plays(plays)
+        Play.objects.bulk_create(plays, batch_size=500)
+        counters.apply('plays', per_track)
+    return len(plays)
+
+
+_buffer = PlayBuffer()
+
+
+def record_play(**fields):
+    _buffer.record(**fields)
+
+
+def flush():
+    return _buffer.flush()
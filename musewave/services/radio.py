@@ -0,0 +1,354 @@
+"""
+Track radio: an endless queue of tracks that sound like a seed track.
+
+Each process keeps every published track as a row of a float32 feature
+matrix built from its metadata:
+
+* one-hot genre and mood, and multi-hot tags (the ``max_tags`` most used),
+  each block scaled to unit length;
+* BPM, scaled to 0 .. 1 over 60 – 200 (missing values get the catalog mean);
+* key on the circle of fifths as ``(cos, sin)`` of its position, relative
+  minors sharing their major's position, plus a small major/minor term.
+  Note names (``C#``, ``Ebm``, ``A minor``) and Camelot codes (``8A``) are
+  understood.
+
+Blocks are weighted by ``weights`` and rows normalised, so one matrix-vector
+product scores the whole catalog by cosine similarity to the seed.  The
+``limit × candidates`` best tracks form the candidate pool, and the queue is
+chained greedily through it: each next track is the candidate most similar
+to a blend of the previous track and the seed (``drift``), so the queue
+flows instead of jumping, with at most ``max_per_artist`` tracks per artist
+and no artist twice in a row while others are left.  The database is only
+touched to hydrate the resulting tracks.
+
+Freshness
+---------
+Track signal handlers update the local matrix in place (rows are appended
+into spare capacity; removed rows are masked) and bump a shared version in
+the Django cache (see ``musewave.services.versioned``).  Saves whose
+``update_fields`` name no feature field are ignored, and saves that leave a
+track's published state and features as the matrix already has them (edits
+to drafts, say) bump nothing.
+Other processes compare the version at most every ``check_interval`` seconds
+and rebuild in the background when it moved, or once the matrix is older
+than ``max_age`` seconds.  Tags, genres or moods first seen after a build
+take effect at the next rebuild.
+
+Public API
+----------
+queue(track_id, limit=50, exclude=()) -> [track_id] | None
+    Radio queue seeded by *track_id*, never containing the seed or the ids
+    in *exclude*.  ``None`` if the track does not exist.
+
+track_saved(track, update_fields=None), track_deleted(track_id)
+    Incremental updates, called from ``musewave/signals.py``.
+
+rebuild() -> int
+    Reload the local matrix from the database.  Returns the number of rows.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from musewave.services.tags import tag_slug
+from musewave.services.versioned import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'radio:version'
+
+_DEFAULTS = {
+    'weights':        {'genre': 1.0, 'mood': 0.6, 'tags': 0.8, 'bpm': 0.5, 'key': 0.4},
+    'max_tags':       256,
+    'max_per_artist': 2,
+    'candidates':     4,
+    'drift':          0.5,
+    'max_age':        3600.0,
+    'check_interval': 5.0,
+}
+
+_BPM_RANGE = (60.0, 200.0)
+
+_PITCH_CLASSES = {'c': 0, 'd': 2, 'e': 4, 'f': 5, 'g': 7, 'a': 9, 'b': 11}
+_NOTE_RE       = re.compile(r'^([a-g])\s*([#♯b♭]?)\s*(m|min|minor|maj|major)?$')
+_CAMELOT_RE    = re.compile(r'^(1[0-2]|[1-9])\s*([ab])$')
+
+_FIELDS = ('id', 'user_id', 'genre', 'mood', 'tags', 'bpm', 'key')
+
+# Saves limited to other fields (``update_fields``) leave the matrix alone.
+_INDEXED = frozenset(_FIELDS) | {'user', 'published'}
+
+
+def _config(name):
+    return getattr(settings, 'RADIO', {}).get(name, _DEFAULTS[name])
+
+
+def circle_of_fifths(key):
+    """``(position 0–11 from C, is_minor)`` for a key name, or ``None`` if it is not one."""
+    text = ' '.join(str(key or '').split()).lower()
+    match = _CAMELOT_RE.match(text)
+    if match:
+        # 8B is C major and 8A its relative minor; each step is a fifth.
+        return (int(match.group(1)) - 8) % 12, match.group(2) == 'a'
+    match = _NOTE_RE.match(text)
+    if not match:
+        return None
+    note, accidental, mode = match.groups()
+    pitch = _PITCH_CLASSES[note] + {'#': 1, '♯': 1, 'b': -1, '♭': -1}.get(accidental, 0)
+    minor = mode in ('m', 'min', 'minor')
+    if minor:
+        pitch += 3  # relative major
+    return (pitch * 7) % 12, minor
+
+
+def _snapshot(row):
+    tags = row['tags'] if isinstance(row['tags'], list) else []
+    return {
+        'user_id': row['user_id'],
+        'genre':   (row['genre'] or '').strip().lower(),
+        'mood':    (row['mood'] or '').strip().lower(),
+        'tags':    {tag_slug(str(tag)) for tag in tags if tag} - {''},
+        'bpm':     row['bpm'],
+        'key':     circle_of_fifths(row['key']),
+    }
+
+
+class _Vocabulary:
+    """Column layout of the feature matrix for one build."""
+
+    def __init__(self, snapshots):
+        weights = _config('weights')
+        self.genres = {g: i for i, g in enumerate(sorted({s['genre'] for s in snapshots if s['genre']}))}
+        self.moods  = {m: i for i, m in enumerate(sorted({s['mood'] for s in snapshots if s['mood']}))}
+        counts      = Counter(tag for s in snapshots for tag in s['tags'])
+        self.tags   = {t: i for i, (t, _) in enumerate(counts.most_common(_config('max_tags')))}
+
+        bpms = [s['bpm'] for s in snapshots if s['bpm']]
+        self.bpm_default = self._scale_bpm(sum(bpms) / len(bpms)) if bpms else 0.5
+
+        self.genre_at = 0
+        self.mood_at  = self.genre_at + len(self.genres)
+        self.tags_at  = self.mood_at + len(self.moods)
+        self.bpm_at   = self.tags_at + len(self.tags)
+        self.key_at   = self.bpm_at + 1
+        self.width    = self.key_at + 3
+        self.weights  = weights
+
+    @staticmethod
+    def _scale_bpm(bpm):
+        low, high = _BPM_RANGE
+        return min(1.0, max(0.0, (float(bpm) - low) / (high - low)))
+
+    def vector(self, snapshot):
+        w   = self.weights
+        row = np.zeros(self.width, np.float32)
+        if snapshot['genre'] in self.genres:
+            row[self.genre_at + self.genres[snapshot['genre']]] = w['genre']
+        if snapshot['mood'] in self.moods:
+            row[self.mood_at + self.moods[snapshot['mood']]] = w['mood']
+        tags = [self.tags[tag] for tag in snapshot['tags'] if tag in self.tags]
+        if tags:
+            row[[self.tags_at + i for i in tags]] = w['tags'] / math.sqrt(len(tags))
+        row[self.bpm_at] = w['bpm'] * (self._scale_bpm(snapshot['bpm']) if snapshot['bpm'] else self.bpm_default)
+        if snapshot['key'] is not None:
+            position, minor = snapshot['key']
+            angle = 2 * math.pi * position / 12
+            row[self.key_at:self.key_at + 3] = (
+                w['key'] * math.cos(angle), w['key'] * math.sin(angle), w['key'] * (0.25 if minor else -0.25),
+            )
+        norm = float(np.linalg.norm(row))
+        return row / norm if norm else row
+
+
+class RadioIndex(VersionedIndex):
+    """Feature matrix of published tracks with spare capacity for appends."""
+
+    name        = 'radio'
+    version_key = VERSION_KEY
+
+    def __init__(self):
+        super().__init__()
+        self._vocab      = _Vocabulary([])
+        self._matrix     = np.zeros((0, self._vocab.width), np.float32)
+        self._alive      = np.zeros(0, bool)
+        self._artists    = np.zeros(0, np.int64)
+        self._ids        = []
+        self._rows       = {}
+        self._artist_of  = {}
+        self._snapshots  = {}
+        self._size       = 0
+
+    def _setting(self, name):
+        return _config(name)
+
+    # ── incremental updates ──────────────────────────────────────────────────
+
+    def _put(self, track_id, snapshot):
+        key = str(track_id)
+        row = self._rows.get(key)
+        if row is None:
+            if self._size == len(self._matrix):
+                self._grow(max(64, 2 * self._size))
+            row = self._size
+            self._size += 1
+            self._rows[key] = row
+            self._ids.append(key)
+        self._matrix[row]  = self._vocab.vector(snapshot)
+        self._artists[row] = self._artist_of.setdefault(snapshot['user_id'], len(self._artist_of))
+        self._alive[row]   = True
+
+    def _grow(self, capacity):
+        matrix = np.zeros((capacity, self._vocab.width), np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        alive   = np.zeros(capacity, bool)
+        artists = np.zeros(capacity, np.int64)
+        alive[:self._size]   = self._alive[:self._size]
+        artists[:self._size] = self._artists[:self._size]
+        self._matrix, self._alive, self._artists = matrix, alive, artists
+
+    def _drop(self, track_id):
+        row = self._rows.get(str(track_id))
+        if row is not None:
+            self._alive[row] = False
+
+    def _apply_snapshot(self, track_id, snapshot):
+        key = str(track_id)
+        if self._snapshots.get(key) == snapshot:
+            return False
+        if snapshot is None:
+            self._snapshots.pop(key)
+            self._drop(track_id)
+        else:
+            self._snapshots[key] = snapshot
+            self._put(track_id, snapshot)
+        return True
+
+    def track_saved(self, track, update_fields=None):
+        if update_fields is not None and not set(update_fields) & _INDEXED:
+            return
+        snapshot = _snapshot({field: getattr(track, field) for field in _FIELDS}) if track.published else None
+        self._apply(lambda: self._apply_snapshot(track.pk, snapshot))
+
+    def track_deleted(self, track_id):
+        self._apply(lambda: self._apply_snapshot(track_id, None))
+
+    def rebuild(self):
+        from musewave.models import Track
+
+        with self._rebuilding:
+            version = self._shared_version()
+            rows    = list(Track.objects.filter(published=True).values(*_FIELDS).iterator(chunk_size=2000))
+            snaps   = [_snapshot(row) for row in rows]
+
+            fresh = RadioIndex.__new__(RadioIndex)
+            fresh._vocab     = _Vocabulary(snaps)
+            fresh._matrix    = np.zeros((len(rows), fresh._vocab.width), np.float32)
+            fresh._alive     = np.zeros(len(rows), bool)
+            fresh._artists   = np.zeros(len(rows), np.int64)
+            fresh._ids, fresh._rows, fresh._artist_of, fresh._size = [], {}, {}, 0
+            fresh._snapshots = {}
+            for row, snapshot in zip(rows, snaps):
+                fresh._snapshots[str(row['id'])] = snapshot
+                fresh._put(row['id'], snapshot)
+
+            with self._lock:
+                self._vocab, self._matrix = fresh._vocab, fresh._matrix
+                self._alive, self._artists = fresh._alive, fresh._artists
+                self._ids, self._rows      = fresh._ids, fresh._rows
+                self._artist_of, self._size = fresh._artist_of, fresh._size
+                self._snapshots = fresh._snapshots
+                self._mark_built(version)
+
+        logger.info("Rebuilt radio index: %d tracks, %d features", len(rows), self._vocab.width)
+        return len(rows)
+
+    # ── queue ────────────────────────────────────────────────────────────────
+
+    def _seed(self, track_id):
+        """``(vector, row or None, artist)`` for the seed, loading it if it is not indexed."""
+        from musewave.models import Track
+
+        row = self._rows.get(str(track_id))
+        if row is not None and self._alive[row]:
+            return self._matrix[row].copy(), row, self._artists[row]
+        found = Track.objects.filter(pk=track_id).values(*_FIELDS).first()
+        if found is None:
+            return None
+        snapshot = _snapshot(found)
+        return self._vocab.vector(snapshot), None, self._artist_of.get(snapshot['user_id'], -1)
+
+    def queue(self, track_id, limit=50, exclude=()):
+        self._ensure_fresh()
+
+        with self._lock:
+            seed = self._seed(track_id)
+            if seed is None:
+                return None
+            vector, seed_row, seed_artist = seed
+
+            size   = self._size
+            matrix = self._matrix[:size]
+            scores = matrix @ vector
+            scores[~self._alive[:size]] = -np.inf
+            if seed_row is not None:
+                scores[seed_row] = -np.inf
+            for excluded in exclude:
+                row = self._rows.get(str(excluded))
+                if row is not None:
+                    scores[row] = -np.inf
+
+            pool = min(int(np.isfinite(scores).sum()), limit * _config('candidates'))
+            if pool <= 0:
+                return []
+            candidates = np.argpartition(-scores, pool - 1)[:pool]
+            vectors    = matrix[candidates]
+            artists    = self._artists[candidates]
+            to_seed    = scores[candidates]
+            ids        = [self._ids[row] for row in candidates]
+
+        drift   = _config('drift')
+        per_cap = _config('max_per_artist')
+        _, artist_of = np.unique(artists, return_inverse=True)
+        counts    = np.zeros(artist_of.max() + 1, np.int64)
+        available = np.ones(pool, bool)
+        last      = artist_of[artists == seed_artist][0] if (artists == seed_artist).any() else -1
+        previous  = to_seed
+        queue     = []
+        while len(queue) < limit:
+            allowed = available & (counts[artist_of] < per_cap)
+            if not allowed.any():
+                break
+            preferred = allowed & (artist_of != last)
+            rank = np.where(preferred if preferred.any() else allowed, drift * previous + (1 - drift) * to_seed, -np.inf)
+            pick = int(np.argmax(rank))
+
+            queue.append(ids[pick])
+            available[pick] = False
+            last = artist_of[pick]
+            counts[last] += 1
+            previous = vectors @ vectors[pick]
+        return queue
+
+
+_index = RadioIndex()
+
+
+def queue(track_id, limit=50, exclude=()):
+    return _index.queue(track_id, limit=limit, exclude=exclude)
+
+
+def track_saved(track, update_fields=None):
+    _index.track_saved(track, update_fields)
+
+
+def track_deleted(track_id):
+    _index.track_deleted(track_id)
+
+
+def rebuild():
+    return _index.rebuild()
@@ -0,0 +1,299 @@
+"""
+Full-text search over tracks and users.
+
+The search endpoint used to run ``icontains`` over half a dozen columns and
+the ``tags`` JSON blob, which forces full table scans and returns unranked
+results.  Searches now go through a pluggable backend selected by
+``settings.SEARCH_BACKEND`` (dotted path):
+
+``musewave.services.search.SQLiteFTS5Backend`` (default on SQLite)
+    Inverted index in two SQLite FTS5 virtual tables.  Results are ranked by
+    BM25 relevance blended with ``log(1 + plays)``.
+
+``musewave.services.search.DatabaseBackend`` (default elsewhere)
+    Portable ``icontains`` fallback for databases without FTS5, ordered by
+    plays.
+
+The index is kept current by the Track/User signal handlers in
+``musewave/signals.py`` and fully rebuilt by ``POST /api/search/rebuild`` or
+``manage.py rebuild_search_index``.
+
+Public API
+----------
+get_backend() -> SearchBackend
+    The configured backend (cached per process).
+"""
+
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+class SearchBackend:
+    """Interface every search backend implements."""
+
+    def index_track(self, track):
+        raise NotImplementedError
+
+    def remove_track(self, track_id):
+        raise NotImplementedError
+
+    def index_user(self, user):
+        raise NotImplementedError
+
+    def remove_user(self, user_id):
+        raise NotImplementedError
+
+    def search_tracks(self, query, limit):
+        """Return ids of published tracks matching *query*, best first."""
+        raise NotImplementedError
+
+    def search_users(self, query, limit):
+        """Return ids of users matching *query*, best first."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Re-index everything.  Returns ``{'tracks': n, 'users': n}``."""
+        raise NotImplementedError
+
+
+class DatabaseBackend(SearchBackend):
+    """``icontains`` over the source tables — no index to maintain."""
+
+    def index_track(self, track):
+        pass
+
+    def remove_track(self, track_id):
+        pass
+
+    def index_user(self, user):
+        pass
+
+    def remove_user(self, user_id):
+        pass
+
+    def search_tracks(self, query, limit):
+        from musewave.models import Track, TrackTag
+
+        return list(
+            Track.objects.filter(
+                Q(title__icontains=query) | Q(artist__icontains=query) |
+                Q(genre__icontains=query) | Q(mood__icontains=query) |
+                Q(id__in=TrackTag.objects.filter(tag__name__icontains=query).values('track_id')),
+                published=True,
+            ).order_by('-plays').values_list('id', flat=True)[:limit]
+        )
+
+    def search_users(self, query, limit):
+        from musewave.models import User
+
+        return list(
+            User.objects.filter(
+                Q(username__icontains=query) |
+                Q(display_name__icontains=query) |
+                Q(bio__icontains=query),
+            ).values_list('id', flat=True)[:limit]
+        )
+
+    def rebuild(self):
+        from musewave.models import Track, User
+
+        return {'tracks': Track.objects.filter(published=True).count(), 'users': User.objects.count()}
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """
+    Two FTS5 tables, ``search_tracks`` and ``search_users``, keyed by the
+    same hex UUID the ORM stores in the source tables.
+    """
+
+    # Column weights for bm25(): title, artist, genre, mood, tags.
+    TRACK_WEIGHTS = (10.0, 6.0, 2.0, 2.0, 3.0)
+    # username, display_name, bio.
+    USER_WEIGHTS = (8.0, 6.0, 1.0)
+    # How strongly popularity pulls a result up relative to text relevance.
+    POPULARITY_WEIGHT = 0.5
+
+    def __init__(self):
+        # Databases (by NAME) whose FTS5 tables exist outside any transaction.
+        self._schema_ready = set()
+
+    def _ensure_schema(self):
+        database = connection.settings_dict['NAME']
+        if database in self._schema_ready:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('search_tracks', 'search_users')")
+            existing = {name for name, in cursor.fetchall()}
+            if 'search_tracks' not in existing:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search_tracks USING fts5("
+                    "track_id UNINDEXED, title, artist, genre, mood, tags, "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            if 'search_users' not in existing:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search_users USING fts5("
+                    "user_id UNINDEXED, username, display_name, bio, "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+        # Inside a transaction the tables may have been created by it and
+        # vanish on rollback, so only remember what autocommit has seen.
+        if not connection.in_atomic_block:
+            self._schema_ready.add(database)
+
+    @staticmethod
+    def _match(query):
+        tokens = _tokens(query)
+        return ' '.join(f'"{token}"*' for token in tokens) if tokens else None
+
+    @staticmethod
+    def _track_row(track):
+        tags = track.tags if isinstance(track.tags, list) else []
+        return (
+            track.id.hex, track.title, track.artist, track.genre,
+            track.mood or '', ' '.join(str(tag) for tag in tags),
+        )
+
+    @staticmethod
+    def _user_row(user):
+        return (user.id.hex, user.username, user.display_name or '', user.bio or '')
+
+    def index_track(self, track):
+        self._ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_tracks WHERE track_id = %s", [track.id.hex])
+            if track.published:
+                cursor.execute(
+                    "INSERT INTO search_tracks (track_id, title, artist, genre, mood, tags) "
+                    "VALUES (%s, %s, %s, %s, %s, %s)",
+                    self._track_row(track),
+                )
+
+    def remove_track(self, track_id):
+        self._ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_tracks WHERE track_id = %s", [_hex(track_id)])
+
+    def index_user(self, user):
+        self._ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_users WHERE user_id = %s", [user.id.hex])
+            cursor.execute(
+                "INSERT INTO search_users (user_id, username, display_name, bio) "
+                "VALUES (%s, %s, %s, %s)",
+                self._user_row(user),
+            )
+
+    def remove_user(self, user_id):
+        self._ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_users WHERE user_id = %s", [_hex(user_id)])
+
+    def search_tracks(self, query, limit):
+        match = self._match(query)
+        if not match:
+            return []
+        self._ensure_schema()
+        weights = ', '.join(str(w) for w in self.TRACK_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT search_tracks.track_id FROM search_tracks "
+                f"JOIN tracks t ON t.id = search_tracks.track_id "
+                f"WHERE search_tracks MATCH %s AND t.published "
+                f"ORDER BY bm25(search_tracks, 0, {weights}) - %s * LN(1 + t.plays) "
+                f"LIMIT %s",
+                [match, self.POPULARITY_WEIGHT, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_users(self, query, limit):
+        match = self._match(query)
+        if not match:
+            return []
+        self._ensure_schema()
+        weights = ', '.join(str(w) for w in self.USER_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT user_id FROM search_users WHERE search_users MATCH %s "
+                f"ORDER BY bm25(search_users, 0, {weights}) LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild(self):
+        from musewave.models import Track, User
+
+        self._ensure_schema()
+        track_fields = ['id', 'title', 'artist', 'genre', 'mood', 'tags', 'published']
+        user_fields  = ['id', 'username', 'display_name', 'bio']
+        counts = {'tracks': 0, 'users': 0}
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_tracks")
+            cursor.execute("DELETE FROM search_users")
+
+            batch = []
+            for track in Track.objects.filter(published=True).only(*track_fields).iterator(chunk_size=1000):
+                batch.append(self._track_row(track))
+                if len(batch) >= 1000:
+                    counts['tracks'] += self._insert(cursor, 'search_tracks', batch)
+                    batch = []
+            counts['tracks'] += self._insert(cursor, 'search_tracks', batch)
+
+            batch = []
+            for user in User.objects.only(*user_fields).iterator(chunk_size=1000):
+                batch.append(self._user_row(user))
+                if len(batch) >= 1000:
+                    counts['users'] += self._insert(cursor, 'search_users', batch)
+                    batch = []
+            counts['users'] += self._insert(cursor, 'search_users', batch)
+
+            cursor.execute("INSERT INTO search_tracks(search_tracks) VALUES ('optimize')")
+            cursor.execute("INSERT INTO search_users(search_users) VALUES ('optimize')")
+
+        logger.info("Rebuilt search index: %s tracks, %s users", counts['tracks'], counts['users'])
+        return counts
+
+    @staticmethod
+    def _insert(cursor, table, rows):
+        if not rows:
+            return 0
+        if table == 'search_tracks':
+            sql = ("INSERT INTO search_tracks (track_id, title, artist, genre, mood, tags) "
+                   "VALUES (%s, %s, %s, %s, %s, %s)")
+        else:
+            sql = ("INSERT INTO search_users (user_id, username, display_name, bio) "
+                   "VALUES (%s, %s, %s, %s)")
+        cursor.executemany(sql, rows)
+        return len(rows)
+
+
+def _hex(value):
+    return getattr(value, 'hex', None) or str(value).replace('-', '')
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        default = (
+            'musewave.services.search.SQLiteFTS5Backend' if connection.vendor == 'sqlite'
+            else 'musewave.services.search.DatabaseBackend'
+        )
+        _backend = import_string(getattr(settings, 'SEARCH_BACKEND', None) or default)()
+    return _backend
@@ -0,0 +1,232 @@
+"""
+"Similar tracks" from co-listening.
+
+Offline, the listening history of the last ``window_days`` is turned into a
+sparse user × track matrix: each cell is ``log(1 + plays)`` plus
+``like_weight`` if the user liked the track, and each user keeps only their
+``max_user_tracks`` strongest cells so a handful of heavy listeners cannot
+dominate.  Two tracks are similar when the same people listen to both:
+the score is the cosine of their columns, counted only when at least
+``min_overlap`` users share them.  The ``neighbors`` best published tracks
+are stored per track in ``TrackSimilarity``, so the request path is one
+primary-key lookup.
+
+The matrix is held as CSR (by user) and CSC (by track) NumPy arrays.  Rows
+of the item × item product are computed a batch of tracks at a time by
+expanding every (track, user) pair of the batch into that user's row and
+summing with ``np.bincount``.  A track costs its dense row (``n_tracks``
+cells) plus its expansion (the summed row lengths of its listeners), and a
+batch closes before its total passes ``batch_cells``, so every temporary
+array stays within that many entries (a single track can exceed it on its
+own).  No SciPy is needed.
+
+Rebuilds are incremental: the matrix is always rebuilt (one ``GROUP BY``
+over ``Play`` plus the ``Like`` rows), but neighbour lists are recomputed
+only for tracks with new plays or likes since the last run and tracks that
+have none yet.  A full rebuild also refreshes the lists that drifted
+because a neighbour's audience changed and drops removed tracks.
+
+Public API
+----------
+rebuild(full=False) -> int
+    Recompute neighbour lists (all of them with *full*).  Returns how many
+    tracks were written.
+
+neighbors(track_id, limit) -> [(track_id, score)] | None
+    The stored neighbours of a track, or ``None`` if it has never been
+    computed.
+"""
+
+import logging
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    'neighbors':       20,
+    'window_days':     180,
+    'like_weight':     2.0,
+    'min_overlap':     2,
+    'max_user_tracks': 500,
+    'batch_cells':     4_000_000,
+    # Plays reach the table a few seconds after they happen (play buffer).
+    'dirty_margin':    900,
+}
+
+
+def _config(name):
+    return getattr(settings, 'SIMILAR_TRACKS', {}).get(name, _DEFAULTS[name])
+
+
+# ─── Matrix ───────────────────────────────────────────────────────────────────
+
+class _Matrix:
+    """User × track interaction matrix in CSR and CSC form."""
+
+    def __init__(self, cells):
+        users, tracks = {}, {}
+        u = np.fromiter((users.setdefault(user, len(users)) for user, _ in cells), np.int64, len(cells))
+        t = np.fromiter((tracks.setdefault(track, len(tracks)) for _, track in cells), np.int64, len(cells))
+        v = np.fromiter(cells.values(), np.float64, len(cells))
+
+        # Keep each user's strongest cells only.
+        order = np.lexsort((-v, u))
+        u, t, v = u[order], t[order], v[order]
+        first = np.searchsorted(u, u)
+        keep  = np.arange(len(u)) - first < _config('max_user_tracks')
+        u, t, v = u[keep], t[keep], v[keep]
+
+        self.track_ids  = list(tracks)
+        self.track_of   = tracks
+        self.n_tracks   = len(tracks)
+        self.row_ptr    = np.concatenate(([0], np.cumsum(np.bincount(u, minlength=len(users)))))
+        self.row_tracks = t
+        self.row_vals   = v
+
+        order = np.argsort(t, kind='stable')
+        self.col_ptr   = np.concatenate(([0], np.cumsum(np.bincount(t, minlength=self.n_tracks))))
+        self.col_users = u[order]
+        self.col_vals  = v[order]
+        self.norms     = np.sqrt(np.bincount(t, weights=v * v, minlength=self.n_tracks))
+
+
+def _ranges(starts, lengths):
+    """Concatenation of ``range(s, s + n)`` for each pair, vectorised."""
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def _load(since):
+    from musewave.models import Like, Play
+
+    cells = {}
+    plays = (
+        Play.objects.filter(user__isnull=False, created_at__gte=since, track__published=True)
+        .values('user_id', 'track_id').annotate(n=Count('id')).values_list('user_id', 'track_id', 'n')
+        .order_by()
+    )
+    for user_id, track_id, n in plays.iterator(chunk_size=10000):
+        cells[(user_id, track_id)] = math.log1p(n)
+    like_weight = _config('like_weight')
+    likes = Like.objects.filter(track__published=True).values_list('user_id', 'track_id')
+    for key in likes.iterator(chunk_size=10000):
+        cells[key] = cells.get(key, 0.0) + like_weight
+    return _Matrix(cells)
+
+
+def _neighbors(matrix, batch):
+    """``[(track_index, [(neighbour_index, score), …]), …]`` for the track indices in *batch*."""
+    n_tracks = matrix.n_tracks
+    size     = len(batch)
+
+    # Every (target, user) pair of the batch…
+    lengths = matrix.col_ptr[batch + 1] - matrix.col_ptr[batch]
+    pairs   = _ranges(matrix.col_ptr[batch], lengths)
+    target  = np.repeat(np.arange(size), lengths)
+    user    = matrix.col_users[pairs]
+    weight  = matrix.col_vals[pairs]
+
+    # …expanded into that user's row.
+    lengths = matrix.row_ptr[user + 1] - matrix.row_ptr[user]
+    cells   = _ranges(matrix.row_ptr[user], lengths)
+    flat    = np.repeat(target, lengths) * n_tracks + matrix.row_tracks[cells]
+    dots    = np.bincount(flat, weights=np.repeat(weight, lengths) * matrix.row_vals[cells], minlength=size * n_tracks)
+    overlap = np.bincount(flat, minlength=size * n_tracks)
+
+    scores = dots.reshape(size, n_tracks) / np.outer(matrix.norms[batch], matrix.norms)
+    scores[overlap.reshape(size, n_tracks) < _config('min_overlap')] = 0
+    scores[np.arange(size), batch] = 0
+
+    k = min(_config('neighbors'), n_tracks - 1)
+    if k <= 0:
+        return [(index, []) for index in batch]
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for row, index in enumerate(batch):
+        picked = best[row][np.argsort(-scores[row, best[row]])]
+        results.append((index, [(j, scores[row, j]) for j in picked if scores[row, j] > 0]))
+    return results
+
+
+def _batches(matrix, targets):
+    """Split *targets* into runs whose dense rows plus expansions fit in ``batch_cells``."""
+    row_lengths = np.diff(matrix.row_ptr)
+    col_tracks  = np.repeat(np.arange(matrix.n_tracks), np.diff(matrix.col_ptr))
+    expansion   = np.bincount(col_tracks, weights=row_lengths[matrix.col_users], minlength=matrix.n_tracks)
+    cumulative  = np.cumsum(matrix.n_tracks + expansion[targets])
+
+    budget, start = _config('batch_cells'), 0
+    while start < len(targets):
+        spent = cumulative[start - 1] if start else 0
+        end   = max(start + 1, int(np.searchsorted(cumulative, spent + budget, side='right')))
+        yield targets[start:end]
+        start = end
+
+
+# ─── Rebuild ──────────────────────────────────────────────────────────────────
+
+def _dirty(matrix, since):
+    """Indices of tracks whose audience changed after *since* or that have no list yet."""
+    from musewave.models import Like, Play, TrackSimilarity
+
+    plays   = Play.objects.filter(user__isnull=False, created_at__gte=since)
+    likes   = Like.objects.filter(created_at__gte=since)
+    changed = set(plays.values_list('track_id', flat=True).distinct())
+    changed |= set(likes.values_list('track_id', flat=True).distinct())
+    changed |= set(matrix.track_ids) - set(TrackSimilarity.objects.values_list('track_id', flat=True))
+    return np.array(sorted(matrix.track_of[t] for t in changed if t in matrix.track_of), dtype=np.int64)
+
+
+def rebuild(full=False):
+    from musewave.models import TrackSimilarity
+
+    started = timezone.now()
+    matrix  = _load(started - timedelta(days=_config('window_days')))
+
+    last = TrackSimilarity.objects.aggregate(last=Max('computed_at'))['last']
+    if full or last is None:
+        targets = np.arange(matrix.n_tracks)
+    else:
+        targets = _dirty(matrix, last - timedelta(seconds=_config('dirty_margin')))
+
+    written = 0
+    for batch in _batches(matrix, targets):
+        rows = [
+            TrackSimilarity(
+                track_id=matrix.track_ids[index],
+                neighbors=[[str(matrix.track_ids[j]), round(float(score), 4)] for j, score in found],
+                computed_at=started,
+            )
+            for index, found in _neighbors(matrix, batch)
+        ]
+        TrackSimilarity.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['track'], update_fields=['neighbors', 'computed_at'],
+        )
+        written += len(rows)
+
+    if full:
+        TrackSimilarity.objects.exclude(computed_at=started).delete()
+
+    logger.info(
+        "Computed similar tracks for %d of %d tracks (%s) in %.1fs",
+        written, matrix.n_tracks, 'full' if full else 'incremental',
+        (timezone.now() - started).total_seconds(),
+    )
+    return written
+
+
+# ─── Read side ────────────────────────────────────────────────────────────────
+
+def neighbors(track_id, limit):
+    from musewave.models import TrackSimilarity
+
+    stored = TrackSimilarity.objects.filter(track_id=track_id).values_list('neighbors', flat=True).first()
+    if stored is None:
+        return None
+    return [(neighbor_id, score) for neighbor_id, score in stored[:limit]]
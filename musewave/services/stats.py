@@ -0,0 +1,292 @@
+"""
+Pre-aggregated statistics.
+
+``TrackDailyStats`` holds one row per track per day with play, duration and
+completion totals plus a HyperLogLog sketch of the day's listeners;
+``TrackReach`` holds the all-time listener sketch of each track.  Both are
+updated from the play write path (``services/play_buffer.write_batch``) so
+the stats endpoints never scan the ``plays`` table;
+``manage.py backfill_daily_stats`` rebuilds them from history.
+
+Listeners are identified by user id, or by a hash of IP + user agent for
+anonymous plays (see ``services/hll.listener_key``).
+
+Public API
+----------
+record_plays(plays) -> None
+    Fold a batch of unsaved ``Play`` instances into the daily rollup and the
+    listener sketches.  Must run inside the transaction that inserts them.
+
+backfill_daily_stats(track_ids=None) -> int
+    Rebuild the rollup from ``Play`` rows.  Returns the number of rows written.
+
+``ArtistStats`` holds one snapshot per artist for ``GET /api/users/<id>/stats``.
+
+adjust_artist(user_id, **deltas) -> None
+    Add ``deltas`` (``total_plays=3`` …) to an artist's snapshot with ``F()``.
+    Artists without a snapshot are skipped; theirs is built from scratch on
+    first read, which already includes the change.
+
+apply_track_deltas(field, deltas) -> None
+    Roll ``{track_id: n}`` counter deltas up to the owning artists.
+
+rebuild_artist_stats(user_id) -> ArtistStats
+    Recompute one artist's snapshot from source rows.
+
+refresh_monthly_listeners() -> int
+    Recompute the 30-day unique listener estimate for every snapshot by
+    merging the daily sketches of the artist's tracks.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from musewave.services import hll
+
+logger = logging.getLogger(__name__)
+
+MONTHLY_WINDOW_DAYS = 30
+
+# Track counter field -> ArtistStats column.
+ARTIST_COUNTER_FIELDS = {
+    'plays':     'total_plays',
+    'likes':     'total_likes',
+    'downloads': 'total_downloads',
+}
+
+
+def _day(created_at):
+    return created_at.astimezone(dt_timezone.utc).date()
+
+
+def _listener_key(play):
+    return hll.listener_key(play.user_id, play.ip_address, play.user_agent)
+
+
+def _sketch_values(sketch):
+    return {'listener_sketch': sketch.to_bytes(), 'unique_listeners': sketch.count()}
+
+
+def _upsert_daily(track_id, day, increments, sketch):
+    from musewave.models import TrackDailyStats
+
+    lookup = {'track_id': track_id, 'date': day}
+    counts = {name: F(name) + value for name, value in increments.items()}
+    if TrackDailyStats.objects.filter(**lookup).update(**_sketch_values(sketch), **counts):
+        return
+    try:
+        with transaction.atomic():
+            TrackDailyStats.objects.create(**lookup, **_sketch_values(sketch), **increments)
+    except IntegrityError:
+        # Another batch inserted the row after we looked; fold ours into it.
+        stored = TrackDailyStats.objects.select_for_update().filter(**lookup).values_list('listener_sketch', flat=True).get()
+        sketch.merge(hll.HyperLogLog(stored))
+        TrackDailyStats.objects.filter(**lookup).update(**_sketch_values(sketch), **counts)
+
+
+def _upsert_reach(track_id, sketch):
+    from musewave.models import TrackReach
+
+    if TrackReach.objects.filter(track_id=track_id).update(**_sketch_values(sketch)):
+        return
+    try:
+        with transaction.atomic():
+            TrackReach.objects.create(track_id=track_id, **_sketch_values(sketch))
+    except IntegrityError:
+        stored = TrackReach.objects.select_for_update().filter(track_id=track_id).values_list('listener_sketch', flat=True).get()
+        sketch.merge(hll.HyperLogLog(stored))
+        TrackReach.objects.filter(track_id=track_id).update(**_sketch_values(sketch))
+
+
+def record_plays(plays):
+    from musewave.models import TrackDailyStats, TrackReach
+
+    groups = defaultdict(list)
+    for play in plays:
+        groups[(play.track_id, _day(play.created_at))].append(play)
+    track_ids = {track_id for track_id, _ in groups}
+    days      = {day for _, day in groups}
+
+    # Sketches are read-modify-write, so lock the rows being extended.
+    daily_sketches = {
+        (track_id, day): sketch
+        for track_id, day, sketch in TrackDailyStats.objects.select_for_update()
+        .filter(track_id__in=track_ids, date__in=days)
+        .values_list('track_id', 'date', 'listener_sketch')
+    }
+    reach_sketches = dict(
+        TrackReach.objects.select_for_update()
+        .filter(track_id__in=track_ids)
+        .values_list('track_id', 'listener_sketch')
+    )
+
+    reach = {}
+    for (track_id, day), group in groups.items():
+        keys   = [_listener_key(play) for play in group]
+        sketch = hll.HyperLogLog(daily_sketches.get((track_id, day))).update(keys)
+        _upsert_daily(track_id, day, {
+            'plays':          len(group),
+            'total_duration': sum(float(play.duration or 0) for play in group),
+            'completions':    sum(1 for play in group if play.completed),
+        }, sketch)
+
+        if track_id not in reach:
+            reach[track_id] = hll.HyperLogLog(reach_sketches.get(track_id))
+        reach[track_id].update(keys)
+
+    for track_id, sketch in reach.items():
+        _upsert_reach(track_id, sketch)
+
+
+def _write_backfill(track_id, days, reach):
+    from musewave.models import TrackDailyStats
+
+    rows = []
+    for day, (plays, duration, completions, sketch) in days.items():
+        rows.append(TrackDailyStats(
+            track_id=track_id, date=day,
+            plays=plays, total_duration=duration, completions=completions,
+            listener_sketch=sketch.to_bytes(), unique_listeners=sketch.count(),
+        ))
+    TrackDailyStats.objects.bulk_create(rows, batch_size=500)
+    _upsert_reach(track_id, reach)
+    return len(rows)
+
+
+def backfill_daily_stats(track_ids=None):
+    """
+    Rebuild the daily rollup and listener sketches in one streaming pass over
+    ``Play`` ordered by track, holding at most one track's sketches in memory.
+    """
+    from musewave.models import Play, TrackDailyStats, TrackReach
+
+    plays    = Play.objects.all()
+    existing = TrackDailyStats.objects.all()
+    reaches  = TrackReach.objects.all()
+    if track_ids is not None:
+        plays    = plays.filter(track_id__in=track_ids)
+        existing = existing.filter(track_id__in=track_ids)
+        reaches  = reaches.filter(track_id__in=track_ids)
+
+    rows = plays.order_by('track_id').values_list(
+        'track_id', 'user_id', 'ip_address', 'user_agent', 'created_at', 'duration', 'completed',
+    )
+
+    written = 0
+    with transaction.atomic():
+        existing.delete()
+        reaches.delete()
+
+        current, days, reach = None, {}, None
+        for track_id, user_id, ip, ua, created_at, duration, completed in rows.iterator(chunk_size=5000):
+            if track_id != current:
+                if current is not None:
+                    written += _write_backfill(current, days, reach)
+                current, days, reach = track_id, {}, hll.HyperLogLog()
+
+            key = hll.listener_key(user_id, ip, ua)
+            day = _day(created_at)
+            if day not in days:
+                days[day] = [0, 0.0, 0, hll.HyperLogLog()]
+            totals = days[day]
+            totals[0] += 1
+            totals[1] += duration or 0
+            totals[2] += 1 if completed else 0
+            totals[3].add(key)
+            reach.add(key)
+
+        if current is not None:
+            written += _write_backfill(current, days, reach)
+
+    logger.info("Backfilled %s daily stats rows", written)
+    return written
+
+
+# ─── Artist snapshots ─────────────────────────────────────────────────────────
+
+def adjust_artist(user_id, **deltas):
+    from musewave.models import ArtistStats
+
+    deltas = {name: value for name, value in deltas.items() if value}
+    if deltas:
+        ArtistStats.objects.filter(user_id=user_id).update(
+            updated_at=timezone.now(),
+            **{name: F(name) + value for name, value in deltas.items()},
+        )
+
+
+def apply_track_deltas(field, deltas):
+    from musewave.models import Track
+
+    column = ARTIST_COUNTER_FIELDS.get(field)
+    if not column or not deltas:
+        return
+
+    per_artist = defaultdict(int)
+    owners = Track.objects.filter(id__in=list(deltas)).values_list('id', 'user_id')
+    for track_id, user_id in owners:
+        per_artist[user_id] += deltas[track_id]
+    for user_id, value in per_artist.items():
+        adjust_artist(user_id, **{column: value})
+
+
+def _monthly_listeners(user_ids=None):
+    """Merge the last 30 days of per-track sketches into one estimate per artist."""
+    from musewave.models import TrackDailyStats
+
+    since = timezone.now().date() - timedelta(days=MONTHLY_WINDOW_DAYS - 1)
+    rows  = TrackDailyStats.objects.filter(date__gte=since, listener_sketch__isnull=False)
+    if user_ids is not None:
+        rows = rows.filter(track__user_id__in=user_ids)
+
+    # One packed register vector per artist, folded in as the rows stream past.
+    packed = {}
+    for user_id, sketch in rows.values_list('track__user_id', 'listener_sketch').iterator(chunk_size=2000):
+        if sketch:
+            packed[user_id] = hll._lane_max(packed.get(user_id, 0), int.from_bytes(bytes(sketch), 'big'))
+    return {
+        user_id: hll.HyperLogLog(registers.to_bytes(hll.REGISTERS, 'big')).count()
+        for user_id, registers in packed.items()
+    }
+
+
+def rebuild_artist_stats(user_id):
+    from musewave.models import ArtistStats, Follow, Track
+
+    totals = Track.objects.filter(user_id=user_id).aggregate(
+        tracks=Count('id'), plays=Sum('plays'), likes=Sum('likes'), downloads=Sum('downloads'),
+    )
+    snapshot, _ = ArtistStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'total_tracks':         totals['tracks'],
+            'total_plays':          totals['plays'] or 0,
+            'total_likes':          totals['likes'] or 0,
+            'total_downloads':      totals['downloads'] or 0,
+            'total_followers':      Follow.objects.filter(following_id=user_id).count(),
+            'total_following':      Follow.objects.filter(follower_id=user_id).count(),
+            'monthly_listeners':    _monthly_listeners([user_id]).get(user_id, 0),
+            'listeners_updated_at': timezone.now(),
+        },
+    )
+    return snapshot
+
+
+def refresh_monthly_listeners():
+    from musewave.models import ArtistStats
+
+    listeners = _monthly_listeners()
+    now       = timezone.now()
+    snapshots = list(ArtistStats.objects.only('user_id', 'monthly_listeners'))
+    for snapshot in snapshots:
+        snapshot.monthly_listeners    = listeners.get(snapshot.user_id, 0)
+        snapshot.listeners_updated_at = now
+    ArtistStats.objects.bulk_update(
+        snapshots, ['monthly_listeners', 'listeners_updated_at'], batch_size=500,
+    )
+    return len(snapshots)
@@ -0,0 +1,503 @@
+"""
+In-memory prefix index for search-box typeahead.
+
+``GET /api/search/suggest`` is called on every keystroke, so it must not run
+the full-text search (let alone an ``icontains`` scan).  Each process keeps a
+sorted array of normalised keys over:
+
+* track titles (published tracks only), weighted by ``Track.plays``
+* artist names, genres and tags, weighted by the plays of their tracks
+* usernames and display names, weighted by the plays of the user's tracks
+
+Every word start of a label is a key, so ``"love"`` finds "Endless Love".
+The keys matching a prefix form one contiguous run of the sorted array, found
+with ``bisect``.  A max-segment-tree over the key scores then yields the best
+entries of that run in ``O(limit * log n)`` without walking it, so a one-letter
+prefix costs the same as a full word.  Keys added after the last build go to a
+small sorted overlay that is scanned directly and merged into the main array
+once it grows.  Results are memoised until the next change.
+
+Freshness
+---------
+Once a transaction commits, Track/User signal handlers apply its changes to
+the local index and bump a shared version number in the Django cache (see
+``musewave.services.versioned``).  Saves that leave every indexed field as the
+index already has it bump nothing, so logins or description edits do not
+force rebuilds elsewhere.  Other processes compare that version at most every
+``check_interval`` seconds and rebuild in the background when it moved.  Play
+counts change without a model save, so the index is also rebuilt once it is
+older than ``max_age`` seconds.  Queries are served from the previous index
+while a rebuild runs.
+
+Configuration (``settings.SUGGEST_INDEX``)
+------------------------------------------
+max_age : float
+    Rebuild after this many seconds to pick up new play counts.
+check_interval : float
+    How often to compare the local version with the shared one.
+cache_size : int
+    Number of memoised prefix results kept between changes.
+
+Public API
+----------
+suggest(query, limit=8, types=None) -> list[dict]
+    Best completions for *query*.  *types* restricts the result to some of
+    ``track``, ``artist``, ``user``, ``genre``, ``tag``.
+
+track_saved(track, update_fields=None), track_deleted(track_id),
+user_saved(user, update_fields=None), user_deleted(user_id)
+    Incremental updates, called from ``musewave/signals.py``.
+
+rebuild() -> int
+    Reload the local index from the database.  Returns the number of entries.
+"""
+
+import heapq
+import logging
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from musewave.services.versioned import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+TYPES = ('track', 'artist', 'user', 'genre', 'tag')
+
+VERSION_KEY = 'suggest:version'
+
+# Only the first few word starts of a label are indexed.
+_MAX_WORD_KEYS = 6
+
+# A match at the start of the label outranks any mid-label match.
+_HEAD_BONUS = 1 << 62
+_DEAD       = -1
+
+# Merge the overlay into the main array once this many keys changed.
+_COMPACT_AT = 1024
+
+_DEFAULTS = {
+    'max_age':        300.0,
+    'check_interval': 5.0,
+    'cache_size':     2048,
+}
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Saves limited to other fields (``update_fields``) leave the index alone.
+_TRACK_FIELDS = frozenset({'title', 'artist', 'genre', 'tags', 'user', 'user_id', 'plays', 'published'})
+_USER_FIELDS  = frozenset({'username', 'display_name'})
+
+
+def _config(name):
+    return getattr(settings, 'SUGGEST_INDEX', {}).get(name, _DEFAULTS[name])
+
+
+def normalize(text):
+    """Lower-case, strip accents and collapse *text* to space-separated words."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_WORD_RE.findall(text.lower()))
+
+
+def _word_keys(*texts):
+    keys = set()
+    for text in texts:
+        words = normalize(text).split(' ')
+        for i in range(min(len(words), _MAX_WORD_KEYS)):
+            if words[i]:
+                keys.add(' '.join(words[i:]))
+    return keys
+
+
+def _track_snapshot(track):
+    tags = track.tags if isinstance(track.tags, list) else []
+    return {
+        'title':   track.title,
+        'artist':  track.artist,
+        'genre':   track.genre,
+        'tags':    [str(tag) for tag in tags if tag],
+        'user_id': track.user_id,
+        'plays':   track.plays or 0,
+    }
+
+
+class SuggestIndex(VersionedIndex):
+    """
+    Sorted array of ``(key, kind, ident)`` tuples with a max-score segment
+    tree, an insert overlay, and per-entry metadata.
+    """
+
+    name        = 'suggest'
+    version_key = VERSION_KEY
+
+    def __init__(self):
+        super().__init__()
+        self._clear()
+
+    def _setting(self, name):
+        return _config(name)
+
+    def _clear(self):
+        self._keys     = []                  # sorted (key, kind, ident)
+        self._tree     = [_DEAD, _DEAD]      # max-segment-tree over _keys scores
+        self._size     = 1                   # leaves in _tree (power of two)
+        self._extra    = []                  # sorted keys added since the last build
+        self._dead     = 0                   # _keys removed since the last build
+        self._entries  = {}                  # (kind, ident) -> entry dict
+        self._tracks   = {}                  # track_id -> snapshot
+        self._users    = {}                  # user_id -> (username, display_name)
+        self._contrib  = defaultdict(dict)   # (kind, ident) -> {track_id: plays}
+        self._totals   = defaultdict(int)    # (kind, ident) -> sum of _contrib
+        self._memo     = OrderedDict()
+        self._bulk     = False               # append keys unsorted, sort once at the end
+
+    # ── key storage ──────────────────────────────────────────────────────────
+
+    def _score(self, keyt):
+        entry = self._entries[keyt[1:]]
+        return entry['weight'] + (_HEAD_BONUS if keyt[0] == entry['label'] else 0)
+
+    def _build_tree(self):
+        self._size = size = 1 << max(0, len(self._keys) - 1).bit_length()
+        tree = [_DEAD] * (2 * size)
+        tree[size:size + len(self._keys)] = [self._score(keyt) for keyt in self._keys]
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if left > right else right
+        self._tree  = tree
+        self._extra = []
+        self._dead  = 0
+
+    def _set_leaf(self, pos, score):
+        tree = self._tree
+        node = pos + self._size
+        tree[node] = score
+        node >>= 1
+        while node:
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if left > right else right
+            node >>= 1
+
+    def _find(self, keys, keyt):
+        i = bisect_left(keys, keyt)
+        return i if i < len(keys) and keys[i] == keyt else None
+
+    def _main_pos(self, keyt):
+        """Position of a live *keyt* in the main array, or None."""
+        pos = self._find(self._keys, keyt)
+        if pos is None or self._tree[pos + self._size] == _DEAD:
+            return None
+        return pos
+
+    def _insert_key(self, keyt):
+        if self._bulk:
+            self._keys.append(keyt)
+        else:
+            insort(self._extra, keyt)
+
+    def _remove_key(self, keyt):
+        if self._bulk:
+            self._keys.remove(keyt)
+            return
+        pos = self._find(self._extra, keyt)
+        if pos is not None:
+            del self._extra[pos]
+            return
+        pos = self._main_pos(keyt)
+        if pos is not None:
+            self._set_leaf(pos, _DEAD)
+            self._dead += 1
+
+    def _rescore_key(self, keyt):
+        if self._bulk:
+            return
+        pos = self._main_pos(keyt)
+        if pos is not None and self._find(self._extra, keyt) is None:
+            self._set_leaf(pos, self._score(keyt))
+
+    def _compact(self):
+        tree, size = self._tree, self._size
+        live = [keyt for i, keyt in enumerate(self._keys) if tree[size + i] != _DEAD]
+        self._keys = sorted(live + self._extra)
+        self._build_tree()
+
+    # ── entries ───────────────────────────────────────────────────────────────
+
+    def _set_entry(self, eid, weight, payload, texts):
+        entry = self._entries.get(eid)
+        if entry is not None and entry['texts'] == texts:
+            entry['payload'] = payload
+            if entry['weight'] != weight:
+                entry['weight'] = weight
+                for key in entry['keys']:
+                    self._rescore_key((key, *eid))
+            return
+        if entry is not None:
+            self._drop_entry(eid)
+        keys = _word_keys(*texts)
+        self._entries[eid] = {
+            'weight': weight, 'payload': payload, 'texts': texts, 'keys': keys,
+            'label':  normalize(texts[0]),
+        }
+        for key in keys:
+            self._insert_key((key, *eid))
+
+    def _drop_entry(self, eid):
+        entry = self._entries.get(eid)
+        if entry is None:
+            return
+        for key in entry['keys']:
+            self._remove_key((key, *eid))
+        del self._entries[eid]
+
+    def _refresh_facet(self, eid, label):
+        if not self._contrib.get(eid):
+            self._contrib.pop(eid, None)
+            self._totals.pop(eid, None)
+            self._drop_entry(eid)
+            return
+        self._set_entry(eid, self._totals[eid], {'type': eid[0], 'text': label}, (label,))
+
+    def _refresh_user(self, user_id):
+        if user_id not in self._users:
+            return
+        username, display_name = self._users[user_id]
+        eid     = ('user', str(user_id))
+        weight  = self._totals.get(eid, 0)
+        payload = {'type': 'user', 'id': str(user_id), 'text': username, 'display_name': display_name}
+        self._set_entry(eid, weight, payload, (username, display_name or ''))
+
+    def _facets_of(self, snapshot):
+        facets = {('artist', normalize(snapshot['artist'])): snapshot['artist'],
+                  ('genre',  normalize(snapshot['genre'])):  snapshot['genre']}
+        for tag in snapshot['tags']:
+            facets.setdefault(('tag', normalize(tag)), tag)
+        return [(eid, label) for eid, label in facets.items() if eid[1]]
+
+    def _label_of(self, eid, default):
+        entry = self._entries.get(eid)
+        return entry['payload']['text'] if entry else default
+
+    def _put_track(self, track_id, snapshot):
+        self._pop_track(track_id)
+        key   = str(track_id)
+        plays = snapshot['plays']
+        self._tracks[key] = snapshot
+        self._set_entry(
+            ('track', key), plays,
+            {'type': 'track', 'id': key, 'text': snapshot['title'], 'artist': snapshot['artist']},
+            (snapshot['title'],),
+        )
+        for eid, label in self._facets_of(snapshot):
+            self._contrib[eid][key] = plays
+            self._totals[eid] += plays
+            self._refresh_facet(eid, self._label_of(eid, label))
+        user_eid = ('user', str(snapshot['user_id']))
+        self._contrib[user_eid][key] = plays
+        self._totals[user_eid] += plays
+        self._refresh_user(user_eid[1])
+
+    def _pop_track(self, track_id):
+        key      = str(track_id)
+        snapshot = self._tracks.pop(key, None)
+        if snapshot is None:
+            return
+        self._drop_entry(('track', key))
+        for eid, label in self._facets_of(snapshot):
+            self._totals[eid] -= self._contrib.get(eid, {}).pop(key, 0)
+            self._refresh_facet(eid, self._label_of(eid, label))
+        user_eid = ('user', str(snapshot['user_id']))
+        self._totals[user_eid] -= self._contrib.get(user_eid, {}).pop(key, 0)
+        self._refresh_user(user_eid[1])
+
+    # ── incremental updates ──────────────────────────────────────────────────
+
+    def _changed(self):
+        self._memo.clear()
+        if len(self._extra) + self._dead >= _COMPACT_AT:
+            self._compact()
+
+    def _set_track(self, track_id, snapshot):
+        if self._tracks.get(str(track_id)) == snapshot:
+            return False
+        if snapshot is None:
+            self._pop_track(track_id)
+        else:
+            self._put_track(track_id, snapshot)
+        return True
+
+    def _set_user(self, user_id, names):
+        key = str(user_id)
+        if self._users.get(key) == names:
+            return False
+        if names is None:
+            del self._users[key]
+            self._drop_entry(('user', key))
+        else:
+            self._users[key] = names
+            self._refresh_user(key)
+        return True
+
+    def track_saved(self, track, update_fields=None):
+        if update_fields is not None and not set(update_fields) & _TRACK_FIELDS:
+            return
+        snapshot = _track_snapshot(track) if track.published else None
+        self._apply(lambda: self._set_track(track.pk, snapshot))
+
+    def track_deleted(self, track_id):
+        self._apply(lambda: self._set_track(track_id, None))
+
+    def user_saved(self, user, update_fields=None):
+        if update_fields is not None and not set(update_fields) & _USER_FIELDS:
+            return
+        names = (user.username, user.display_name or '')
+        self._apply(lambda: self._set_user(user.pk, names))
+
+    def user_deleted(self, user_id):
+        self._apply(lambda: self._set_user(user_id, None))
+
+    def rebuild(self):
+        from musewave.models import Track, User
+
+        with self._rebuilding:
+            version = self._shared_version()
+            fresh   = SuggestIndex.__new__(SuggestIndex)
+            fresh._clear()
+            fresh._bulk = True
+
+            for row in User.objects.values_list('id', 'username', 'display_name').iterator(chunk_size=2000):
+                fresh._users[str(row[0])] = (row[1], row[2] or '')
+
+            tracks = Track.objects.filter(published=True).values_list(
+                'id', 'title', 'artist', 'genre', 'tags', 'user_id', 'plays',
+            )
+            for track_id, title, artist, genre, tags, user_id, plays in tracks.iterator(chunk_size=2000):
+                snapshot = {
+                    'title': title, 'artist': artist, 'genre': genre,
+                    'tags': [str(tag) for tag in tags if tag] if isinstance(tags, list) else [],
+                    'user_id': user_id, 'plays': plays or 0,
+                }
+                fresh._put_track(track_id, snapshot)
+            for user_id in fresh._users:
+                if ('user', user_id) not in fresh._entries:
+                    fresh._refresh_user(user_id)
+            fresh._keys.sort()
+            fresh._build_tree()
+
+            with self._lock:
+                self._keys, self._entries = fresh._keys, fresh._entries
+                self._tree, self._size    = fresh._tree, fresh._size
+                self._extra, self._dead   = [], 0
+                self._tracks, self._users = fresh._tracks, fresh._users
+                self._contrib, self._totals = fresh._contrib, fresh._totals
+                self._memo = OrderedDict()
+                self._mark_built(version)
+
+        logger.info("Rebuilt suggest index: %s entries", len(self._entries))
+        return len(self._entries)
+
+    # ── lookup ───────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _prefix_bounds(keys, prefix):
+        return bisect_left(keys, (prefix,)), bisect_left(keys, (prefix + '\U0010ffff',))
+
+    def _prefix_run(self, keys, prefix):
+        lo, hi = self._prefix_bounds(keys, prefix)
+        return keys[lo:hi]
+
+    def _best_in_main(self, prefix, limit, types):
+        """Best-first walk of the segment tree over the run of keys matching *prefix*."""
+        tree, size, keys = self._tree, self._size, self._keys
+        lo, hi = self._prefix_bounds(keys, prefix)
+
+        heap  = []
+        left  = lo + size
+        right = hi + size
+        while left < right:
+            if left & 1:
+                heap.append((-tree[left], left))
+                left += 1
+            if right & 1:
+                right -= 1
+                heap.append((-tree[right], right))
+            left  >>= 1
+            right >>= 1
+        heapq.heapify(heap)
+
+        found = {}
+        while heap and len(found) < limit:
+            neg_score, node = heapq.heappop(heap)
+            if -neg_score == _DEAD:
+                break
+            if node >= size:
+                eid = keys[node - size][1:]
+                if eid[0] in types and eid not in found:
+                    found[eid] = -neg_score
+                continue
+            for child in (2 * node, 2 * node + 1):
+                if tree[child] != _DEAD:
+                    heapq.heappush(heap, (-tree[child], child))
+        return found
+
+    def suggest(self, query, limit=8, types=None):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        if query[-1:].isspace():
+            prefix += ' '
+        types = frozenset(types or TYPES)
+
+        self._ensure_fresh()
+
+        memo_key = (prefix, limit, types)
+        with self._lock:
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                self._memo.move_to_end(memo_key)
+                return cached
+
+            found = self._best_in_main(prefix, limit, types)
+            for keyt in self._prefix_run(self._extra, prefix):
+                eid = keyt[1:]
+                if eid[0] in types:
+                    found[eid] = max(found.get(eid, _DEAD), self._score(keyt))
+
+            top    = heapq.nlargest(limit, found.items(), key=lambda item: item[1])
+            result = [self._entries[eid]['payload'] for eid, _ in top]
+
+            self._memo[memo_key] = result
+            if len(self._memo) > _config('cache_size'):
+                self._memo.popitem(last=False)
+        return result
+
+
+_index = SuggestIndex()
+
+
+def suggest(query, limit=8, types=None):
+    return _index.suggest(query, limit=limit, types=types)
+
+
+def track_saved(track, update_fields=None):
+    _index.track_saved(track, update_fields)
+
+
+def track_deleted(track_id):
+    _index.track_deleted(track_id)
+
+
+def user_saved(user, update_fields=None):
+    _index.user_saved(user, update_fields)
+
+
+def user_deleted(user_id):
+    _index.user_deleted(user_id)
+
+
+def rebuild():
+    return _index.rebuild()
@@ -0,0 +1,170 @@
+"""
+Normalised tag index.
+
+``Track.tags`` is a JSON list, and filtering on it meant one
+``tags__contains`` per requested tag: a full scan each, and unreliable on
+SQLite.  Every track's tags are now mirrored into ``Tag`` / ``TrackTag`` rows
+by the track serializers, so tag filters are index lookups on
+``track_tags (tag, track)`` whose cost grows with the number of matches, not
+the size of the catalogue.
+
+Tags are matched by slug (``"Hip Hop"``, ``"hip-hop"`` and ``"HIP HOP"`` are
+the same tag).  The first spelling seen is kept as the display name.
+
+Public API
+----------
+parse_tags(value) -> list[str]
+    Clean tag names from a JSON list, a JSON-encoded string or a
+    comma-separated string.  Blank and duplicate tags are dropped.
+
+tag_slug(name) -> str
+
+set_track_tags(track, names) -> None
+    Make the track's ``TrackTag`` rows match *names*.
+
+filter_tracks(queryset, names, mode='all') -> QuerySet
+    Restrict a ``Track`` queryset to tracks with all (``mode='all'``) or any
+    (``mode='any'``) of the given tags.
+
+tag_cloud(limit=100, prefix=None) -> list[dict]
+    ``{'name', 'slug', 'count'}`` for tags on published tracks, most used
+    first.  Cached for ``CLOUD_TIMEOUT`` seconds.
+
+sync_all(batch_size=500) -> int
+    Rebuild the ``TrackTag`` rows for every track from ``Track.tags``.
+"""
+
+import json
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.text import slugify
+
+from musewave.response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+MAX_TAG_LENGTH = 50
+
+MODES = ('all', 'any')
+
+# Seconds the tag cloud is cached; counts may lag by this much.
+CLOUD_TIMEOUT = 60
+
+
+def tag_slug(name):
+    return slugify(str(name), allow_unicode=True)[:MAX_TAG_LENGTH]
+
+
+def parse_tags(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        return []
+
+    names, seen = [], set()
+    for item in value:
+        if not isinstance(item, (str, int, float)):
+            continue
+        name = ' '.join(str(item).split())[:MAX_TAG_LENGTH]
+        slug = tag_slug(name)
+        if slug and slug not in seen:
+            seen.add(slug)
+            names.append(name)
+    return names
+
+
+def _get_or_create_tags(names):
+    """Return ``{slug: Tag}`` for *names*, creating the missing ones."""
+    from musewave.models import Tag
+
+    wanted = {}
+    for name in names:
+        wanted.setdefault(tag_slug(name), name)
+    wanted.pop('', None)
+    if not wanted:
+        return {}
+
+    tags    = {tag.slug: tag for tag in Tag.objects.filter(slug__in=wanted)}
+    missing = [Tag(slug=slug, name=name) for slug, name in wanted.items() if slug not in tags]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags.update((tag.slug, tag) for tag in Tag.objects.filter(slug__in=[t.slug for t in missing]))
+    return tags
+
+
+def set_track_tags(track, names):
+    from musewave.models import TrackTag
+
+    with transaction.atomic():
+        tags    = _get_or_create_tags(parse_tags(names))
+        wanted  = {tag.id for tag in tags.values()}
+        current = set(TrackTag.objects.filter(track=track).values_list('tag_id', flat=True))
+
+        stale = current - wanted
+        if stale:
+            TrackTag.objects.filter(track=track, tag_id__in=stale).delete()
+        TrackTag.objects.bulk_create(
+            [TrackTag(track=track, tag_id=tag_id) for tag_id in wanted - current],
+            ignore_conflicts=True,
+        )
+        if stale or wanted - current:
+            # Tag filters on cached track lists depend on these rows.
+            invalidate('tracks')
+
+
+def filter_tracks(queryset, names, mode='all'):
+    from musewave.models import TrackTag
+
+    slugs = {tag_slug(name) for name in names} - {''}
+    if not slugs:
+        return queryset
+
+    matches = TrackTag.objects.filter(tag__slug__in=slugs)
+    if mode == 'all' and len(slugs) > 1:
+        # Tracks carrying every tag: one (tag, track) index range per tag,
+        # grouped by track.
+        matches = (
+            matches.values('track_id')
+            .annotate(matched=Count('tag_id'))
+            .filter(matched=len(slugs))
+        )
+    return queryset.filter(id__in=matches.values('track_id'))
+
+
+def tag_cloud(limit=100, prefix=None):
+    from musewave.models import Tag
+
+    def build():
+        tags = Tag.objects.all()
+        if prefix:
+            tags = tags.filter(slug__startswith=tag_slug(prefix))
+        tags = (
+            tags.annotate(count=Count('track_tags', filter=Q(track_tags__track__published=True)))
+            .filter(count__gt=0)
+            .order_by('-count', 'slug')
+            .values('name', 'slug', 'count')
+        )
+        return list(tags[:limit])
+
+    # The aggregate touches every tagged track; get_or_set lets one caller
+    # compute it while concurrent requests wait for the result.
+    key = f'tag_cloud:{limit}:{tag_slug(prefix) if prefix else ""}'
+    return cache.get_or_set(key, build, CLOUD_TIMEOUT)
+
+
+def sync_all(batch_size=500):
+    from musewave.models import Track
+
+    synced = 0
+    tracks = Track.objects.only('id', 'tags').order_by('pk')
+    for track in tracks.iterator(chunk_size=batch_size):
+        set_track_tags(track, track.tags)
+        synced += 1
+    logger.info("Synced tags for %s tracks", synced)
+    return synced
@@ -0,0 +1,192 @@
+"""
+Time-decayed trending scores for tracks.
+
+A track's trending score is an exponentially decayed count of its
+engagement: every play, like and download adds its weight (``weights``),
+and the total halves every ``half_life_hours``.  Scores are kept in
+``TrackTrending`` and updated incrementally from the counter write path
+(``counters.apply``), which sees every batch of buffered plays and every
+fold of the like / download shards.
+
+Decaying every row as time passes is avoided with *forward decay*: an event
+at time *t* adds ``w * e^((t - EPOCH) / tau)`` instead of decaying the
+existing total.  Every row is then scaled by the same ``e^(-(now - EPOCH) / tau)``,
+so the stored value ranks tracks exactly like the decayed score does and
+``ORDER BY score DESC`` on an index is the ranking.  The value is stored as
+its natural log, which grows linearly with time instead of overflowing, and
+events are added with a log-add-exp ``UPDATE``.
+
+Unlikes do not subtract: a decayed score has no record of which like to
+remove, and the like it cancels decays away anyway.
+
+Public API
+----------
+record(field, deltas, at=None) -> None
+    Add ``{track_id: n}`` engagement events of *field* (``plays``, ``likes``,
+    ``downloads``) that happened at *at* (default now).  Non-positive deltas are ignored.
+
+track_saved(track) -> None
+    Copy the track's genre, mood and published flag onto its score row.
+
+top(limit, genre=None, mood=None) -> [(track_id, score)]
+    Highest-scoring published tracks, with the decayed score as of now.
+
+prune() -> int
+    Delete rows whose decayed score has fallen below ``min_score``.
+
+rebuild(days=14) -> int
+    Recompute every score from the last *days* of ``TrackDailyStats``,
+    ``Like`` and ``Download`` rows.  Needed after changing ``half_life_hours``
+    or ``weights``.  Returns the number of rows written.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Stored scores are relative to this instant; never change it.
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+_DEFAULTS = {
+    'half_life_hours': 24.0,
+    'weights':         {'plays': 1.0, 'likes': 5.0, 'downloads': 3.0},
+    'min_score':       0.01,
+}
+
+
+def _config(name):
+    return getattr(settings, 'TRENDING', {}).get(name, _DEFAULTS[name])
+
+
+def _tau():
+    return _config('half_life_hours') * 3600 / math.log(2)
+
+
+def _clock(at):
+    """Forward-decay exponent of instant *at*."""
+    return (at - EPOCH).total_seconds() / _tau()
+
+
+def _log_add(value):
+    """``ln(e^score + e^value)`` as an expression, stable for any magnitudes."""
+    return Greatest(F('score'), Value(value)) + Ln(Value(1.0) + Exp(-Abs(F('score') - Value(value))))
+
+
+def _metadata(track):
+    return {
+        'genre':     (track['genre'] or '').lower(),
+        'mood':      (track['mood'] or '').lower(),
+        'published': track['published'],
+    }
+
+
+# ─── Write side ───────────────────────────────────────────────────────────────
+
+def record(field, deltas, at=None):
+    from musewave.models import Track, TrackTrending
+
+    weight = _config('weights').get(field, 0)
+    events = {track_id: n for track_id, n in deltas.items() if n > 0}
+    if weight <= 0 or not events:
+        return
+
+    clock = _clock(at or timezone.now())
+    new   = None
+    for track_id, n in events.items():
+        value = math.log(weight * n) + clock
+        if TrackTrending.objects.filter(track_id=track_id).update(score=_log_add(value)):
+            continue
+
+        if new is None:
+            new = {
+                row['id']: row
+                for row in Track.objects.filter(id__in=list(events)).values('id', 'genre', 'mood', 'published')
+            }
+        if track_id not in new:
+            continue
+        try:
+            with transaction.atomic():
+                TrackTrending.objects.create(track_id=track_id, score=value, **_metadata(new[track_id]))
+        except IntegrityError:
+            # Another writer created the row first.
+            TrackTrending.objects.filter(track_id=track_id).update(score=_log_add(value))
+
+
+def track_saved(track):
+    from musewave.models import TrackTrending
+
+    TrackTrending.objects.filter(track_id=track.pk).update(**_metadata({
+        'genre': track.genre, 'mood': track.mood, 'published': track.published,
+    }))
+
+
+def prune():
+    from musewave.models import TrackTrending
+
+    floor = _clock(timezone.now()) + math.log(_config('min_score'))
+    deleted, _ = TrackTrending.objects.filter(score__lt=floor).delete()
+    return deleted
+
+
+def rebuild(days=14):
+    from musewave.models import Download, Like, Track, TrackDailyStats, TrackTrending
+
+    weights = _config('weights')
+    now     = timezone.now()
+    since   = now - timedelta(days=days)
+    events  = defaultdict(list)
+
+    # Daily rollups only know the day; count each day's plays at its midpoint.
+    daily = TrackDailyStats.objects.filter(date__gte=since.date(), plays__gt=0)
+    if weights.get('plays', 0) <= 0:
+        daily = daily.none()
+    for track_id, day, plays in daily.values_list('track_id', 'date', 'plays').iterator(chunk_size=2000):
+        at = min(now, datetime.combine(day, dt_time(12), tzinfo=dt_timezone.utc))
+        events[track_id].append(math.log(weights['plays'] * plays) + _clock(at))
+    for field, model in (('likes', Like), ('downloads', Download)):
+        if weights.get(field, 0) <= 0:
+            continue
+        for track_id, at in model.objects.filter(created_at__gte=since).values_list(
+            'track_id', 'created_at',
+        ).iterator(chunk_size=2000):
+            events[track_id].append(math.log(weights[field]) + _clock(at))
+
+    rows = []
+    for track in Track.objects.filter(id__in=list(events)).values('id', 'genre', 'mood', 'published').iterator(chunk_size=2000):
+        values = events[track['id']]
+        peak   = max(values)
+        score  = peak + math.log(sum(math.exp(v - peak) for v in values))
+        rows.append(TrackTrending(track_id=track['id'], score=score, **_metadata(track)))
+
+    with transaction.atomic():
+        TrackTrending.objects.all().delete()
+        TrackTrending.objects.bulk_create(rows, batch_size=1000)
+    logger.info("Rebuilt trending scores for %d tracks from %d days of history", len(rows), days)
+    return len(rows)
+
+
+# ─── Read side ────────────────────────────────────────────────────────────────
+
+def top(limit, genre=None, mood=None):
+    from musewave.models import TrackTrending
+
+    rows = TrackTrending.objects.filter(published=True)
+    if genre:
+        rows = rows.filter(genre=genre.lower())
+    if mood:
+        rows = rows.filter(mood=mood.lower())
+
+    clock = _clock(timezone.now())
+    return [
+        (track_id, math.exp(score - clock))
+        for track_id, score in rows.order_by('-score').values_list('track_id', 'score')[:limit]
+    ]
@@ -0,0 +1,340 @@
+"""
+Asynchronous media uploads.
+
+Uploads used to run in FileForge's sync mode inside the request, so a
+worker was blocked for the whole transfer to the storage provider.  Now a
+request only hands the file off and records a ``PendingUpload``; the
+object's URL is filled in when FileForge reports the upload completed.
+
+Two strategies:
+
+* **async** — the request posts the file with ``mode=async``.  FileForge
+  answers 202 with a pending record as soon as it has the bytes, and the
+  ``musewave.tasks.finalize_upload`` task polls it once and, while it is
+  still processing, schedules itself again with a growing delay, for up to
+  ``poll_timeout`` seconds.  It never sleeps in the worker.  A scheduled
+  sweep (``sweep_pending_uploads``) picks up anything the task gave up on
+  and expires uploads older than ``max_age``.
+* **direct** — the client asks for a pre-signed ticket
+  (``POST /api/uploads/direct``), uploads straight to the provider and
+  calls ``POST /api/uploads/<id>/complete``.  No file bytes pass through
+  MuseWave at all.
+
+``mode='sync'`` in ``settings.UPLOADS`` restores the old blocking behaviour
+through the same code path (the upload is attached before ``start``
+returns).
+
+Attaching
+---------
+Only the newest upload for an object's field is attached: starting a new
+one marks older ones ``superseded``.  When an upload is attached, the file
+it replaces is deleted; if the object was deleted meanwhile, the new file
+is deleted instead.  Deletions go through the outbox in
+services/file_deletions.py.  New track audio is queued for analysis.
+
+Public API
+----------
+TARGETS
+    ``{target: (model name, url field, FileForge id field)}``.
+
+start(instance, target, file_obj) -> PendingUpload
+    Hand *file_obj* to FileForge for *instance*'s *target* field.
+    Raises ``FileForgeError`` if FileForge does not accept it.
+
+start_many(instance, files, optional=()) -> {target: PendingUpload}
+    ``start`` for several ``{target: file_obj}`` at once.  The files are sent
+    to FileForge in parallel (at most ``parallel`` at a time), so the request
+    waits for the slowest rather than the sum.  If a target not listed in
+    *optional* fails, the files that did upload are queued for deletion and
+    the error is raised; failed optional targets are logged and left out.
+
+create_ticket(instance, target, name, size, content_type) -> (PendingUpload, dict)
+    Start a direct upload; returns the upload and the provider ticket.
+
+complete_direct(upload, provider_file_id, provider_response) -> PendingUpload
+
+poll(upload) -> PendingUpload
+    Check FileForge once and attach or fail the upload if it settled.
+
+finalize(upload_id, attempt=0) -> str
+    Poll once; if the upload is still processing and younger than
+    ``poll_timeout``, schedule the next attempt.  Returns the status.
+
+sweep() -> int
+    Poll every processing upload once and expire stale ones.
+
+pending_for(instance) -> QuerySet
+    Uploads still processing for *instance*.
+
+owner_id(instance) -> UUID
+
+target_object(target, object_id) -> Model | None
+    The object a *target* upload attaches to.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from musewave.services import file_deletions, fileforge
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    'mode':         'async',
+    'provider':     'cloudinary',
+    'poll_timeout': 120,
+    'max_age':      3600,
+    'parallel':     4,
+}
+
+TARGETS = {
+    'user_avatar': ('User',  'avatar_url', 'avatar_fileforge_id'),
+    'user_header': ('User',  'header_url', 'header_fileforge_id'),
+    'album_cover': ('Album', 'cover_url',  'cover_fileforge_id'),
+    'track_audio': ('Track', 'audio_url',  'audio_fileforge_id'),
+    'track_cover': ('Track', 'cover_url',  'cover_fileforge_id'),
+}
+
+# FileForge record statuses.
+_COMPLETED = 'completed'
+_FAILED    = 'failed'
+
+
+def _config(name):
+    return getattr(settings, 'UPLOADS', {}).get(name, _DEFAULTS[name])
+
+
+def _model(target):
+    return apps.get_model('musewave', TARGETS[target][0])
+
+
+def target_object(target, object_id):
+    return _model(target).objects.filter(pk=object_id).first()
+
+
+def owner_id(instance):
+    return instance.pk if instance._meta.model_name == 'user' else instance.user_id
+
+
+def _filename(instance, target):
+    kind, field = target.split('_', 1)
+    return f"{kind}_{instance.pk}_{field}"
+
+
+def _create(instance, target, strategy, fileforge_id):
+    from musewave.models import PendingUpload
+
+    with transaction.atomic():
+        older = PendingUpload.objects.select_for_update().filter(
+            target=target, object_id=instance.pk, status=PendingUpload.STATUS_PROCESSING,
+        )
+        file_deletions.enqueue(older.values_list('fileforge_id', flat=True), 'upload_superseded')
+        older.update(status=PendingUpload.STATUS_SUPERSEDED, updated_at=timezone.now())
+        return PendingUpload.objects.create(
+            user_id=owner_id(instance), target=target, object_id=instance.pk,
+            strategy=strategy, fileforge_id=fileforge_id,
+        )
+
+
+def start(instance, target, file_obj):
+    return start_many(instance, {target: file_obj})[target]
+
+
+def start_many(instance, files, optional=()):
+    mode  = _config('mode')
+    files = {target: file_obj for target, file_obj in files.items() if file_obj}
+
+    def send(item):
+        target, file_obj = item
+        try:
+            record = fileforge.upload_file(file_obj, _filename(instance, target), provider=_config('provider'), mode=mode)
+        except fileforge.FileForgeError as exc:
+            return target, None, exc
+        return target, record, None
+
+    if len(files) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(files), _config('parallel'))) as pool:
+            results = list(pool.map(send, files.items()))
+    else:
+        results = [send(item) for item in files.items()]
+
+    failed = [exc for target, _, exc in results if exc is not None and target not in optional]
+    if failed:
+        # All or nothing: files that did reach FileForge are not attached.
+        file_deletions.enqueue([record.get('id') for _, record, _ in results if record], 'upload_rolled_back')
+        raise failed[0]
+
+    started = {}
+    for target, record, exc in results:
+        if exc is not None:
+            logger.warning("Optional %s upload for %s failed: %s", target, instance.pk, exc)
+        else:
+            started[target] = _register(instance, target, mode, record)
+    return started
+
+
+def _register(instance, target, mode, record):
+    upload = _create(instance, target, mode, record.get('id'))
+    _settle(upload, record)
+    if upload.status == upload.STATUS_COMPLETED:
+        # Attached through a fresh row; bring the caller's instance up to date.
+        instance.refresh_from_db(fields=list(TARGETS[target][1:]))
+    elif upload.status == upload.STATUS_PROCESSING:
+        upload_id = str(upload.pk)
+        transaction.on_commit(lambda: _queue_finalize(upload_id))
+    return upload
+
+
+def _queue_finalize(upload_id, attempt=0, delay=0):
+    from django_q.models import Schedule
+    from django_q.tasks import async_task, schedule
+
+    try:
+        if delay:
+            # A one-off schedule is deleted once it has run.
+            schedule(
+                'musewave.tasks.finalize_upload', upload_id, attempt,
+                schedule_type=Schedule.ONCE, next_run=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            async_task('musewave.tasks.finalize_upload', upload_id, attempt)
+    except Exception as exc:
+        # The scheduled sweep still finalises it.
+        logger.warning("Could not queue upload %s: %s", upload_id, exc)
+
+
+def create_ticket(instance, target, name, size, content_type):
+    ticket = fileforge.create_direct_upload(name, size, content_type, provider=_config('provider'))
+    upload = _create(instance, target, 'direct', ticket['file_id'])
+    return upload, ticket
+
+
+def complete_direct(upload, provider_file_id, provider_response):
+    record = fileforge.complete_direct_upload(upload.fileforge_id, provider_file_id, provider_response)
+    _settle(upload, record)
+    return upload
+
+
+def poll(upload):
+    _settle(upload, fileforge.get_file(upload.fileforge_id))
+    return upload
+
+
+def _settle(upload, record):
+    status = record.get('status')
+    if status == _COMPLETED:
+        _attach(upload, record)
+    elif status == _FAILED:
+        _fail(upload, record.get('error_message') or 'FileForge upload failed')
+
+
+def _fail(upload, message):
+    """Mark a processing upload failed.  Returns False if it had already settled."""
+    from musewave.models import PendingUpload
+
+    updated = PendingUpload.objects.filter(pk=upload.pk, status=PendingUpload.STATUS_PROCESSING).update(
+        status=PendingUpload.STATUS_FAILED, error_message=message[:2000], updated_at=timezone.now(),
+    )
+    if updated:
+        upload.status, upload.error_message = PendingUpload.STATUS_FAILED, message[:2000]
+        logger.warning("Upload %s (%s %s) failed: %s", upload.pk, upload.target, upload.object_id, message)
+    return bool(updated)
+
+
+def _attach(upload, record):
+    from musewave.models import PendingUpload
+
+    url = record.get('url')
+    if not url:
+        _fail(upload, f"FileForge reported completion without a URL (status={record.get('status')!r})")
+        return
+
+    _, url_field, id_field = TARGETS[upload.target]
+    discard, reason = None, 'upload_replaced'
+    with transaction.atomic():
+        current = PendingUpload.objects.select_for_update().get(pk=upload.pk)
+        upload.status = current.status
+        if current.status != PendingUpload.STATUS_PROCESSING:
+            # Superseded (its file is queued for deletion) or settled by a concurrent poll.
+            return
+
+        instance = _model(upload.target).objects.select_for_update().filter(pk=upload.object_id).first()
+        if instance is None:
+            discard, reason       = upload.fileforge_id, 'upload_orphaned'
+            current.status        = PendingUpload.STATUS_FAILED
+            current.error_message = 'Object was deleted before the upload completed'
+        else:
+            replaced = getattr(instance, id_field)
+            setattr(instance, url_field, url)
+            setattr(instance, id_field, upload.fileforge_id)
+            instance.save(update_fields=[url_field, id_field])
+            if replaced and replaced != upload.fileforge_id:
+                discard = replaced
+            current.status = PendingUpload.STATUS_COMPLETED
+            if upload.target == 'track_audio':
+                from musewave.services import audio_analysis
+                audio_analysis.schedule(instance)
+        current.completed_at = timezone.now()
+        current.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        upload.status, upload.error_message = current.status, current.error_message
+        upload.completed_at = current.completed_at
+
+        file_deletions.enqueue([discard], reason)
+
+
+def finalize(upload_id, attempt=0):
+    from musewave.models import PendingUpload
+
+    upload = PendingUpload.objects.filter(pk=upload_id).first()
+    if upload is None or upload.status != PendingUpload.STATUS_PROCESSING:
+        return upload.status if upload else None
+    try:
+        poll(upload)
+    except fileforge.FileForgeError as exc:
+        logger.warning("Polling upload %s failed: %s", upload_id, exc)
+
+    if upload.status == PendingUpload.STATUS_PROCESSING:
+        delay = min(5 * 2 ** attempt, 30)
+        age   = (timezone.now() - upload.created_at).total_seconds()
+        if age + delay <= _config('poll_timeout'):
+            _queue_finalize(upload_id, attempt + 1, delay)
+    return upload.status
+
+
+def sweep():
+    from musewave.models import PendingUpload
+
+    cutoff  = timezone.now() - timedelta(seconds=_config('max_age'))
+    pending = PendingUpload.objects.filter(status=PendingUpload.STATUS_PROCESSING)
+
+    expired = 0
+    for upload in list(pending.filter(created_at__lt=cutoff)):
+        with transaction.atomic():
+            # A concurrent finalize or poll may have attached it since the query;
+            # its file is then in use and must not be deleted.
+            if _fail(upload, 'Upload did not complete in time'):
+                file_deletions.enqueue([upload.fileforge_id], 'upload_expired')
+                expired += 1
+
+    # Direct uploads only settle when the client calls complete.
+    settled = 0
+    for upload in pending.filter(created_at__gte=cutoff).exclude(strategy='direct'):
+        try:
+            poll(upload)
+        except fileforge.FileForgeError as exc:
+            logger.warning("Polling upload %s failed: %s", upload.pk, exc)
+            continue
+        settled += upload.status != PendingUpload.STATUS_PROCESSING
+    return settled + expired
+
+
+def pending_for(instance):
+    from musewave.models import PendingUpload
+
+    return PendingUpload.objects.filter(object_id=instance.pk, status=PendingUpload.STATUS_PROCESSING)
@@ -0,0 +1,138 @@
+"""
+Shared freshness logic for per-process in-memory indexes.
+
+The typeahead (``suggest``) and radio (``radio``) indexes live in each
+process's memory.  Once a transaction that changes indexed data commits, the
+process applies the change to its own copy and bumps a version number in the
+Django cache.  Every process compares that version with the one it was built
+from at most every ``check_interval`` seconds, and rebuilds in a background
+thread when it moved or once the copy is older than ``max_age`` seconds.
+Queries keep using the old copy while the rebuild runs.
+
+Public API
+----------
+VersionedIndex
+    Base class.  Subclasses set ``name`` and ``version_key``, implement
+    ``rebuild()`` and ``_setting(name)``, and route every local change through
+    ``_apply(change)``.
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedIndex:
+    """In-memory index kept in step with other processes through a shared version."""
+
+    name        = 'index'
+    version_key = None
+
+    def __init__(self):
+        self._lock       = threading.RLock()
+        self._rebuilding = threading.Lock()
+        self._built_at   = None
+        self._checked_at = 0.0
+        self._version    = None
+
+    # ── subclass hooks ───────────────────────────────────────────────────────
+
+    def _setting(self, name):
+        """``check_interval`` or ``max_age`` for this index."""
+        raise NotImplementedError
+
+    def _changed(self):
+        """Called under the lock after a change altered the local index."""
+
+    def rebuild(self):
+        """Reload from the database and call ``_mark_built(version)`` under the lock."""
+        raise NotImplementedError
+
+    # ── incremental updates ──────────────────────────────────────────────────
+
+    def _apply(self, change):
+        """
+        Once the current transaction commits, run *change* against the local
+        index and bump the shared version; a rollback leaves both untouched.
+
+        *change* returns whether it altered anything.  A process that has not
+        built the index cannot tell, so it always bumps; so does one whose
+        copy is behind the shared version, since "unchanged" only means
+        unchanged relative to that stale copy.
+        """
+        def run():
+            try:
+                self._apply_now(change)
+            except Exception:
+                logger.exception("Could not update the %s index", self.name)
+
+        transaction.on_commit(run)
+
+    def _apply_now(self, change):
+        with self._lock:
+            built   = self._built_at is not None
+            changed = not built or change()
+            if changed and built:
+                self._changed()
+            synced  = self._version
+        if changed or self._shared_version() != synced:
+            self._bump_version()
+
+    def _bump_version(self):
+        try:
+            cache.add(self.version_key, 0, None)
+            version = cache.incr(self.version_key)
+        except Exception as exc:
+            logger.warning("Could not bump %s index version: %s", self.name, exc)
+            return
+        with self._lock:
+            # Only adopt the new version if nobody else changed data since we
+            # last synced; otherwise leave it stale so the next check rebuilds.
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    # ── freshness ────────────────────────────────────────────────────────────
+
+    def _shared_version(self):
+        try:
+            return cache.get(self.version_key, 0)
+        except Exception as exc:
+            logger.warning("Could not read %s index version: %s", self.name, exc)
+            return self._version
+
+    def _mark_built(self, version):
+        self._version    = version
+        self._built_at   = time.monotonic()
+        self._checked_at = self._built_at
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.rebuild()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self._setting('check_interval'):
+            return
+        self._checked_at = now
+
+        if self._shared_version() != self._version or now - self._built_at >= self._setting('max_age'):
+            self._rebuild_in_background()
+
+    def _rebuild_in_background(self):
+        if self._rebuilding.locked():
+            return
+
+        def run():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception("%s index rebuild failed", self.name.capitalize())
+            finally:
+                connection.close()
+
+        threading.Thread(target=run, name=f'{self.name}-index-rebuild', daemon=True).start()
@@ -0,0 +1,141 @@
+"""
+Compact waveform storage.
+
+Waveforms used to live in ``Track.waveform_data``, a free-form text column
+loaded with every track query and returned in every track payload.  Peaks
+now live in ``TrackWaveform`` rows, one per resolution, packed as unsigned
+8-bit (or 16-bit) little-endian integers scaled to the loudest peak.  A
+1024-peak waveform is 1 KB instead of ~8 KB of JSON text, and track lists
+no longer carry it at all.
+
+Each waveform is stored at every level of ``RESOLUTIONS`` that is not finer
+than its source (plus the source itself when it is coarser than all of
+them), so a client asking for an overview gets a small row, not the full
+array.  Levels are built by taking the maximum of each bucket, so short
+transients survive downsampling.
+
+Public API
+----------
+parse_peaks(value) -> list[float] | None
+    Peaks from a list, a JSON-encoded list or a comma-separated string,
+    scaled to 0..1.  ``None`` if *value* is not a list of numbers.
+
+set_waveform(track, peaks, bits=8) -> None
+    Replace the track's stored levels with ones built from *peaks* (a list
+    of floats in 0..1).  An empty list removes the waveform.
+
+get_waveform(track_id, resolution=DEFAULT_RESOLUTION) -> dict | None
+    ``{'resolution', 'bits', 'peaks'}`` with *resolution* integer peaks (or
+    fewer when the source has fewer), read from the closest stored level.
+"""
+
+import json
+import logging
+import math
+import sys
+from array import array
+
+from django.db import transaction
+
+from musewave.response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS        = (64, 256, 1024)
+DEFAULT_RESOLUTION = 256
+MAX_RESOLUTION     = RESOLUTIONS[-1]
+
+# Longest client-supplied waveform accepted; longer input is downsampled.
+MAX_SOURCE_PEAKS = 8192
+
+_TYPECODES = {8: 'B', 16: 'H'}
+
+
+def parse_peaks(value):
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            value = json.loads(value) if value.startswith('[') else value.split(',')
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(value, (list, tuple)):
+        return None
+
+    try:
+        peaks = [abs(float(item)) for item in value if not isinstance(item, bool)]
+    except (TypeError, ValueError):
+        return None
+    if len(peaks) != len(value) or not all(math.isfinite(peak) for peak in peaks):
+        return None
+
+    loudest = max(peaks, default=0.0)
+    if loudest > 1.0:
+        peaks = [peak / loudest for peak in peaks]
+    if len(peaks) > MAX_SOURCE_PEAKS:
+        peaks = downsample(peaks, MAX_SOURCE_PEAKS)
+    return peaks
+
+
+def downsample(peaks, size):
+    """Maximum of each of *size* equal buckets of *peaks*."""
+    count = len(peaks)
+    if count <= size:
+        return list(peaks)
+    return [
+        max(peaks[i * count // size:(i + 1) * count // size])
+        for i in range(size)
+    ]
+
+
+def encode(peaks, bits=8):
+    top    = (1 << bits) - 1
+    packed = array(_TYPECODES[bits], (round(min(max(peak, 0.0), 1.0) * top) for peak in peaks))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode(blob, bits=8):
+    packed = array(_TYPECODES[bits])
+    packed.frombytes(bytes(blob))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tolist()
+
+
+def _levels(count):
+    levels = [size for size in RESOLUTIONS if size <= count]
+    return levels or ([count] if count else [])
+
+
+def set_waveform(track, peaks, bits=8):
+    from musewave.models import TrackWaveform
+
+    if bits not in _TYPECODES:
+        raise ValueError(f"bits must be one of {sorted(_TYPECODES)}")
+
+    rows = [
+        TrackWaveform(track=track, resolution=size, bits=bits, peaks=encode(downsample(peaks, size), bits))
+        for size in _levels(len(peaks))
+    ]
+    with transaction.atomic():
+        TrackWaveform.objects.filter(track=track).delete()
+        TrackWaveform.objects.bulk_create(rows)
+        invalidate(f'track:{track.pk}')
+
+
+def get_waveform(track_id, resolution=DEFAULT_RESOLUTION):
+    from musewave.models import TrackWaveform
+
+    waveforms = TrackWaveform.objects.filter(track_id=track_id).only('resolution', 'bits', 'peaks')
+    level = (
+        waveforms.filter(resolution__gte=resolution).order_by('resolution').first()
+        or waveforms.order_by('-resolution').first()
+    )
+    if level is None:
+        return None
+
+    peaks = decode(level.peaks, level.bits)
+    if len(peaks) > resolution:
+        peaks = downsample(peaks, resolution)
+    return {'resolution': len(peaks), 'bits': level.bits, 'peaks': peaks}
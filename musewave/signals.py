@@ -0,0 +1,185 @@
+"""
+Model signal handlers that keep derived data in step with source rows.
+
+Connected in ``MusewaveConfig.ready()``.
+"""
+
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Album, Follow, Track, User
+from .response_cache import invalidate
+from .services import feed, file_deletions, radio, stats, suggest, trending
+from .services.search import get_backend as search_backend
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Artist snapshots ─────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Track)
+def track_created(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust_artist(instance.user_id, total_tracks=1)
+
+
+@receiver(post_delete, sender=Track)
+def track_deleted(sender, instance, **kwargs):
+    stats.adjust_artist(
+        instance.user_id,
+        total_tracks=-1,
+        total_plays=-instance.plays,
+        total_likes=-instance.likes,
+        total_downloads=-instance.downloads,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust_artist(instance.following_id, total_followers=1)
+        stats.adjust_artist(instance.follower_id, total_following=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.adjust_artist(instance.following_id, total_followers=-1)
+    stats.adjust_artist(instance.follower_id, total_following=-1)
+
+
+# ─── Trending ─────────────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Track)
+def sync_trending(sender, instance, created, **kwargs):
+    if not created:
+        trending.track_saved(instance)
+
+
+# ─── Home feed ────────────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.follow_created(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_feed(sender, instance, **kwargs):
+    feed.follow_deleted(instance.follower_id, instance.following_id)
+
+
+# ─── FileForge files ──────────────────────────────────────────────────────────
+# Queued in the deleting transaction, so cascades and admin deletes are
+# covered and a failed delete is retried instead of leaking the file.
+
+@receiver(post_delete, sender=Track)
+def delete_track_files(sender, instance, **kwargs):
+    file_deletions.enqueue([instance.audio_fileforge_id, instance.cover_fileforge_id], 'track_deleted')
+
+
+@receiver(post_delete, sender=Album)
+def delete_album_files(sender, instance, **kwargs):
+    file_deletions.enqueue([instance.cover_fileforge_id], 'album_deleted')
+
+
+@receiver(post_delete, sender=User)
+def delete_user_files(sender, instance, **kwargs):
+    file_deletions.enqueue([instance.avatar_fileforge_id, instance.header_fileforge_id], 'user_deleted')
+
+
+# ─── Response cache ───────────────────────────────────────────────────────────
+
+@receiver([post_save, post_delete], sender=Track)
+def invalidate_track_responses(sender, instance, **kwargs):
+    invalidate(
+        f'track:{instance.pk}', 'tracks',
+        f'album:{instance.album_id}' if instance.album_id else None,
+    )
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_responses(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no public payload includes.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate(f'user:{instance.pk}', 'users')
+
+
+@receiver([post_save, post_delete], sender=Album)
+def invalidate_album_responses(sender, instance, **kwargs):
+    invalidate(f'album:{instance.pk}')
+
+
+# ─── Radio ────────────────────────────────────────────────────────────────────
+# Like the search index below, a failed update is logged, never raised; the
+# per-process feature matrices catch up at their next rebuild.
+
+@receiver(post_save, sender=Track)
+def update_radio(sender, instance, update_fields=None, **kwargs):
+    try:
+        radio.track_saved(instance, update_fields)
+    except Exception:
+        logger.exception("Could not update radio features for track %s", instance.pk)
+
+
+@receiver(post_delete, sender=Track)
+def remove_from_radio(sender, instance, **kwargs):
+    try:
+        radio.track_deleted(instance.pk)
+    except Exception:
+        logger.exception("Could not remove track %s from radio", instance.pk)
+
+
+# ─── Search index ─────────────────────────────────────────────────────────────
+# Indexing failures are logged rather than raised: a stale search entry must
+# never make a save fail.  POST /api/search/rebuild repairs the index.  The
+# typeahead index is updated alongside the full-text one.
+
+@receiver(post_save, sender=Track)
+def index_track(sender, instance, update_fields=None, **kwargs):
+    try:
+        search_backend().index_track(instance)
+    except Exception:
+        logger.exception("Could not index track %s", instance.pk)
+    try:
+        suggest.track_saved(instance, update_fields)
+    except Exception:
+        logger.exception("Could not update suggestions for track %s", instance.pk)
+
+
+@receiver(post_delete, sender=Track)
+def unindex_track(sender, instance, **kwargs):
+    try:
+        search_backend().remove_track(instance.pk)
+    except Exception:
+        logger.exception("Could not remove track %s from the search index", instance.pk)
+    try:
+        suggest.track_deleted(instance.pk)
+    except Exception:
+        logger.exception("Could not remove track %s from suggestions", instance.pk)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    try:
+        search_backend().index_user(instance)
+    except Exception:
+        logger.exception("Could not index user %s", instance.pk)
+    try:
+        suggest.user_saved(instance, update_fields)
+    except Exception:
+        logger.exception("Could not update suggestions for user %s", instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    try:
+        search_backend().remove_user(instance.pk)
+    except Exception:
+        logger.exception("Could not remove user %s from the search index", instance.pk)
+    try:
+        suggest.user_deleted(instance.pk)
+    except Exception:
+        logger.exception("Could not remove user %s from suggestions", instance.pk)
@@ -0,0 +1,126 @@
+"""
+django-q2 task entry points.
+
+Tasks are referenced by dotted path (e.g. ``async_task('musewave.tasks.flush_play_batch', ...)``)
+so this module stays a thin layer over the services that do the work.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def flush_play_batch(rows):
+    """Persist a batch of buffered play events handed off by a web worker."""
+    from musewave.services.play_buffer import write_batch
+
+    written = write_batch(rows)
+    logger.info("Flushed %s buffered plays", written)
+    return written
+
+
+def fold_counter_shards():
+    """Fold pending counter shard deltas into the ``Track`` columns."""
+    from musewave.services import counters
+
+    total = 0
+    while True:
+        folded = counters.fold()
+        total += folded
+        if not folded:
+            break
+    return total
+
+
+def reconcile_track_counters():
+    """
+    Rebuild ``Track.likes`` / ``Track.downloads`` from ``Like`` / ``Download``
+    rows, then recompute every artist snapshot from the corrected columns.
+    """
+    from musewave.models import ArtistStats
+    from musewave.services import counters, stats
+
+    touched = counters.reconcile()
+    for user_id in ArtistStats.objects.values_list('user_id', flat=True).iterator():
+        stats.rebuild_artist_stats(user_id)
+    return touched
+
+
+def analyze_track_audio(track_id):
+    """Decode a track's uploaded audio and store its duration, waveform and loudness."""
+    from musewave.services import audio_analysis
+
+    result = audio_analysis.analyze_track(track_id)
+    return None if result is None else {
+        'duration': result['duration'], 'format': result['format'], 'loudness': result['loudness'],
+    }
+
+
+def finalize_upload(upload_id, attempt=0):
+    """Poll FileForge once for an async upload; attach it if done, else schedule the next poll."""
+    from musewave.services import uploads
+
+    return uploads.finalize(upload_id, attempt)
+
+
+def sweep_pending_uploads():
+    """Finalise async uploads the per-upload task gave up on and expire stale ones."""
+    from musewave.services import uploads
+
+    return uploads.sweep()
+
+
+def drain_file_deletions():
+    """Delete the FileForge files queued in the PendingFileDeletion outbox."""
+    from musewave.services import file_deletions
+
+    return file_deletions.drain()
+
+
+def fan_out_track(track_id):
+    """Push a newly published track into its artist's followers' feeds."""
+    from musewave.services import feed
+
+    return feed.fan_out(track_id)
+
+
+def prune_feed():
+    """Delete feed rows older than FEED['retention_days']."""
+    from musewave.services import feed
+
+    return feed.prune()
+
+
+def prune_trending():
+    """Drop trending rows whose decayed score is negligible."""
+    from musewave.services import trending
+
+    return trending.prune()
+
+
+def build_charts():
+    """Publish the daily and weekly charts whose window has closed."""
+    from musewave.services import charts
+
+    return charts.build_due()
+
+
+def refresh_similar_tracks():
+    """Recompute co-listening neighbours of tracks whose audience changed."""
+    from musewave.services import similar
+
+    return similar.rebuild()
+
+
+def rebuild_similar_tracks():
+    """Recompute every track's co-listening neighbours."""
+    from musewave.services import similar
+
+    return similar.rebuild(full=True)
+
+
+def refresh_monthly_listeners():
+    """Recompute the 30-day unique listener count on every artist snapshot."""
+    from musewave.services import stats
+
+    return stats.refresh_monthly_listeners()
@@ -0,0 +1,212 @@
+"""
+A FileForge stub server for tests and local development.
+
+``FileForgeStub`` is an in-process HTTP server speaking the FileForge API
+(health, upload, file status, delete, direct upload), for exercising
+``musewave.services.fileforge`` without the real service::
+
+    with FileForgeStub() as stub, override_settings(FILEFORGE_BASE_URL=stub.url):
+        stub.fail(2, status=503)      # next two requests answer 503
+        fileforge.get_file(1)         # retried, then succeeds
+
+``stub.down = True`` drops connections without answering.  Async uploads
+complete on the *complete_after*-th status poll.  ``stub.requests`` records
+``(method, path)`` and ``stub.connections`` the client sockets seen, so
+connection reuse can be asserted.
+
+To develop against it, run it on its own and point ``FILEFORGE_BASE_URL`` at
+the printed URL::
+
+    python -m musewave.tests.fileforge_stub --port 8765
+"""
+
+import argparse
+import http.server
+import json
+import re
+import socket
+import threading
+import time
+
+_FILE_PATH  = re.compile(r'^/api/files/(\d+)/$')
+_FORM_FIELD = re.compile(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n')
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version        = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self, keep=65536):
+        """Read the request body, keeping at most *keep* leading bytes."""
+        length = int(self.headers.get('Content-Length') or 0)
+        kept, received = b'', 0
+        while received < length:
+            chunk = self.rfile.read(min(1 << 20, length - received))
+            if not chunk:
+                break
+            received += len(chunk)
+            if len(kept) < keep:
+                kept += chunk[:keep - len(kept)]
+        return kept, received
+
+    def _send(self, code, body=None, headers=None):
+        data = b'' if body is None else json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method):
+        stub = self.server.stub
+        stub.connections.add(self.client_address)
+        stub.requests.append((method, self.path))
+        body, received = self._read_body()
+        if stub.down:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if stub.latency:
+            time.sleep(stub.latency)
+        failure = stub._take_failure()
+        if failure:
+            status_code, retry_after = failure
+            return self._send(status_code, {'error': 'injected failure'},
+                              {'Retry-After': str(retry_after)} if retry_after is not None else None)
+        code, payload = stub._route(method, self.path, body, received)
+        try:
+            self._send(code, payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up mid-request (e.g. its upload body raised).
+            self.close_connection = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+class FileForgeStub:
+
+    def __init__(self, port=0, latency=0.0, complete_after=1):
+        self.port           = port
+        self.latency        = latency
+        self.complete_after = complete_after
+        self.down           = False
+        self.files          = {}
+        self.requests       = []
+        self.connections    = set()
+        self._failures      = []
+        self._lock          = threading.Lock()
+        self._next_id       = 1
+        self._server        = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def start(self):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', self.port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def fail(self, count, status=503, retry_after=None):
+        """Answer the next *count* requests with *status*."""
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _take_failure(self):
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def _new_file(self, name, size, status):
+        with self._lock:
+            file_id, self._next_id = self._next_id, self._next_id + 1
+        record = {'id': file_id, 'name': name, 'size': size, 'status': status, 'polls': 0,
+                  'url': f'{self.url}/media/{file_id}' if status == 'completed' else None}
+        self.files[file_id] = record
+        return record
+
+    @staticmethod
+    def _public(record):
+        return {key: value for key, value in record.items() if key != 'polls'}
+
+    def _route(self, method, path, body, received):
+        if method == 'GET' and path == '/api/health/':
+            return 200, {'status': 'ok', 'providers': ['stub']}
+
+        if method == 'POST' and path == '/api/files/':
+            fields = {key.decode(): value.decode() for key, value in _FORM_FIELD.findall(body)}
+            mode   = fields.get('mode', 'sync')
+            record = self._new_file(fields.get('name', ''), received, 'completed' if mode == 'sync' else 'pending')
+            return (200 if mode == 'sync' else 202), self._public(record)
+
+        if method == 'POST' and path == '/api/files/direct-upload/':
+            payload = json.loads(body or b'{}')
+            record  = self._new_file(payload.get('name', ''), payload.get('size'), 'pending')
+            return 201, {'file_id': record['id'], 'upload_url': f'{self.url}/provider/upload',
+                         'method': 'POST', 'fields': {}, 'headers': {}, 'expires_in': 3600}
+
+        if method == 'POST' and path == '/api/files/direct-upload/complete/':
+            payload = json.loads(body or b'{}')
+            record  = self.files.get(payload.get('file_id'))
+            if record is None:
+                return 404, {'error': 'not found'}
+            record.update(status='completed', url=f"{self.url}/media/{payload.get('provider_file_id')}")
+            return 200, self._public(record)
+
+        match = _FILE_PATH.match(path)
+        record = self.files.get(int(match.group(1))) if match else None
+        if record is None:
+            return 404, {'error': 'not found'}
+        if method == 'DELETE':
+            del self.files[record['id']]
+            return 204, None
+        record['polls'] += 1
+        if record['status'] == 'pending' and record['polls'] >= self.complete_after:
+            record.update(status='completed', url=f"{self.url}/media/{record['id']}")
+        return 200, self._public(record)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local FileForge stub server.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+    parser.add_argument('--complete-after', type=int, default=1,
+                        help='Status polls before an async upload completes')
+    options = parser.parse_args()
+
+    stub = FileForgeStub(port=options.port, latency=options.latency, complete_after=options.complete_after).start()
+    print(f'FileForge stub listening on {stub.url} (Ctrl+C to stop)')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
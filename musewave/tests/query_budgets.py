@@ -0,0 +1,82 @@
+"""
+Helpers for API tests: query-count budgets.
+
+List endpoints must cost a fixed number of queries however many rows they
+return.  Related ids come from ``*_id`` attributes, counts from ``annotate``,
+and nested rows from ``prefetch_related``.  These helpers let a test suite pin
+that down:
+
+    with query_budget(ENDPOINT_QUERY_BUDGETS['get_user_albums']):
+        client.get(f'/api/users/{user.id}/albums')
+
+    assert_constant_queries(
+        lambda n: make_albums(user, n),
+        lambda: client.get(f'/api/users/{user.id}/albums'),
+    )
+
+Budgets count the view's own queries.  They exclude authentication (use
+``APIClient.force_authenticate``) and assume the response cache is disabled
+(``RESPONSE_CACHE = {'enabled': False}``).
+
+Public API
+----------
+ENDPOINT_QUERY_BUDGETS : dict
+    URL name -> maximum number of queries for a GET.
+
+query_budget(budget, using='default')
+    Context manager.  Fails with the executed SQL if more than *budget*
+    queries run inside it.
+
+assert_constant_queries(populate, request, sizes=(1, 25), using='default')
+    Call ``populate(n)`` then ``request()`` for each size and fail unless every
+    size costs the same number of queries.  Returns that number.
+"""
+
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+ENDPOINT_QUERY_BUDGETS = {
+    'users-list':          1,
+    'get_artists':         1,
+    'tracks-list':         1,
+    'track_detail':        1,
+    'get_user_likes':      1,
+    'get_track_downloads': 1,
+    'get_track_plays':     1,
+    'get_user_plays':      1,
+    'get_followers':       1,
+    'get_following':       1,
+    'get_user_albums':     1,
+    'get_album':           2,
+    'playlists_list_or_create': 2,
+    'playlist_detail':     3,
+}
+
+
+def _describe(queries):
+    return '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(queries, 1))
+
+
+@contextmanager
+def query_budget(budget, using='default'):
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    executed = len(context.captured_queries)
+    if executed > budget:
+        raise AssertionError(
+            f'{executed} queries executed, budget is {budget}:\n{_describe(context.captured_queries)}'
+        )
+
+
+def assert_constant_queries(populate, request, sizes=(1, 25), using='default'):
+    counts = {}
+    for size in sizes:
+        populate(size)
+        with CaptureQueriesContext(connections[using]) as context:
+            request()
+        counts[size] = len(context.captured_queries)
+    if len(set(counts.values())) != 1:
+        raise AssertionError(f'Query count grows with result size: {counts}\n{_describe(context.captured_queries)}')
+    return counts[sizes[0]]
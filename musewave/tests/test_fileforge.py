@@ -0,0 +1,122 @@
+import io
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from musewave.services.fileforge import FileForgeClient, FileForgeError, FileForgeUnavailable
+from musewave.tests.fileforge_stub import FileForgeStub
+
+
+class FileForgeClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stub = FileForgeStub().start()
+        self.addCleanup(self.stub.stop)
+
+    def client_for(self, **options):
+        options = {'backoff': 0, 'metrics_interval': 3600, **options}
+        client = FileForgeClient(base_url=self.stub.url, api_key='test', **options)
+        self.addCleanup(client.close)
+        return client
+
+    def calls(self, method, path):
+        return self.stub.requests.count((method, path))
+
+    def open_breaker(self, client):
+        self.stub.down = True
+        for _ in range(client.breaker.threshold):
+            with self.assertRaises(FileForgeError):
+                client.health()
+        self.stub.down = False
+        self.assertEqual(client.breaker.state, 'open')
+
+    # ── connection pool ──────────────────────────────────────────────────────
+
+    def test_calls_reuse_one_connection(self):
+        client = self.client_for()
+        for _ in range(5):
+            client.health()
+        self.assertEqual(self.calls('GET', '/api/health/'), 5)
+        self.assertEqual(len(self.stub.connections), 1)
+
+    # ── retries ──────────────────────────────────────────────────────────────
+
+    def test_idempotent_call_is_retried_through_503s(self):
+        client = self.client_for(retries=3)
+        file_id = client.upload_file(io.BytesIO(b'audio'), 'a.mp3')['id']
+        self.stub.fail(2, status=503)
+
+        self.assertEqual(client.get_file(file_id)['status'], 'completed')
+        self.assertEqual(self.calls('GET', f'/api/files/{file_id}/'), 3)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_retry_after_is_honoured(self):
+        client = self.client_for(retries=1, backoff_max=8)
+        self.stub.fail(1, status=503, retry_after=2)
+
+        with mock.patch('musewave.services.fileforge.time.sleep') as sleep:
+            client.health()
+        sleep.assert_called_once_with(2.0)
+
+    def test_retries_give_up_with_the_last_response(self):
+        client = self.client_for(retries=2, breaker_threshold=10)
+        self.stub.fail(3, status=503)
+
+        with self.assertRaises(FileForgeError):
+            client.health()
+        self.assertEqual(self.calls('GET', '/api/health/'), 3)
+
+    def test_uploads_are_never_retried(self):
+        client = self.client_for(retries=3)
+        self.stub.fail(1, status=503)
+
+        with self.assertRaises(FileForgeError):
+            client.upload_file(io.BytesIO(b'audio'), 'a.mp3')
+        self.assertEqual(self.calls('POST', '/api/files/'), 1)
+
+    # ── circuit breaker ──────────────────────────────────────────────────────
+
+    def test_breaker_opens_and_fails_fast(self):
+        client = self.client_for(retries=0, breaker_threshold=2, breaker_reset=60)
+        self.open_breaker(client)
+        seen = len(self.stub.requests)
+
+        with self.assertRaises(FileForgeUnavailable):
+            client.health()
+        self.assertEqual(len(self.stub.requests), seen)
+
+    def test_half_open_trial_success_closes_breaker(self):
+        client = self.client_for(retries=0, breaker_threshold=2, breaker_reset=0.05)
+        self.open_breaker(client)
+        time.sleep(0.06)
+        self.assertEqual(client.breaker.state, 'half-open')
+
+        client.health()
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_half_open_trial_failure_reopens_breaker(self):
+        client = self.client_for(retries=0, breaker_threshold=2, breaker_reset=0.05)
+        self.open_breaker(client)
+        time.sleep(0.06)
+
+        self.stub.fail(1, status=503)
+        with self.assertRaises(FileForgeError):
+            client.health()
+        self.assertEqual(client.breaker.state, 'open')
+
+    def test_half_open_trial_is_released_when_the_call_raises(self):
+        client = self.client_for(retries=0, breaker_threshold=2, breaker_reset=0.05)
+        self.open_breaker(client)
+        time.sleep(0.06)
+
+        # Claims more bytes than it holds, so the upload body raises mid-send.
+        shrunk = io.BytesIO(b'audio')
+        shrunk.size = 1024
+        with self.assertRaises(FileForgeError) as raised:
+            client.upload_file(shrunk, 'a.mp3')
+        self.assertNotIsInstance(raised.exception, FileForgeUnavailable)
+        self.assertFalse(client.breaker.trial)
+
+        client.health()
+        self.assertEqual(client.breaker.state, 'closed')
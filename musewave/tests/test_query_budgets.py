@@ -0,0 +1,159 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from musewave.models import Album, Download, Follow, Like, Play, Playlist, PlaylistTrack, Track, User
+from musewave.tests.query_budgets import ENDPOINT_QUERY_BUDGETS, assert_constant_queries, query_budget
+
+SIZES = (1, 100)
+
+
+def _users(prefix, count):
+    return User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password='!') for i in range(count)
+    ])
+
+
+def _tracks(user, count, **fields):
+    return Track.objects.bulk_create([
+        Track(user=user, title=f'Track {i}', artist=user.username, artist_slug=user.username,
+              genre='rock', audio_duration=180, published=True, **fields)
+        for i in range(count)
+    ])
+
+
+def _top_up(queryset, count, create):
+    """Create rows with ``create(i)`` until *queryset* holds *count* of them."""
+    for i in range(queryset.count(), count):
+        create(i)
+
+
+@override_settings(RESPONSE_CACHE={'enabled': False})
+class EndpointQueryBudgetTests(TestCase):
+    """
+    Every endpoint in ENDPOINT_QUERY_BUDGETS costs the same number of queries
+    for one row as for a hundred, and no more than its budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist, cls.listener = _users('member', 2)
+        cls.fans  = _users('fan', max(SIZES))
+        cls.pool  = _tracks(cls.artist, max(SIZES))
+        cls.track = cls.pool[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.listener)
+
+    def get(self, name, params=None, **kwargs):
+        response = self.client.get(reverse(name, kwargs=kwargs), params)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response
+
+    def check(self, name, populate, params=None, **kwargs):
+        assert_constant_queries(populate, lambda: self.get(name, params, **kwargs), sizes=SIZES)
+        with query_budget(ENDPOINT_QUERY_BUDGETS[name]):
+            self.get(name, params, **kwargs)
+
+    # ── users ────────────────────────────────────────────────────────────────
+
+    def test_users_list(self):
+        User.objects.exclude(pk=self.listener.pk).delete()
+        self.check('users-list', lambda n: _top_up(User.objects.all(), n, lambda i: _users(f'new{i}-', 1)))
+
+    def test_get_artists(self):
+        def populate(n):
+            artists = Track.objects.values('user').distinct()
+            _top_up(artists, n, lambda i: _tracks(self.fans[i], 1))
+
+        Track.objects.all().delete()
+        self.check('get_artists', populate)
+
+    def test_get_followers(self):
+        follows = Follow.objects.filter(following=self.artist)
+        self.check('get_followers', lambda n: _top_up(
+            follows, n, lambda i: Follow.objects.create(follower=self.fans[i], following=self.artist),
+        ), user_id=self.artist.id)
+
+    def test_get_following(self):
+        follows = Follow.objects.filter(follower=self.listener)
+        self.check('get_following', lambda n: _top_up(
+            follows, n, lambda i: Follow.objects.create(follower=self.listener, following=self.fans[i]),
+        ), user_id=self.listener.id)
+
+    def test_get_user_likes(self):
+        likes = Like.objects.filter(user=self.listener)
+        self.check('get_user_likes', lambda n: _top_up(
+            likes, n, lambda i: Like.objects.create(user=self.listener, track=self.pool[i]),
+        ), user_id=self.listener.id)
+
+    def test_get_user_plays(self):
+        plays = Play.objects.filter(user=self.listener)
+        self.check('get_user_plays', lambda n: _top_up(
+            plays, n, lambda i: Play.objects.create(user=self.listener, track=self.pool[i], duration=30),
+        ), user_id=self.listener.id)
+
+    def test_get_user_albums(self):
+        def add_album(i):
+            album = Album.objects.create(
+                user=self.artist, title=f'Album {i}', artist=self.artist.username,
+                release_date=timezone.now(), genre='rock', published=True,
+            )
+            Track.objects.filter(pk=self.pool[i].pk).update(album=album)
+
+        albums = Album.objects.filter(user=self.artist)
+        self.check('get_user_albums', lambda n: _top_up(albums, n, add_album), user_id=self.artist.id)
+
+    # ── tracks ───────────────────────────────────────────────────────────────
+
+    def test_tracks_list(self):
+        fan    = self.fans[0]
+        tracks = Track.objects.filter(user=fan)
+        self.check('tracks-list', lambda n: _top_up(tracks, n, lambda i: _tracks(fan, 1)), {'userId': fan.id})
+
+    def test_track_detail(self):
+        likes = Like.objects.filter(track=self.track)
+        self.check('track_detail', lambda n: _top_up(
+            likes, n, lambda i: Like.objects.create(user=self.fans[i], track=self.track),
+        ), track_id=self.track.id)
+
+    def test_get_track_downloads(self):
+        downloads = Download.objects.filter(track=self.track)
+        self.check('get_track_downloads', lambda n: _top_up(
+            downloads, n, lambda i: Download.objects.create(user=self.fans[i], track=self.track),
+        ), track_id=self.track.id)
+
+    def test_get_track_plays(self):
+        plays = Play.objects.filter(track=self.track)
+        self.check('get_track_plays', lambda n: _top_up(
+            plays, n, lambda i: Play.objects.create(user=self.fans[i], track=self.track, duration=30),
+        ), track_id=self.track.id)
+
+    # ── albums and playlists ─────────────────────────────────────────────────
+
+    def test_get_album(self):
+        album  = Album.objects.create(
+            user=self.artist, title='Album', artist=self.artist.username,
+            release_date=timezone.now(), genre='rock', published=True,
+        )
+        tracks = Track.objects.filter(album=album)
+        self.check('get_album', lambda n: _top_up(
+            tracks, n, lambda i: Track.objects.filter(pk=self.pool[i].pk).update(album=album),
+        ), album_id=album.id)
+
+    def test_playlists_list_or_create(self):
+        def add_playlist(i):
+            playlist = Playlist.objects.create(user=self.listener, name=f'Playlist {i}')
+            PlaylistTrack.objects.create(playlist=playlist, track=self.pool[i])
+
+        playlists = Playlist.objects.filter(user=self.listener)
+        self.check('playlists_list_or_create', lambda n: _top_up(playlists, n, add_playlist))
+
+    def test_playlist_detail(self):
+        playlist = Playlist.objects.create(user=self.listener, name='Playlist')
+        entries  = PlaylistTrack.objects.filter(playlist=playlist)
+        self.check('playlist_detail', lambda n: _top_up(
+            entries, n, lambda i: PlaylistTrack.objects.create(playlist=playlist, track=self.pool[i], order=i),
+        ), playlist_id=playlist.id)
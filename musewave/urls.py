@@ -39,6 +39,9 @@ urlpatterns = [
     path('users/<uuid:user_id>/followers',           views.get_followers,    name='get_followers'),
     path('users/<uuid:user_id>/following',           views.get_following,    name='get_following'),
 
+    # ── Feed ──────────────────────────────────────────────────────────────────
+    path('feed', views.get_feed, name='get_feed'),   # GET (auth required)
+
     # ── Artists ───────────────────────────────────────────────────────────────
     path('artists', views.get_artists, name='get_artists'),
 
@@ -55,14 +58,31 @@ urlpatterns = [
     path('tracks/<uuid:track_id>/stream-url/',             views.get_track_stream_url, name='get_track_stream_url'),
     path('tracks/<uuid:track_id>/download/',               views.download_track,       name='download_track'),
     path('tracks/<uuid:track_id>/stats',                   views.get_track_stats,      name='get_track_stats'),
+    path('tracks/<uuid:track_id>/waveform',                views.get_track_waveform,   name='get_track_waveform'),
     path('tracks/<uuid:track_id>/like',                    views.like_track,           name='like_track'),        # POST / DELETE
     path('tracks/<uuid:track_id>/like/<uuid:user_id>',     views.check_like,           name='check_like'),
     path('tracks/<uuid:track_id>/download',                views.create_download,      name='create_download'),
     path('tracks/<uuid:track_id>/downloads',               views.get_track_downloads,  name='get_track_downloads'),
     path('tracks/<uuid:track_id>/play',                    views.create_play,          name='create_play'),
     path('tracks/<uuid:track_id>/plays',                   views.get_track_plays,      name='get_track_plays'),
+    path('tracks/<uuid:track_id>/similar',                 views.get_similar_tracks,   name='get_similar_tracks'),
+    path('tracks/<uuid:track_id>/radio',                   views.get_track_radio,      name='get_track_radio'),
     path('tracks/<uuid:track_id>',                         views.track_detail,         name='track_detail'),      # GET / PATCH / DELETE
 
+    # ── Trending ──────────────────────────────────────────────────────────────
+    path('trending', views.get_trending, name='get_trending'),
+
+    # ── Charts ────────────────────────────────────────────────────────────────
+    path('charts/<str:period>', views.get_chart, name='get_chart'),   # daily / weekly
+
+    # ── Tags ──────────────────────────────────────────────────────────────────
+    path('tags', views.tags_list, name='tags_list'),
+
+    # ── Uploads ───────────────────────────────────────────────────────────────
+    path('uploads/direct',                     views.create_direct_upload,   name='create_direct_upload'),
+    path('uploads/<uuid:upload_id>',           views.upload_status,          name='upload_status'),
+    path('uploads/<uuid:upload_id>/complete',  views.complete_direct_upload, name='complete_direct_upload'),
+
     # ── Playlists ─────────────────────────────────────────────────────────────
     path('playlists',                                        views.playlists_list_or_create,    name='playlists_list_or_create'),
     path('playlists/<uuid:playlist_id>',                     views.playlist_detail,             name='playlist_detail'),
@@ -72,5 +92,6 @@ urlpatterns = [
 
     # ── Search ────────────────────────────────────────────────────────────────
     path('search/rebuild', views.rebuild_search_index, name='rebuild_search_index'),
+    path('search/suggest', views.search_suggest,       name='search_suggest'),
     path('search',         views.search,               name='search'),
 ]
\ No newline at end of file
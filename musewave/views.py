@@ -2,16 +2,20 @@ import logging
 
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Q, Sum, Avg, Max
+from django.db import transaction
+from django.db.models import Count, Max
 from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
-from datetime import timedelta
 
-from .models import User, Track, Like, Download, Play, Follow, Album, Playlist, PlaylistTrack
+from .models import (
+    User, Track, Like, Download, Play, Follow, Album, Playlist, PlaylistTrack,
+    TrackDailyStats, TrackReach, ArtistStats, PendingUpload, ChartEntry,
+)
 from .serializers import (
     UserSerializer, PublicUserSerializer, UpdateUserSerializer, CreateUserSerializer,
     TrackSerializer, CreateTrackSerializer, UpdateTrackSerializer,
@@ -19,28 +23,78 @@ from .serializers import (
     UserStatsSerializer, TrackStatsSerializer,
     AlbumSerializer, CreateAlbumSerializer, UpdateAlbumSerializer,
     PlaylistSerializer, PlaylistDetailSerializer, PlaylistTrackSerializer,
+    PendingUploadSerializer, DirectUploadSerializer, CompleteUploadSerializer,
+    set_album,
 )
+from . import fast_serializers
+from .response_cache import cached_response
+from .pagination import InvalidCursor, get_limit, paginate_cursor, paginate_offset, wants_cursor
+from .services import charts
+from .services import counters
+from .services import feed
+from .services import radio
+from .services import similar
+from .services import stats as artist_stats
+from .services.play_buffer import record_play
+from .services import suggest as typeahead
+from .services import trending
+from .services import tags as tag_index
+from .services import uploads
+from .services import waveforms
+from .services.fileforge import FileForgeError
+from .services.search import get_backend as search_backend
 
 logger = logging.getLogger(__name__)
 
 
-# ─── FileForge cleanup helpers ─────────────────────────────────────────────────
+# ─── Upload helpers ────────────────────────────────────────────────────────────
+# FileForge files of deleted objects are queued for deletion by the post_delete
+# handlers in signals.py (services/file_deletions.py).
 
-def _delete_fileforge_file(fileforge_id):
-    """Silently delete a file from FileForge by its numeric ID."""
-    if not fileforge_id:
-        return
-    from musewave.services.fileforge import delete_file
-    try:
-        delete_file(fileforge_id)
-    except Exception as exc:
-        logger.warning("Could not delete FileForge file %s: %s", fileforge_id, exc)
+def _with_uploads(data, instance):
+    """Add the uploads still processing for *instance* to a write response."""
+    return {
+        **data,
+        'pending_uploads': PendingUploadSerializer(uploads.pending_for(instance), many=True).data,
+    }
+
+
+# ─── Pagination helper ─────────────────────────────────────────────────────────
 
+# Sort keys usable with cursor pagination: non-null and backed by an index.
+CURSOR_SORT_FIELDS = {'created_at', 'plays'}
 
-def _delete_track_files(track):
-    """Delete a track's audio and cover files from FileForge."""
-    _delete_fileforge_file(track.audio_fileforge_id)
-    _delete_fileforge_file(track.cover_fileforge_id)
+
+def _paginated_response(request, queryset, serializer_class, order_field='-created_at', fast=None,
+                         **serializer_kwargs):
+    """
+    Serialize one page of *queryset*.  With ``?cursor=`` the response is
+    ``{"results": [...], "next_cursor": ...}``; otherwise it is the bare list
+    selected by ``?limit=&offset=``.
+
+    *fast* is an optional ``FastReadSerializer`` for *serializer_class*; the
+    page is then fetched as ``.values()`` rows and serialized through it.
+    """
+    def serialize(rows):
+        if fast is not None:
+            return fast.serialize(rows)
+        return serializer_class(rows, many=True, **serializer_kwargs).data
+
+    if fast is not None:
+        queryset = fast.values(queryset, order_field.lstrip('-'))
+
+    if wants_cursor(request):
+        try:
+            rows, next_cursor = paginate_cursor(queryset, request, order_field)
+        except InvalidCursor as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results':     serialize(rows),
+            'next_cursor': next_cursor,
+        })
+
+    rows = paginate_offset(queryset, request, order_field)
+    return Response(serialize(rows))
 
 
 # ============================================================================
@@ -49,6 +103,7 @@ def _delete_track_files(track):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_response('user:{user_id}')
 def get_user(request, user_id):
     """Public profile — email and other sensitive fields are excluded."""
     user = get_object_or_404(User, id=user_id)
@@ -58,6 +113,7 @@ def get_user(request, user_id):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_response(data_tags=lambda data: [f"user:{data['id']}"])
 def get_user_by_username(request, username):
     """Public profile lookup by username."""
     user = get_object_or_404(User, username=username)
@@ -107,7 +163,7 @@ def update_user(request, user_id):
         if password:
             updated_user.set_password(password)
             updated_user.save(update_fields=['password'])
-        return Response(UserSerializer(updated_user, context={'request': request}).data)
+        return Response(_with_uploads(UserSerializer(updated_user, context={'request': request}).data, updated_user))
 
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -126,7 +182,7 @@ def users_create(request):
         cache.set(f'user_password_{user.id}', plain_password, 86400)
 
         logger.info("New user created: %s (%s)", user.username, user.email)
-        user_data = UserSerializer(user, context={'request': request}).data
+        user_data = _with_uploads(UserSerializer(user, context={'request': request}).data, user)
         return Response({
             **user_data,
             'message': 'Account created successfully! Please check your email to verify your account.',
@@ -139,51 +195,47 @@ def users_create(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def users_list(request):
-    """Protected — list users (paginated)."""
-    limit  = int(request.GET.get('limit', 50))
-    offset = int(request.GET.get('offset', 0))
-    users  = User.objects.all()[offset:offset + limit]
-    serializer = UserSerializer(users, many=True, context={'request': request})
-    return Response(serializer.data)
+    """Protected — list users (paginated; supports ``?cursor=``)."""
+    return _paginated_response(
+        request, User.objects.all(), UserSerializer, context={'request': request},
+    )
 
 
 @api_view(['GET'])
 def get_user_stats(request, user_id):
-    user   = get_object_or_404(User, id=user_id)
-    tracks = Track.objects.filter(user=user)
-
-    total_plays     = tracks.aggregate(Sum('plays'))['plays__sum'] or 0
-    total_likes     = tracks.aggregate(Sum('likes'))['likes__sum'] or 0
-    total_downloads = tracks.aggregate(Sum('downloads'))['downloads__sum'] or 0
-    total_followers = Follow.objects.filter(following=user).count()
-    total_following = Follow.objects.filter(follower=user).count()
-
-    thirty_days_ago  = timezone.now() - timedelta(days=30)
-    track_ids        = tracks.values_list('id', flat=True)
-    monthly_listeners = Play.objects.filter(
-        track_id__in=track_ids,
-        created_at__gte=thirty_days_ago,
-    ).values('user').distinct().count()
+    """
+    Served from the artist's ArtistStats snapshot.  ``updated_at`` is when the
+    snapshot last changed; a missing snapshot is built on first read.
+    """
+    user     = get_object_or_404(User.objects.only('id'), id=user_id)
+    snapshot = (
+        ArtistStats.objects.filter(user_id=user.id).first()
+        or artist_stats.rebuild_artist_stats(user.id)
+    )
 
     stats = {
         'user_id':           str(user.id),
-        'total_tracks':      tracks.count(),
-        'total_plays':       total_plays,
-        'total_likes':       total_likes,
-        'total_downloads':   total_downloads,
-        'total_followers':   total_followers,
-        'total_following':   total_following,
-        'monthly_listeners': monthly_listeners,
-        'updated_at':        timezone.now(),
+        'total_tracks':      snapshot.total_tracks,
+        'total_plays':       snapshot.total_plays,
+        'total_likes':       snapshot.total_likes,
+        'total_downloads':   snapshot.total_downloads,
+        'total_followers':   snapshot.total_followers,
+        'total_following':   snapshot.total_following,
+        'monthly_listeners': snapshot.monthly_listeners,
+        'updated_at':        snapshot.updated_at,
     }
     return Response(UserStatsSerializer(stats).data)
 
 
 @api_view(['GET'])
+@cached_response('tracks', 'users')
 def get_artists(request):
     """Users who have at least one published track."""
     artist_ids = Track.objects.values_list('user', flat=True).distinct()
     artists    = User.objects.filter(id__in=artist_ids)
+    fast       = fast_serializers.for_endpoint('get_artists', PublicUserSerializer)
+    if fast is not None:
+        return Response(fast.serialize(fast.values(artists)))
     return Response(PublicUserSerializer(artists, many=True, context={'request': request}).data)
 
 
@@ -193,6 +245,7 @@ def get_artists(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cached_response('tracks')
 def tracks_list(request):
     tracks = Track.objects.all()
 
@@ -210,8 +263,13 @@ def tracks_list(request):
 
     tags = request.GET.get('tags')
     if tags:
-        for tag in tags.split(','):
-            tracks = tracks.filter(tags__contains=tag)
+        tag_mode = request.GET.get('tagMode', 'all')
+        if tag_mode not in tag_index.MODES:
+            return Response(
+                {'error': f"tagMode must be one of {list(tag_index.MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tracks = tag_index.filter_tracks(tracks, tags.split(','), mode=tag_mode)
 
     published = request.GET.get('published')
     if published == 'true':
@@ -222,13 +280,17 @@ def tracks_list(request):
     sort_by    = request.GET.get('sortBy', 'created_at')
     sort_order = request.GET.get('sortOrder', 'desc')
     order_field = f'-{sort_by}' if sort_order == 'desc' else sort_by
-    tracks = tracks.order_by(order_field)
-
-    limit  = int(request.GET.get('limit', 50))
-    offset = int(request.GET.get('offset', 0))
-    tracks = tracks[offset:offset + limit]
+    if wants_cursor(request) and sort_by not in CURSOR_SORT_FIELDS:
+        return Response(
+            {'error': f"Cursor pagination supports sortBy in {sorted(CURSOR_SORT_FIELDS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    return Response(TrackSerializer(tracks, many=True, context={'request': request}).data)
+    return _paginated_response(
+        request, tracks, TrackSerializer, order_field,
+        fast=fast_serializers.for_endpoint('tracks_list', TrackSerializer),
+        context={'request': request},
+    )
 
 
 @api_view(['POST'])
@@ -239,7 +301,7 @@ def tracks_create(request):
     if serializer.is_valid():
         track = serializer.save()
         return Response(
-            TrackSerializer(track, context={'request': request}).data,
+            _with_uploads(TrackSerializer(track, context={'request': request}).data, track),
             status=status.HTTP_201_CREATED,
         )
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -247,6 +309,7 @@ def tracks_create(request):
 
 @api_view(['GET', 'PATCH', 'DELETE'])
 @parser_classes([MultiPartParser, FormParser, JSONParser])
+@cached_response('track:{track_id}')
 def track_detail(request, track_id):
     track = get_object_or_404(Track, id=track_id)
 
@@ -257,11 +320,10 @@ def track_detail(request, track_id):
         serializer = UpdateTrackSerializer(track, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(TrackSerializer(track, context={'request': request}).data)
+            return Response(_with_uploads(TrackSerializer(track, context={'request': request}).data, track))
         return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        _delete_track_files(track)
         track.delete()
         return Response({'success': True})
 
@@ -270,7 +332,6 @@ def track_detail(request, track_id):
 def delete_track_method(request, track_id):
     """Separate DELETE endpoint (kept for URL compatibility)."""
     track = get_object_or_404(Track, id=track_id)
-    _delete_track_files(track)
     track.delete()
     return Response({'success': True})
 
@@ -286,25 +347,36 @@ def get_or_update_track(request, track_id):
     serializer = UpdateTrackSerializer(track, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
-        return Response(TrackSerializer(track, context={'request': request}).data)
+        return Response(_with_uploads(TrackSerializer(track, context={'request': request}).data, track))
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET'])
 def get_track_stats(request, track_id):
-    track = get_object_or_404(Track, id=track_id)
-    plays = Play.objects.filter(track=track)
+    """
+    Answered from the TrackDailyStats rollup (one row per day, never per play)
+    and the track's HyperLogLog reach estimate.
+    """
+    track = get_object_or_404(Track.objects.only('id'), id=track_id)
+    days  = TrackDailyStats.objects.filter(track=track).values_list(
+        'date', 'plays', 'total_duration', 'completions',
+    )
+    unique_listeners = (
+        TrackReach.objects.filter(track=track).values_list('unique_listeners', flat=True).first() or 0
+    )
 
-    daily_plays = {}
-    for play in plays:
-        date = play.created_at.date().isoformat()
-        daily_plays[date] = daily_plays.get(date, 0) + 1
+    daily_plays     = {}
+    total_plays     = 0
+    total_duration  = 0.0
+    completed_plays = 0
+    for date, plays, duration, completions in days:
+        daily_plays[date.isoformat()] = plays
+        total_plays     += plays
+        total_duration  += duration
+        completed_plays += completions
 
-    unique_listeners = plays.values('user').distinct().count()
-    avg_duration     = plays.aggregate(Avg('duration'))['duration__avg'] or 0
-    total_plays      = plays.count()
-    completed_plays  = plays.filter(completed=True).count()
-    completion_rate  = (completed_plays / total_plays * 100) if total_plays > 0 else 0
+    avg_duration    = (total_duration / total_plays) if total_plays > 0 else 0
+    completion_rate = (completed_plays / total_plays * 100) if total_plays > 0 else 0
 
     stats = {
         'track_id':               str(track.id),
@@ -317,6 +389,74 @@ def get_track_stats(request, track_id):
     return Response(TrackStatsSerializer(stats).data)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@cached_response('track:{track_id}')
+def get_track_waveform(request, track_id):
+    """Waveform peaks as unsigned integers (0 .. 2**bits - 1) at ``?resolution=``."""
+    try:
+        resolution = int(request.GET.get('resolution', waveforms.DEFAULT_RESOLUTION))
+    except (TypeError, ValueError):
+        resolution = 0
+    if not 1 <= resolution <= waveforms.MAX_RESOLUTION:
+        return Response(
+            {'error': f"resolution must be between 1 and {waveforms.MAX_RESOLUTION}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    track    = get_object_or_404(Track.objects.only('id'), id=track_id)
+    waveform = waveforms.get_waveform(track.id, resolution)
+    if waveform is None:
+        return Response({'error': 'Track has no waveform'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'track_id': str(track.id), **waveform})
+
+
+@api_view(['GET'])
+@cached_response('tracks')
+def get_similar_tracks(request, track_id):
+    """
+    Published tracks most often listened to by the same people, from the
+    precomputed co-listening neighbours (services/similar.py).  Each track
+    carries its ``similarity`` (cosine, 0 .. 1).
+    """
+    found = similar.neighbors(track_id, get_limit(request, default=10, maximum=50))
+    if found is None:
+        get_object_or_404(Track.objects.only('id'), id=track_id)
+        found = []
+
+    ids    = [neighbor_id for neighbor_id, _ in found]
+    tracks = Track.objects.filter(published=True)
+    fast   = fast_serializers.for_endpoint('get_similar_tracks', TrackSerializer)
+    if fast is not None:
+        results = fast.serialize(_in_order(fast.values(tracks), ids))
+    else:
+        results = TrackSerializer(_in_order(tracks, ids), many=True, context={'request': request}).data
+
+    scores = dict(found)
+    for track in results:
+        track['similarity'] = scores[str(track['id'])]
+    return Response(results)
+
+
+@api_view(['GET'])
+def get_track_radio(request, track_id):
+    """
+    A radio queue of tracks that sound like this one, from the in-memory
+    feature matrix (services/radio.py).  To keep playing, call again with the
+    last queued track and pass what was already queued as ``?exclude=id,id``.
+    """
+    exclude = [value for value in request.GET.get('exclude', '').split(',') if value]
+    ids     = radio.queue(track_id, get_limit(request, default=50, maximum=100), exclude=exclude)
+    if ids is None:
+        return Response({'error': 'Track not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    tracks = Track.objects.filter(published=True)
+    fast   = fast_serializers.for_endpoint('get_track_radio', TrackSerializer)
+    if fast is not None:
+        return Response(fast.serialize(_in_order(fast.values(tracks), ids)))
+    return Response(TrackSerializer(_in_order(tracks, ids), many=True, context={'request': request}).data)
+
+
 # ============================================================================
 # LIKES
 # ============================================================================
@@ -331,8 +471,7 @@ def like_track(request, track_id):
         track = get_object_or_404(Track, id=track_id)
         like, created = Like.objects.get_or_create(user=user, track=track)
         if created:
-            track.likes += 1
-            track.save()
+            counters.increment(track.id, 'likes')
         return Response(
             LikeSerializer(like).data,
             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
@@ -346,8 +485,7 @@ def like_track(request, track_id):
     try:
         like = Like.objects.get(user=user, track=track)
         like.delete()
-        track.likes = max(0, track.likes - 1)
-        track.save()
+        counters.increment(track.id, 'likes', -1)
         return Response({'success': True})
     except Like.DoesNotExist:
         return Response({'error': 'Like not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -362,7 +500,7 @@ def check_like(request, track_id, user_id):
 @api_view(['GET'])
 def get_user_likes(request, user_id):
     likes = Like.objects.filter(user_id=user_id)
-    return Response(LikeSerializer(likes, many=True).data)
+    return _paginated_response(request, likes, LikeSerializer)
 
 
 # ============================================================================
@@ -380,15 +518,14 @@ def create_download(request, track_id):
         ip_address=request.META.get('REMOTE_ADDR'),
         user_agent=request.META.get('HTTP_USER_AGENT'),
     )
-    track.downloads += 1
-    track.save()
+    counters.increment(track.id, 'downloads')
     return Response(DownloadSerializer(download).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
 def get_track_downloads(request, track_id):
     downloads = Download.objects.filter(track_id=track_id)
-    return Response(DownloadSerializer(downloads, many=True).data)
+    return _paginated_response(request, downloads, DownloadSerializer)
 
 
 # ============================================================================
@@ -397,32 +534,51 @@ def get_track_downloads(request, track_id):
 
 @api_view(['POST'])
 def create_play(request, track_id):
-    track   = get_object_or_404(Track, id=track_id)
+    """
+    Record a play.  The row is buffered and written in a batch together with
+    a grouped ``plays`` increment (see services/play_buffer.py).
+    """
+    track   = get_object_or_404(Track.objects.only('id'), id=track_id)
     user_id = request.data.get('userId')
-    user    = get_object_or_404(User, id=user_id) if user_id else None
+    user    = get_object_or_404(User.objects.only('id'), id=user_id) if user_id else None
 
-    play = Play.objects.create(
+    play = Play(
         user=user, track=track,
         duration=request.data.get('duration', 0),
         completed=request.data.get('completed', False),
         ip_address=request.META.get('REMOTE_ADDR'),
         user_agent=request.META.get('HTTP_USER_AGENT'),
     )
-    track.plays += 1
-    track.save()
+    try:
+        # Validate now: a bad value must not poison the whole batch at flush time.
+        play.full_clean(exclude=['user', 'track'], validate_unique=False)
+    except ValidationError as exc:
+        return Response({'error': exc.message_dict}, status=status.HTTP_400_BAD_REQUEST)
+    record_play(
+        id=play.id, track_id=play.track_id, user_id=play.user_id,
+        duration=play.duration, completed=play.completed,
+        ip_address=play.ip_address, user_agent=play.user_agent,
+        created_at=play.created_at,
+    )
     return Response(PlaySerializer(play).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
 def get_track_plays(request, track_id):
     plays = Play.objects.filter(track_id=track_id)
-    return Response(PlaySerializer(plays, many=True).data)
+    return _paginated_response(
+        request, plays, PlaySerializer,
+        fast=fast_serializers.for_endpoint('get_track_plays', PlaySerializer),
+    )
 
 
 @api_view(['GET'])
 def get_user_plays(request, user_id):
     plays = Play.objects.filter(user_id=user_id)
-    return Response(PlaySerializer(plays, many=True).data)
+    return _paginated_response(
+        request, plays, PlaySerializer,
+        fast=fast_serializers.for_endpoint('get_user_plays', PlaySerializer),
+    )
 
 
 # ============================================================================
@@ -472,22 +628,53 @@ def get_following(request, user_id):
     return Response(FollowSerializer(follows, many=True).data)
 
 
+# ============================================================================
+# FEED
+# ============================================================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_feed(request):
+    """
+    Newest published tracks by the artists the caller follows, cursor-paginated
+    (see services/feed.py).  Always returns ``{"results", "next_cursor"}``.
+    """
+    try:
+        ids, next_cursor = feed.page(request.user, request.GET.get('cursor'), get_limit(request, default=20, maximum=100))
+    except InvalidCursor as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    fast = fast_serializers.for_endpoint('feed', TrackSerializer)
+    if fast is not None:
+        results = fast.serialize(_in_order(fast.values(Track.objects.all()), ids))
+    else:
+        results = TrackSerializer(_in_order(Track.objects.all(), ids), many=True, context={'request': request}).data
+    return Response({'results': results, 'next_cursor': next_cursor})
+
+
 # ============================================================================
 # ALBUMS
 # ============================================================================
 
 @api_view(['GET'])
 def get_user_albums(request, user_id):
-    albums = Album.objects.filter(user_id=user_id)
+    albums = Album.objects.filter(user_id=user_id).annotate(num_tracks=Count('tracks'))
     return Response(AlbumSerializer(albums, many=True, context={'request': request}).data)
 
 
 @api_view(['GET'])
+@cached_response('album:{album_id}', data_tags=lambda data: [f"track:{t['id']}" for t in data['tracks']])
 def get_album(request, album_id):
     album  = get_object_or_404(Album, id=album_id)
     tracks = Track.objects.filter(album=album)
+    fast   = fast_serializers.for_endpoint('get_album', TrackSerializer)
+    tracks = list(fast.values(tracks) if fast is not None else tracks)
+    album.num_tracks = len(tracks)
     data   = AlbumSerializer(album, context={'request': request}).data
-    data['tracks'] = TrackSerializer(tracks, many=True, context={'request': request}).data
+    if fast is not None:
+        data['tracks'] = fast.serialize(tracks)
+    else:
+        data['tracks'] = TrackSerializer(tracks, many=True, context={'request': request}).data
     return Response(data)
 
 
@@ -498,7 +685,7 @@ def create_album(request):
     if serializer.is_valid():
         album = serializer.save()
         return Response(
-            AlbumSerializer(album, context={'request': request}).data,
+            _with_uploads(AlbumSerializer(album, context={'request': request}).data, album),
             status=status.HTTP_201_CREATED,
         )
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -511,56 +698,257 @@ def update_album(request, album_id):
     serializer = UpdateAlbumSerializer(album, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
-        return Response(AlbumSerializer(album, context={'request': request}).data)
+        return Response(_with_uploads(AlbumSerializer(album, context={'request': request}).data, album))
     return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['DELETE'])
 def delete_album(request, album_id):
     album = get_object_or_404(Album, id=album_id)
-    _delete_fileforge_file(album.cover_fileforge_id)
-    Track.objects.filter(album=album).update(album=None)
-    album.delete()
+    with transaction.atomic():
+        set_album(Track.objects.filter(album=album), None)
+        album.delete()
     return Response({'success': True})
 
 
+# ============================================================================
+# TAGS
+# ============================================================================
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def tags_list(request):
+    """Tag cloud: tags on published tracks with their track counts."""
+    limit = get_limit(request, default=100, maximum=500)
+    return Response(tag_index.tag_cloud(limit=limit, prefix=request.GET.get('q', '').strip() or None))
+
+
+# ============================================================================
+# TRENDING
+# ============================================================================
+
+@api_view(['GET'])
+@cached_response('tracks')
+def get_trending(request):
+    """
+    Published tracks ranked by time-decayed engagement, optionally filtered by
+    ``genre`` / ``mood``.  Read straight from the precomputed TrackTrending
+    ranking (services/trending.py); each track carries its ``trending_score``.
+    """
+    ranked = trending.top(
+        get_limit(request, default=20, maximum=100),
+        genre=request.GET.get('genre'), mood=request.GET.get('mood'),
+    )
+    ids  = [track_id for track_id, _ in ranked]
+    fast = fast_serializers.for_endpoint('get_trending', TrackSerializer)
+    if fast is not None:
+        results = fast.serialize(_in_order(fast.values(Track.objects.all()), ids))
+    else:
+        results = TrackSerializer(_in_order(Track.objects.all(), ids), many=True, context={'request': request}).data
+
+    scores = {str(track_id): round(score, 3) for track_id, score in ranked}
+    for track in results:
+        track['trending_score'] = scores[str(track['id'])]
+    return Response(results)
+
+
+# ============================================================================
+# CHARTS
+# ============================================================================
+
+@api_view(['GET'])
+@cached_response('tracks')
+def get_chart(request, period):
+    """
+    A published daily or weekly chart (services/charts.py): the newest one, or
+    the one whose window contains ``?date=YYYY-MM-DD``.  ``?genre=`` selects a
+    genre chart instead of the overall one.
+    """
+    if period not in charts.PERIODS:
+        return Response({'error': f"period must be one of {sorted(charts.PERIODS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    genre = request.GET.get('genre', '').strip().lower()
+
+    if request.GET.get('date'):
+        try:
+            day = ChartEntry._meta.get_field('period_start').to_python(request.GET['date'])
+        except ValidationError:
+            return Response({'error': 'date must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        start = charts.window(period, day)[0]
+    else:
+        start = charts.latest_start(period, genre)
+    if start is None:
+        return Response({'error': 'Chart not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    entries = list(
+        ChartEntry.objects.filter(period=period, genre=genre, period_start=start)
+        .order_by('rank').values('rank', 'previous_rank', 'rank_delta', 'plays', 'track_id')
+        [:get_limit(request, default=100, maximum=200)]
+    )
+    if not entries:
+        return Response({'error': 'Chart not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    ids  = [entry['track_id'] for entry in entries]
+    fast = fast_serializers.for_endpoint('get_chart', TrackSerializer)
+    if fast is not None:
+        tracks = fast.serialize(_in_order(fast.values(Track.objects.all()), ids))
+    else:
+        tracks = TrackSerializer(_in_order(Track.objects.all(), ids), many=True, context={'request': request}).data
+    tracks = {track['id']: track for track in tracks}
+
+    return Response({
+        'period':       period,
+        'genre':        genre or None,
+        'period_start': start,
+        'period_end':   charts.window(period, start)[1],
+        'entries': [
+            {
+                'rank':          entry['rank'],
+                'previous_rank': entry['previous_rank'],
+                'rank_delta':    entry['rank_delta'],
+                'plays':         entry['plays'],
+                'track':         tracks[str(entry['track_id'])],
+            }
+            for entry in entries if str(entry['track_id']) in tracks
+        ],
+    })
+
+
+# ============================================================================
+# UPLOADS
+# ============================================================================
+
+def _may_upload(user, owner):
+    return user.is_staff or user.pk == owner
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_direct_upload(request):
+    """
+    Pre-signed ticket for uploading a file straight to the storage provider.
+    The client uploads to ``ticket.upload_url`` and then calls
+    ``POST /api/uploads/<id>/complete``.
+    """
+    serializer = DirectUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    instance = uploads.target_object(data['target'], data['object_id'])
+    if instance is None:
+        return Response({'error': 'Object not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not _may_upload(request.user, uploads.owner_id(instance)):
+        return Response({'error': 'You are not allowed to upload to this object.'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        upload, ticket = uploads.create_ticket(
+            instance, data['target'], data['name'], data['size'], data['content_type'],
+        )
+    except FileForgeError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
+
+    return Response({
+        'upload': PendingUploadSerializer(upload).data,
+        'ticket': {key: ticket.get(key) for key in ('upload_url', 'method', 'fields', 'headers', 'expires_in')},
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def upload_status(request, upload_id):
+    upload = get_object_or_404(PendingUpload, id=upload_id)
+    if not _may_upload(request.user, upload.user_id):
+        return Response({'error': 'You are not allowed to view this upload.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(PendingUploadSerializer(upload).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_direct_upload(request, upload_id):
+    upload = get_object_or_404(PendingUpload, id=upload_id)
+    if not _may_upload(request.user, upload.user_id):
+        return Response({'error': 'You are not allowed to complete this upload.'}, status=status.HTTP_403_FORBIDDEN)
+    if upload.strategy != 'direct':
+        return Response({'error': 'Only direct uploads are completed by the client.'}, status=status.HTTP_400_BAD_REQUEST)
+    if upload.status != PendingUpload.STATUS_PROCESSING:
+        return Response(PendingUploadSerializer(upload).data, status=status.HTTP_409_CONFLICT)
+
+    serializer = CompleteUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        uploads.complete_direct(
+            upload, serializer.validated_data['provider_file_id'], serializer.validated_data['provider_response'],
+        )
+    except FileForgeError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_502_BAD_GATEWAY)
+    upload.refresh_from_db()
+    return Response(PendingUploadSerializer(upload).data)
+
+
 # ============================================================================
 # SEARCH
 # ============================================================================
 
+def _in_order(queryset, ids):
+    """Fetch *ids* from *queryset* (instances or ``.values()`` rows) in the order given."""
+    pk_name = queryset.model._meta.pk.name
+    pks     = list(map(queryset.model._meta.pk.to_python, ids))
+    found   = {
+        row[pk_name] if isinstance(row, dict) else row.pk: row
+        for row in queryset.filter(pk__in=pks)
+    }
+    return [found[pk] for pk in pks if pk in found]
+
+
 @api_view(['GET'])
 def search(request):
+    """Ranked full-text search (see services/search.py for the backends)."""
     query = request.GET.get('q', '').strip()
     if not query:
         return Response({'error': "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
 
     search_type = request.GET.get('type', 'all')
-    limit       = int(request.GET.get('limit', 20))
+    limit       = get_limit(request, default=20, maximum=100)
+    backend     = search_backend()
     results     = {'tracks': [], 'users': []}
 
     if search_type in ['tracks', 'all']:
-        tracks = Track.objects.filter(
-            Q(title__icontains=query) | Q(artist__icontains=query) |
-            Q(genre__icontains=query) | Q(mood__icontains=query) |
-            Q(tags__icontains=query),
-            published=True,
-        )[:limit]
-        results['tracks'] = TrackSerializer(tracks, many=True).data
+        ids  = backend.search_tracks(query, limit)
+        fast = fast_serializers.for_endpoint('search', TrackSerializer)
+        if fast is not None:
+            results['tracks'] = fast.serialize(_in_order(fast.values(Track.objects.all()), ids))
+        else:
+            results['tracks'] = TrackSerializer(_in_order(Track.objects.all(), ids), many=True).data
 
     if search_type in ['users', 'all']:
-        users = User.objects.filter(
-            Q(username__icontains=query) |
-            Q(display_name__icontains=query) |
-            Q(bio__icontains=query),
-        )[:limit]
-        results['users'] = PublicUserSerializer(users, many=True).data
+        ids  = backend.search_users(query, limit)
+        fast = fast_serializers.for_endpoint('search', PublicUserSerializer)
+        if fast is not None:
+            results['users'] = fast.serialize(_in_order(fast.values(User.objects.all()), ids))
+        else:
+            results['users'] = PublicUserSerializer(_in_order(User.objects.all(), ids), many=True).data
 
     return Response(results)
 
 
+@api_view(['GET'])
+def search_suggest(request):
+    """Typeahead completions from the in-memory prefix index (services/suggest.py)."""
+    query = request.GET.get('q', '')
+    types = [t for t in request.GET.get('types', '').split(',') if t in typeahead.TYPES] or None
+    limit = get_limit(request, default=8, maximum=20)
+    return Response({'query': query, 'suggestions': typeahead.suggest(query, limit=limit, types=types)})
+
+
 @api_view(['POST'])
+@permission_classes([IsAdminUser])
 def rebuild_search_index(request):
-    return Response({'success': True})
+    """Drop and re-populate the search index from the Track and User tables."""
+    counts = search_backend().rebuild()
+    typeahead.rebuild()
+    return Response({'success': True, 'indexed': counts})
 
 
 # ============================================================================
@@ -587,8 +975,7 @@ def download_track(request, track_id):
         ip_address=request.META.get('REMOTE_ADDR'),
         user_agent=request.META.get('HTTP_USER_AGENT', ''),
     )
-    track.downloads += 1
-    track.save(update_fields=['downloads'])
+    counters.increment(track.id, 'downloads')
 
     return Response({'audio_url': track.audio_url})
 
@@ -619,7 +1006,7 @@ def playlists_list_or_create(request):
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
 
     if request.method == 'GET':
-        playlists  = Playlist.objects.filter(user=request.user).prefetch_related('playlist_tracks__track')
+        playlists  = Playlist.objects.filter(user=request.user).prefetch_related('playlist_tracks')
         serializer = PlaylistSerializer(playlists, many=True, context={'request': request})
         return Response(serializer.data)
 
@@ -635,7 +1022,9 @@ def playlist_detail(request, playlist_id):
     if not request.user.is_authenticated:
         return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
 
-    playlist = get_object_or_404(Playlist, id=playlist_id, user=request.user)
+    playlist = get_object_or_404(
+        Playlist.objects.prefetch_related('playlist_tracks__track'), id=playlist_id, user=request.user,
+    )
 
     if request.method == 'GET':
         return Response(PlaylistDetailSerializer(playlist, context={'request': request}).data)